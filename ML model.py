@@ -1,6 +1,8 @@
+import os
 import pandas as pd
 import numpy as np
 import joblib
+from datetime import datetime
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import classification_report
@@ -10,6 +12,11 @@ from sklearn.metrics import classification_report
 # Normal Phase Voltage is likely ~230V (derived from 400V L-L or general standard, as LG sag is 198V).
 NOMINAL_V_PHASE = 230.0 
 SAMPLES = 5000
+# Operating envelope of the generated data; ai_engine's fast path only trusts samples inside it
+LOAD_KW_RANGE = (5, 50)   # 5kW to 50kW Load
+PF_RANGE = (0.8, 0.99)    # Normal PF
+# Each run saves a new version next to the live one; promote it via /admin/models
+MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "model")
 
 # --- 1. PHYSICS ENGINE ---
 def calculate_expected_current(load_kw, pf, voltage):
@@ -37,8 +44,8 @@ def generate_robust_dataset():
     for _ in range(SAMPLES):
         # 1. Random Operational Context
         fault_type = np.random.choice(fault_profiles)
-        load_kw = np.random.uniform(5, 50)   # 5kW to 50kW Load
-        pf = np.random.uniform(0.8, 0.99)    # Normal PF
+        load_kw = np.random.uniform(*LOAD_KW_RANGE)
+        pf = np.random.uniform(*PF_RANGE)
         
         # 2. Calculate Healthy Baseline
         i_expected = calculate_expected_current(load_kw, pf, NOMINAL_V_PHASE)
@@ -142,8 +149,9 @@ def train_fault_classifier():
     print(classification_report(y_test, preds))
     
     # Save
-    joblib.dump(model, "final_fault_model.pkl")
-    print("✅ Model saved as 'final_fault_model.pkl'")
+    version = f"fault_model_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    joblib.dump(model, os.path.join(MODEL_DIR, f"{version}.pkl"))
+    print(f"✅ Model saved as version '{version}' in {MODEL_DIR}")
     return model
 
 # --- 4. INTERACTIVE PREDICTOR ---
@@ -1,77 +1,311 @@
-import joblib
 import numpy as np
 import os
+import threading
 import warnings
+from compiled_forest import predict_class_indices
+from inference_pool import ProcessInferencePool
+from inference_scheduler import MicroBatchScheduler
+from model_registry import ModelRegistry, ShadowScorer
+from prediction_cache import PredictionCache
 
 # Suppress sklearn warnings about feature names
 warnings.filterwarnings("ignore")
 
 # --- CONFIGURATION ---
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-# Ensure this matches your training file name
-MODEL_PATH = os.path.join(BASE_DIR, "model", "final_fault_model.pkl") 
+# Every <version>.pkl in here is a selectable model version (see model_registry.py)
+MODEL_DIR = os.path.join(BASE_DIR, "model")
+# Version that makes trip decisions at startup; promote others via /admin/models
+MODEL_VERSION = os.getenv("AI_MODEL_VERSION", "final_fault_model")
+# Optional version scored in the background for comparison only
+SHADOW_VERSION = os.getenv("AI_SHADOW_VERSION", "")
+MODEL_PATH = os.path.join(MODEL_DIR, f"{MODEL_VERSION}.pkl")
+# Array export of the same forest (see export_model.py), memory-mapped read-only
+FOREST_PATH = os.path.splitext(MODEL_PATH)[0] + ".forest"
+# "pickle" = joblib.load per worker, "mmap" = share the exported node arrays via the page cache
+MODEL_FORMAT = os.getenv("AI_MODEL_FORMAT", "pickle")
 NOMINAL_V_PHASE = 230.0
+# "compiled" = flattened NumPy forest (compiled_forest.py), "sklearn" = RandomForestClassifier.predict,
+# "early_exit" = compiled forest that stops once the remaining trees cannot change the vote
+INFERENCE_BACKEND = os.getenv("AI_INFERENCE_BACKEND", "compiled")
+BACKENDS = ("compiled", "sklearn", "early_exit")
+# Above this many rows sklearn's Cython traversal wins, so big batches go there
+COMPILED_MAX_ROWS = int(os.getenv("AI_COMPILED_MAX_ROWS", "256"))
+# "thread" = predict in the calling thread, "process" = worker processes (no GIL contention)
+INFERENCE_EXECUTOR = os.getenv("AI_EXECUTOR", "thread")
+PROCESS_WORKERS = int(os.getenv("AI_PROCESS_WORKERS", "0")) or None
+# Micro-batching: concurrent requests share one predict call
+BATCHING_ENABLED = os.getenv("AI_BATCHING", "0") == "1"
+BATCH_MAX_SIZE = int(os.getenv("AI_BATCH_MAX_SIZE", "64"))
+BATCH_MAX_WAIT_MS = float(os.getenv("AI_BATCH_MAX_WAIT_MS", "2"))
+# Physics fast path: samples with every phase inside these bands are "Normal"
+# without asking the forest (see benchmarks/fast_path_agreement.py)
+FAST_PATH_ENABLED = os.getenv("AI_FAST_PATH", "1") == "1"
+FAST_PATH_V_BAND = float(os.getenv("AI_FAST_PATH_V_BAND", "10.0"))   # |V - nominal| in volts
+FAST_PATH_I_BAND = float(os.getenv("AI_FAST_PATH_I_BAND", "3.0"))    # |I - expected| in amps
+# Training envelope of `ML model.py` (LOAD_KW_RANGE, PF_RANGE): the forest never saw a healthy
+# sample outside it, so the fast path only vouches for samples inside it
+FAST_PATH_LOAD_KW = (float(os.getenv("AI_FAST_PATH_LOAD_MIN_KW", "5")), float(os.getenv("AI_FAST_PATH_LOAD_MAX_KW", "50")))
+FAST_PATH_PF = (float(os.getenv("AI_FAST_PATH_PF_MIN", "0.8")), float(os.getenv("AI_FAST_PATH_PF_MAX", "0.99")))
+# Lowest expected current in training (least load at the highest pf, about 7.3 A); below it, use the model
+FAST_PATH_MIN_EXPECTED_I = float(os.getenv("AI_FAST_PATH_MIN_EXPECTED_I", "0")) or (
+    FAST_PATH_LOAD_KW[0] * 1000 / (3 * NOMINAL_V_PHASE * FAST_PATH_PF[1]))
+# Prediction cache for steady-state feeders, keyed on features rounded to these steps
+CACHE_ENABLED = os.getenv("AI_CACHE", "1") == "1"
+CACHE_MAX_SIZE = int(os.getenv("AI_CACHE_SIZE", "4096"))
+CACHE_TTL_S = float(os.getenv("AI_CACHE_TTL_S", "30"))
+CACHE_LOAD_RES = float(os.getenv("AI_CACHE_LOAD_RES", "0.1"))  # kW
+CACHE_PF_RES = float(os.getenv("AI_CACHE_PF_RES", "0.01"))
+CACHE_V_RES = float(os.getenv("AI_CACHE_V_RES", "0.5"))  # volts
+CACHE_I_RES = float(os.getenv("AI_CACHE_I_RES", "0.1"))  # amps
+# Any phase current above this is a fault candidate and always goes to the model
+CACHE_FAULT_CURRENT_LIMIT = float(os.getenv("AI_CACHE_FAULT_CURRENT_LIMIT", "500"))
 
-model = None
+
+# Trees actually evaluated by the primary model (early exit skips some)
+tree_counts = {"rows": 0, "trees": 0}
+fast_path_counts = {"fast_path": 0, "model": 0}
+_counts_lock = threading.Lock()
+
+registry = ModelRegistry(MODEL_DIR, use_mmap=MODEL_FORMAT == "mmap")
 try:
-    print(f"🧠 AI ENGINE: Loading model from {MODEL_PATH}")
-    model = joblib.load(MODEL_PATH)
-    print("✅ AI ENGINE: Model Loaded Successfully!")
+    if MODEL_FORMAT == "mmap" and os.path.isdir(FOREST_PATH):
+        print(f"🧠 AI ENGINE: Mapping model arrays from {FOREST_PATH}")
+    else:
+        if MODEL_FORMAT == "mmap":
+            print(f"⚠️ AI ENGINE: {FOREST_PATH} not found, run export_model.py. Falling back to pickle.")
+        print(f"🧠 AI ENGINE: Loading model from {MODEL_PATH}")
+    primary = registry.promote(MODEL_VERSION)
+    print(f"✅ AI ENGINE: Model Loaded Successfully! ({primary.compiled.n_trees} trees, {primary.load_seconds * 1000:.0f} ms)")
+    if SHADOW_VERSION:
+        registry.set_shadow(SHADOW_VERSION)
+        print(f"👥 AI ENGINE: Shadow model '{SHADOW_VERSION}' loaded")
 except Exception as e:
     print(f"⚠️ AI ENGINE ERROR: {e}")
 
+process_pool = ProcessInferencePool(MODEL_PATH, FOREST_PATH, MODEL_FORMAT == "mmap", PROCESS_WORKERS)
+
+def set_backend(name):
+    """Switch the inference backend at runtime ("compiled", "sklearn" or "early_exit")."""
+    global INFERENCE_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{name}'. Use one of {BACKENDS}")
+    if name == "sklearn" and registry.primary is not None and registry.primary.sklearn_model is None:
+        raise ValueError("sklearn backend needs the pickled model (AI_MODEL_FORMAT=pickle)")
+    INFERENCE_BACKEND = name
+    return INFERENCE_BACKEND
+
+def predict_with(model_version, input_features):
+    """Runs one model version over an N x 14 matrix. Returns N label strings."""
+    if INFERENCE_EXECUTOR == "process":
+        indices, trees_evaluated = process_pool.predict_indices(
+            input_features, INFERENCE_BACKEND, COMPILED_MAX_ROWS, model_version.key
+        )
+    else:
+        indices, trees_evaluated = predict_class_indices(
+            input_features, model_version.compiled, model_version.sklearn_model, INFERENCE_BACKEND, COMPILED_MAX_ROWS
+        )
+    if model_version is registry.primary:
+        with _counts_lock:
+            tree_counts["rows"] += len(input_features)
+            tree_counts["trees"] += trees_evaluated
+    return [str(p).strip() for p in model_version.compiled.classes[indices]]
+
+def predict_with_margin(input_features):
+    """
+    Early-exit vote with the primary model: (labels, vote margins, trees evaluated).
+    The margin is how many trees the winning class led the runner-up by.
+    """
+    primary = registry.primary
+    indices, margins, trees_evaluated = primary.compiled.predict_early_exit(input_features)
+    labels = [str(p).strip() for p in primary.compiled.classes[indices]]
+    return labels, margins, trees_evaluated
+
+def predict_labels(input_features):
+    """Primary model over an N x 14 matrix (analyze_batch hands the whole batch to the shadow model)."""
+    primary = registry.primary  # read once: a concurrent promote must not split a batch
+    if primary is None:
+        return ["Normal"] * len(input_features)
+    return predict_with(primary, input_features)
+
+shadow_scorer = ShadowScorer(registry, predict_with)
+
+def promote_model(version):
+    """Atomically switch the trip-decision model. Cached labels belong to the old one."""
+    model_version = registry.promote(version)
+    prediction_cache.clear()
+    shadow_scorer.reset()
+    return model_version
+
+def set_shadow_model(version):
+    model_version = registry.set_shadow(version)
+    shadow_scorer.reset()
+    return model_version
+
+def fast_path_mask(input_features, v_band=None, i_band=None):
+    """
+    True where the deviation features alone prove the sample is healthy:
+    load and pf inside the training envelope, all three voltages within
+    v_band of nominal and all three currents within i_band of the physics
+    expectation. Everything else goes to the model.
+    """
+    v_band = FAST_PATH_V_BAND if v_band is None else v_band
+    i_band = FAST_PATH_I_BAND if i_band is None else i_band
+    features = np.atleast_2d(input_features)
+
+    i_expected = features[:, 5:8] - features[:, 11:14]  # Ia - Dev_Ia = expected current
+    return (
+        (features[:, 0] >= FAST_PATH_LOAD_KW[0]) & (features[:, 0] <= FAST_PATH_LOAD_KW[1])
+        & (features[:, 1] >= FAST_PATH_PF[0]) & (features[:, 1] <= FAST_PATH_PF[1])
+        & (np.abs(features[:, 8:11]) <= v_band).all(axis=1)
+        & (np.abs(features[:, 11:14]) <= i_band).all(axis=1)
+        & (i_expected[:, 0] >= FAST_PATH_MIN_EXPECTED_I)
+    )
+
+
+scheduler = MicroBatchScheduler(predict_labels, BATCH_MAX_SIZE, BATCH_MAX_WAIT_MS)
+
+# Column order: [Load, PF, Va, Vb, Vc, Ia, Ib, Ic, Dev_Va, Dev_Vb, Dev_Vc, Dev_Ia, Dev_Ib, Dev_Ic]
+prediction_cache = PredictionCache(
+    resolution=[CACHE_LOAD_RES, CACHE_PF_RES] + [CACHE_V_RES] * 3 + [CACHE_I_RES] * 3
+               + [CACHE_V_RES] * 3 + [CACHE_I_RES] * 3,
+    max_size=CACHE_MAX_SIZE,
+    ttl_s=CACHE_TTL_S,
+    fault_current_limit=CACHE_FAULT_CURRENT_LIMIT,
+)
+
+def stats():
+    """Inference counters for /api/metrics"""
+    return {
+        "backend": INFERENCE_BACKEND,
+        "model_version": registry.primary.version if registry.primary else None,
+        "model_format": registry.primary.format if registry.primary else None,
+        "model_load_ms": registry.primary.load_seconds * 1000.0 if registry.primary else 0.0,
+        "shadow": shadow_scorer.stats(),
+        "avg_trees_evaluated": tree_counts["trees"] / tree_counts["rows"] if tree_counts["rows"] else 0.0,
+        "fast_path_enabled": FAST_PATH_ENABLED,
+        "fast_path_rows": fast_path_counts["fast_path"],
+        "model_rows": fast_path_counts["model"],
+        "cache_enabled": CACHE_ENABLED,
+        "cache": prediction_cache.stats(),
+        "executor": INFERENCE_EXECUTOR,
+        "process_pool": process_pool.stats(),
+        "batching_enabled": BATCHING_ENABLED,
+        "scheduler": scheduler.stats(),
+    }
+
 def calculate_expected_current(load_kw, pf, voltage):
     """Physics Formula: I = P / (3 * V * PF)"""
     if pf <= 0.1 or voltage <= 1: return 0.0
     return (load_kw * 1000) / (3 * voltage * pf)
 
-def analyze_data(data):
+def raw_feature_matrix(records):
     """
-    Inputs: HardwareInput object (8 features: Load, PF, 3xV, 3xI)
-    Outputs: (is_fault, fault_message)
+    Inputs: list of HardwareInput objects
+    Outputs: N x 8 float64 matrix [Load, PF, Va, Vb, Vc, Ia, Ib, Ic]
+    """
+    return np.array([
+        [r.load_kw, r.pf,
+         r.voltage_a, r.voltage_b, r.voltage_c,
+         r.current_a, r.current_b, r.current_c]
+        for r in records
+    ], dtype=np.float64).reshape(-1, 8)
+
+def build_feature_matrix(records, raw=None):
+    """
+    Inputs: list of HardwareInput objects, or the N x 8 raw matrix directly
+            (binary frames are decoded straight into one)
+    Outputs: N x 14 float64 matrix in training column order
     """
-    is_fault = False
-    fault_msg = "Normal"
-
-    # --- 1. CALCULATE DERIVED FEATURES (The missing 6) ---
-    # We must match the training logic exactly:
-    # 1. Calculate Expected Current (Physics Baseline)
-    i_expected = calculate_expected_current(data.load_kw, data.pf, NOMINAL_V_PHASE)
-    
-    # 2. Calculate Deviations (Difference from Expected)
-    dev_Va = data.voltage_a - NOMINAL_V_PHASE
-    dev_Vb = data.voltage_b - NOMINAL_V_PHASE
-    dev_Vc = data.voltage_c - NOMINAL_V_PHASE
-    
-    dev_Ia = data.current_a - i_expected
-    dev_Ib = data.current_b - i_expected
-    dev_Ic = data.current_c - i_expected
-
-    # --- 2. CONSTRUCT 14-FEATURE VECTOR ---
-    # Order MUST match training: 
+    # --- 1. RAW FEATURES (8 per record) ---
+    if raw is None:
+        raw = raw_feature_matrix(records)
+    load_kw, pf = raw[:, 0], raw[:, 1]
+
+    # --- 2. DERIVED FEATURES (The missing 6) ---
+    # Vectorized calculate_expected_current(): same guard, same formula
+    valid = (pf > 0.1) & (NOMINAL_V_PHASE > 1)
+    safe_pf = np.where(valid, pf, 1.0)
+    i_expected = np.where(valid, (load_kw * 1000) / (3 * NOMINAL_V_PHASE * safe_pf), 0.0)
+
+    # Order MUST match training:
     # [Load, PF, Va, Vb, Vc, Ia, Ib, Ic, Dev_Va, Dev_Vb, Dev_Vc, Dev_Ia, Dev_Ib, Dev_Ic]
-    input_features = np.array([[
-        data.load_kw, data.pf,
-        data.voltage_a, data.voltage_b, data.voltage_c,
-        data.current_a, data.current_b, data.current_c,
-        dev_Va, dev_Vb, dev_Vc,
-        dev_Ia, dev_Ib, dev_Ic
-    ]])
-
-    # --- 3. ML PREDICTION ---
-    if model:
+    features = np.empty((raw.shape[0], 14), dtype=np.float64)
+    features[:, :8] = raw
+    features[:, 8:11] = raw[:, 2:5] - NOMINAL_V_PHASE
+    features[:, 11:14] = raw[:, 5:8] - i_expected[:, None]
+    return features
+
+def analyze_batch(records, raw=None):
+    """
+    Inputs: list of HardwareInput objects (or a FrameBatch plus its raw N x 8 matrix)
+    Outputs: list of (is_fault, fault_message, voltage), one per record, in order
+    """
+    if not records:
+        return []
+
+    input_features = build_feature_matrix(records, raw)
+    labels = ["Normal"] * len(records)
+    # Read before predicting: a promote after this point makes these labels stale
+    cache_generation = prediction_cache.generation
+    shadow_generation = shadow_scorer.generation
+
+    # --- PHYSICS FAST PATH: clearly healthy rows never reach the forest ---
+    if FAST_PATH_ENABLED:
+        pending = np.flatnonzero(~fast_path_mask(input_features))
+    else:
+        pending = np.arange(len(records))
+    with _counts_lock:
+        fast_path_counts["fast_path"] += len(records) - len(pending)
+        fast_path_counts["model"] += len(pending)
+    checked = pending  # rows the fast path could not answer
+
+    # --- PREDICTION CACHE: repeat readings reuse the last model answer ---
+    cache_keys = None
+    if CACHE_ENABLED and len(pending):
+        cache_keys = prediction_cache.keys(input_features[pending])
+        cached = prediction_cache.get_many(cache_keys)
+        missed = [j for j, label in enumerate(cached) if label is None]
+        for i, label in zip(pending, cached):
+            if label is not None:
+                labels[i] = label
+        cache_keys = [cache_keys[j] for j in missed]
+        pending = pending[missed]
+
+    # --- ONE ML PREDICTION FOR THE REST OF THE BATCH ---
+    scored = True
+    if len(pending):
         try:
-            prediction = model.predict(input_features)[0]
-            pred_str = str(prediction).strip()
-            
-            # Debug Print (Optional: See what AI thinks)
-            # print(f"AI Input: Ia={data.current_a:.1f} -> Pred: {pred_str}")
-
-            if pred_str != "Normal":
-                is_fault = True
-                fault_msg = pred_str # e.g., "SLG", "Open"
+            if BATCHING_ENABLED:
+                predicted = scheduler.predict(input_features[pending])
+            else:
+                predicted = predict_labels(input_features[pending])
+            for i, label in zip(pending, predicted):
+                labels[i] = label
+            if cache_keys is not None:
+                prediction_cache.put_many(cache_keys, predicted, cache_generation)
         except Exception as e:
+            scored = False
             print(f"❌ AI Prediction Error: {e}")
-            pass
 
-    return is_fault, fault_msg, data.voltage_a
\ No newline at end of file
+    # --- SHADOW MODEL: the whole batch with its final labels, scored off the trip path ---
+    if scored and registry.shadow is not None:
+        paths = np.full(len(records), "fast_path", dtype=object)
+        paths[checked] = "cache"
+        paths[pending] = "model"
+        shadow_scorer.submit(input_features, labels, paths.tolist(), shadow_generation)
+
+    results = []
+    for voltage_a, pred_str in zip(input_features[:, 2].tolist(), labels):
+        if pred_str != "Normal":
+            results.append((True, pred_str, voltage_a)) # e.g., "SLG", "Open"
+        else:
+            results.append((False, "Normal", voltage_a))
+    return results
+
+def analyze_data(data):
+    """
+    Inputs: HardwareInput object (8 features: Load, PF, 3xV, 3xI)
+    Outputs: (is_fault, fault_message, voltage)
+    """
+    return analyze_batch([data])[0]
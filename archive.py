@@ -0,0 +1,466 @@
+"""
+Columnar telemetry / fault archive in immutable, time-partitioned segments.
+
+Incoming samples are buffered in memory and sealed into a segment when the
+buffer spans ARCHIVE_SEGMENT_SECONDS or holds ARCHIVE_SEGMENT_ROWS rows
+(and on shutdown). A segment is a directory
+
+    <ARCHIVE_DIR>/<kind>/<t_min>-<t_max>-<seq>/
+        header.json     kind, row count, time range, column dtypes, line table
+        timestamp.npy   float64 epoch seconds, sorted
+        line.npy        uint32 index into the header's line table
+        <column>.npy    one plain NumPy array per column
+
+written to a temporary directory and renamed into place, so readers never
+see a half-written segment and segments never change once visible.
+
+The writer deletes the oldest segments once they are older than
+ARCHIVE_RETENTION_DAYS or the archive exceeds ARCHIVE_MAX_MB (checked after
+every segment and at start), so disk use stays bounded.
+
+ArchiveReader memory-maps the .npy files (np.load mmap_mode="r"), finds the
+time range with a binary search on timestamp and hands out zero-copy views,
+so scans, aggregates and re-scoring run over page-cache memory rather than
+through SQLite and the ORM.
+"""
+import atexit
+import json
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from datetime import timezone
+
+import numpy as np
+
+from telemetry_frame import line_table
+
+# --- CONFIG ---
+ARCHIVE_ENABLED = os.getenv("ARCHIVE_ENABLED", "0") == "1"
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "archive")
+# Oldest segments are deleted past either limit (0 = no limit)
+ARCHIVE_RETENTION_DAYS = float(os.getenv("ARCHIVE_RETENTION_DAYS", "30"))
+ARCHIVE_MAX_MB = float(os.getenv("ARCHIVE_MAX_MB", "1024"))
+# Segments whose headers / mappings ArchiveReader keeps open
+ARCHIVE_READER_CACHE = int(os.getenv("ARCHIVE_READER_CACHE", "256"))
+ARCHIVE_SEGMENT_SECONDS = float(os.getenv("ARCHIVE_SEGMENT_SECONDS", "3600"))
+ARCHIVE_SEGMENT_ROWS = int(os.getenv("ARCHIVE_SEGMENT_ROWS", "262144"))
+ARCHIVE_SEAL_CHECK_S = float(os.getenv("ARCHIVE_SEAL_CHECK_S", "5"))
+
+# Raw HardwareInput features, in model column order
+FEATURES = ("load_kw", "pf", "voltage_a", "voltage_b", "voltage_c", "current_a", "current_b", "current_c")
+
+KINDS = {
+    "telemetry": {name: "<f4" for name in FEATURES},
+    "faults": {"voltage": "<f4", "current": "<f4", "fault_type": "<u1"},
+}
+HEADER_VERSION = 1
+
+
+class _Buffer:
+    """Rows for the next segment of one kind, appended in chunks."""
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.chunks = []  # (timestamps, (distinct line keys, per-row index), {column: array})
+        self.rows = 0
+        self.t_first = None
+
+    def append(self, timestamps, keys, columns):
+        self.chunks.append((timestamps, keys, columns))
+        self.rows += len(timestamps)
+        if self.t_first is None:
+            self.t_first = float(timestamps.min())
+
+
+class ArchiveWriter:
+    def __init__(self, root=ARCHIVE_DIR, segment_seconds=ARCHIVE_SEGMENT_SECONDS, segment_rows=ARCHIVE_SEGMENT_ROWS,
+                 retention_s=ARCHIVE_RETENTION_DAYS * 86400, max_bytes=ARCHIVE_MAX_MB * 1024 * 1024):
+        self.root = root
+        self.segment_seconds = segment_seconds
+        self.segment_rows = segment_rows
+        self.retention_s = retention_s
+        self.max_bytes = max_bytes
+        self._buffers = {kind: _Buffer(kind) for kind in KINDS}
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._seq = 0
+        self._sealed = []  # full buffers waiting for the background thread
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._worker = None
+        self.segments_written = 0
+        self.rows_written = 0
+        self.bytes_written = 0
+        self.segments_pruned = 0
+        self.bytes_pruned = 0
+        self.errors = 0
+
+    # --- appending ---
+
+    def append_telemetry(self, records, raw, received_at=None):
+        """One ingest batch: records or a FrameBatch (for line ids) + their N x 8 raw matrix."""
+        if not len(records):
+            return
+        received_at = time.time() if received_at is None else received_at
+        raw = np.asarray(raw, dtype=np.float32)
+        columns = {name: raw[:, i] for i, name in enumerate(FEATURES)}
+        self._append("telemetry", np.full(len(records), received_at), line_table(records), columns)
+
+    def append_faults(self, events):
+        """Fault event dicts as produced by the ingest path (timestamp is naive UTC)."""
+        if not events:
+            return
+        timestamps = np.array([e["timestamp"].replace(tzinfo=timezone.utc).timestamp() for e in events])
+        index = {}
+        rows = [index.setdefault((e["substation_id"], e["line_id"]), len(index)) for e in events]
+        keys = (list(index), np.array(rows, dtype=np.intp))
+        columns = {
+            "voltage": np.array([e["voltage"] for e in events], dtype=np.float32),
+            "current": np.array([e["current"] for e in events], dtype=np.float32),
+            "fault_type": [e["fault_type"] for e in events],  # coded when sealed
+        }
+        self._append("faults", timestamps, keys, columns)
+
+    def _append(self, kind, timestamps, keys, columns):
+        sealed = None
+        with self._lock:
+            buffer = self._buffers[kind]
+            buffer.append(timestamps, keys, columns)
+            if buffer.rows >= self.segment_rows or float(timestamps.max()) - buffer.t_first >= self.segment_seconds:
+                sealed, self._buffers[kind] = buffer, _Buffer(kind)
+                if self._worker is not None:
+                    # Keep segment I/O off the ingest path
+                    self._sealed.append(sealed)
+                    self._wake.set()
+                    sealed = None
+        if sealed is not None:
+            self._write(sealed)
+
+    # --- sealing ---
+
+    def seal(self, force=False, now=None):
+        """Seal buffers whose time span is over (or all non-empty ones with force)."""
+        now = time.time() if now is None else now
+        with self._lock:
+            sealed, self._sealed = self._sealed, []
+            for kind, buffer in self._buffers.items():
+                if buffer.rows and (force or now - buffer.t_first >= self.segment_seconds):
+                    sealed.append(buffer)
+                    self._buffers[kind] = _Buffer(kind)
+        for buffer in sealed:
+            self._write(buffer)
+        return len(sealed)
+
+    def _write(self, buffer):
+        timestamps = np.concatenate([c[0] for c in buffer.chunks])
+        order = np.argsort(timestamps, kind="stable")
+        timestamps = timestamps[order]
+
+        # Per-chunk line tables -> one segment table, remapped with an array lookup per chunk
+        segment_lines = list(dict.fromkeys(key for c in buffer.chunks for key in c[1][0]))
+        position = {key: i for i, key in enumerate(segment_lines)}
+        line = np.concatenate([
+            np.array([position[key] for key in lines], dtype=np.uint32)[index] for _, (lines, index), _ in buffer.chunks
+        ])[order]
+
+        columns = {"timestamp": timestamps, "line": line}
+        codes = None
+        for name, dtype in KINDS[buffer.kind].items():
+            if name == "fault_type":
+                values = [v for c in buffer.chunks for v in c[2][name]]
+                codes = list(dict.fromkeys(values))
+                code_index = {v: i for i, v in enumerate(codes)}
+                column = np.fromiter((code_index[v] for v in values), dtype=np.uint8, count=len(values))
+            else:
+                column = np.concatenate([c[2][name] for c in buffer.chunks]).astype(dtype, copy=False)
+            columns[name] = column[order]
+
+        header = {
+            "version": HEADER_VERSION,
+            "kind": buffer.kind,
+            "rows": int(len(timestamps)),
+            "t_min": float(timestamps[0]),
+            "t_max": float(timestamps[-1]),
+            "columns": {name: column.dtype.str for name, column in columns.items()},
+            "lines": [list(k) for k in segment_lines],
+        }
+        if codes is not None:
+            header["fault_types"] = codes
+
+        with self._write_lock:
+            self._seq += 1
+            kind_dir = os.path.join(self.root, buffer.kind)
+            name = f"{header['t_min']:.3f}-{header['t_max']:.3f}-{os.getpid()}-{self._seq}"
+            tmp_dir = os.path.join(kind_dir, f".tmp-{name}")
+            try:
+                os.makedirs(tmp_dir, exist_ok=True)
+                for column_name, column in columns.items():
+                    np.save(os.path.join(tmp_dir, f"{column_name}.npy"), column)
+                with open(os.path.join(tmp_dir, "header.json"), "w") as f:
+                    json.dump(header, f)
+                os.rename(tmp_dir, os.path.join(kind_dir, name))
+            except OSError as e:
+                self.errors += 1
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+                print(f"❌ ARCHIVE SEGMENT WRITE ERROR ({header['rows']} {buffer.kind} rows lost): {e}")
+                return
+            self.segments_written += 1
+            self.rows_written += header["rows"]
+            self.bytes_written += sum(column.nbytes for column in columns.values())
+        self.prune()
+
+    # --- retention ---
+
+    def prune(self, now=None):
+        """Delete the oldest segments past the age / size limits. Returns how many were deleted."""
+        if not self.retention_s and not self.max_bytes:
+            return 0
+        now = time.time() if now is None else now
+        segments = []  # (t_max, path, bytes)
+        for kind in KINDS:
+            kind_dir = os.path.join(self.root, kind)
+            try:
+                names = [n for n in os.listdir(kind_dir) if not n.startswith(".")]
+            except FileNotFoundError:
+                continue
+            for name in names:
+                path = os.path.join(kind_dir, name)
+                try:
+                    t_max = float(name.split("-")[1])
+                    size = sum(entry.stat().st_size for entry in os.scandir(path))
+                except (ValueError, IndexError, OSError):
+                    continue
+                segments.append((t_max, path, size))
+        segments.sort()
+
+        total = sum(size for _, _, size in segments)
+        doomed = []
+        for t_max, path, size in segments:
+            too_old = self.retention_s and t_max < now - self.retention_s
+            too_big = self.max_bytes and total > self.max_bytes
+            if not (too_old or too_big):
+                break
+            doomed.append((path, size))
+            total -= size
+        with self._write_lock:
+            for path, size in doomed:
+                shutil.rmtree(path, ignore_errors=True)
+                self.segments_pruned += 1
+                self.bytes_pruned += size
+        return len(doomed)
+
+    # --- lifecycle ---
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(ARCHIVE_SEAL_CHECK_S)
+            self._wake.clear()
+            try:
+                self.seal()
+            except Exception as e:
+                print(f"❌ ARCHIVE SEAL ERROR: {e}")
+
+    def start(self):
+        if self._worker is None:
+            self.prune()
+            self._stop.clear()
+            self._worker = threading.Thread(target=self._run, name="archive-writer", daemon=True)
+            self._worker.start()
+            atexit.register(self.close)
+
+    def close(self):
+        self._stop.set()
+        self._wake.set()
+        worker, self._worker = self._worker, None
+        if worker is not None:
+            worker.join(timeout=10)
+        self.seal(force=True)
+
+    def stats(self):
+        with self._lock:
+            buffered = {kind: buffer.rows for kind, buffer in self._buffers.items()}
+        return {
+            "root": self.root,
+            "buffered_rows": buffered,
+            "segments_written": self.segments_written,
+            "rows_written": self.rows_written,
+            "bytes_written": self.bytes_written,
+            "segments_pruned": self.segments_pruned,
+            "bytes_pruned": self.bytes_pruned,
+            "errors": self.errors,
+        }
+
+
+class Segment:
+    """One sealed segment; columns are memory-mapped on first use."""
+
+    def __init__(self, path, header):
+        self.path = path
+        self.header = header
+        self.kind = header["kind"]
+        self.rows = header["rows"]
+        self.t_min = header["t_min"]
+        self.t_max = header["t_max"]
+        self.lines = [tuple(k) for k in header["lines"]]
+        self._columns = {}
+
+    def column(self, name):
+        if name not in self._columns:
+            self._columns[name] = np.load(os.path.join(self.path, f"{name}.npy"), mmap_mode="r")
+        return self._columns[name]
+
+    def range(self, start, end):
+        """Row slice [start, end) of the timestamp-sorted columns."""
+        ts = self.column("timestamp")
+        return slice(int(np.searchsorted(ts, start, side="left")), int(np.searchsorted(ts, end, side="left")))
+
+    def line_ids(self, substation_id=None, line_id=None):
+        """Indices into this segment's line table that match the filter (None = all)."""
+        if substation_id is None and line_id is None:
+            return None
+        return np.array([i for i, (s, l) in enumerate(self.lines)
+                         if (substation_id is None or s == substation_id) and (line_id is None or l == line_id)],
+                        dtype=np.uint32)
+
+
+class ArchiveReader:
+    def __init__(self, root=ARCHIVE_DIR, cache_size=ARCHIVE_READER_CACHE):
+        self.root = root
+        self.cache_size = cache_size
+        # path -> Segment, least recently used first; pruned segments drop out on the next listing
+        self._segments = OrderedDict()
+        self._lock = threading.Lock()
+
+    def segments(self, kind, start=-np.inf, end=np.inf):
+        kind_dir = os.path.join(self.root, kind)
+        try:
+            names = sorted(n for n in os.listdir(kind_dir) if not n.startswith("."))
+        except FileNotFoundError:
+            return []
+        found = []
+        with self._lock:
+            listed = {os.path.join(kind_dir, name) for name in names}
+            for path in [p for p in self._segments if os.path.dirname(p) == kind_dir and p not in listed]:
+                del self._segments[path]
+            for name in names:
+                path = os.path.join(kind_dir, name)
+                segment = self._segments.get(path)
+                if segment is None:
+                    try:
+                        with open(os.path.join(path, "header.json")) as f:
+                            segment = self._segments[path] = Segment(path, json.load(f))
+                    except (OSError, ValueError):
+                        continue
+                if segment.t_max >= start and segment.t_min < end:
+                    self._segments.move_to_end(path)
+                    found.append(segment)
+            while len(self._segments) > self.cache_size:
+                self._segments.popitem(last=False)
+        found.sort(key=lambda s: s.t_min)
+        return found
+
+    def chunks(self, kind, start, end, columns, substation_id=None, line_id=None):
+        """
+        Yields (segment, {column: array}) per overlapping segment. Unfiltered
+        columns are zero-copy memory-mapped views; a line filter copies only
+        the matching rows.
+        """
+        for segment in self.segments(kind, start, end):
+            rows = segment.range(start, end)
+            if rows.start >= rows.stop:
+                continue
+            wanted = segment.line_ids(substation_id, line_id)
+            if wanted is not None and not len(wanted):
+                continue
+            data = {name: segment.column(name)[rows] for name in set(columns) | {"line"}}
+            if wanted is not None:
+                mask = np.isin(data["line"], wanted)
+                data = {name: column[mask] for name, column in data.items()}
+            yield segment, data
+
+    def scan(self, kind, start, end, columns, substation_id=None, line_id=None):
+        """Columns over [start, end) concatenated across segments (copies; use chunks() to stay zero-copy)."""
+        parts = [d for _, d in self.chunks(kind, start, end, columns, substation_id, line_id)]
+        return {name: np.concatenate([d[name] for d in parts]) if parts else np.empty(0) for name in columns}
+
+    def aggregate(self, start, end, substation_id=None, line_id=None, features=FEATURES):
+        """Per-line count / min / max / mean / RMS of telemetry features over [start, end)."""
+        totals = {}  # line key -> [count, min, max, sum, sumsq] arrays over features
+        for segment, data in self.chunks("telemetry", start, end, features, substation_id, line_id):
+            line = data["line"].astype(np.intp)
+            n_lines = len(segment.lines)
+            counts = np.bincount(line, minlength=n_lines)
+            present = np.flatnonzero(counts)
+            per_feature = []
+            for name in features:
+                values = data[name].astype(np.float64)
+                mins = np.full(n_lines, np.inf)
+                maxs = np.full(n_lines, -np.inf)
+                np.minimum.at(mins, line, values)
+                np.maximum.at(maxs, line, values)
+                sums = np.bincount(line, weights=values, minlength=n_lines)
+                sumsq = np.bincount(line, weights=values * values, minlength=n_lines)
+                per_feature.append((mins, maxs, sums, sumsq))
+            for i in present.tolist():
+                key = segment.lines[i]
+                stats = np.array([[f[k][i] for f in per_feature] for k in range(4)])
+                if key in totals:
+                    total = totals[key]
+                    total[0] += counts[i]
+                    np.minimum(total[1], stats[0], out=total[1])
+                    np.maximum(total[2], stats[1], out=total[2])
+                    total[3] += stats[2]
+                    total[4] += stats[3]
+                else:
+                    totals[key] = [int(counts[i]), stats[0], stats[1], stats[2].copy(), stats[3].copy()]
+
+        result = []
+        for (sub, line), (count, mins, maxs, sums, sumsq) in sorted(totals.items()):
+            result.append({
+                "substation_id": sub,
+                "line_id": line,
+                "samples": int(count),
+                "features": {
+                    name: {"min": float(mins[j]), "max": float(maxs[j]),
+                           "mean": float(sums[j] / count), "rms": float(np.sqrt(sumsq[j] / count))}
+                    for j, name in enumerate(features)
+                },
+            })
+        return result
+
+    def rescore(self, start, end, predict_fn, build_features, chunk_rows=65536, substation_id=None, line_id=None):
+        """
+        Re-runs a model over archived telemetry. predict_fn(N x 14) -> labels,
+        build_features(N x 8 raw) -> N x 14. Returns label counts and per-line
+        non-Normal counts.
+        """
+        labels_total = {}
+        faults_by_line = {}
+        rows = 0
+        for segment, data in self.chunks("telemetry", start, end, FEATURES, substation_id, line_id):
+            n = len(data["line"])
+            for lo in range(0, n, chunk_rows):
+                hi = min(n, lo + chunk_rows)
+                raw = np.empty((hi - lo, len(FEATURES)), dtype=np.float64)
+                for j, name in enumerate(FEATURES):
+                    raw[:, j] = data[name][lo:hi]
+                labels = np.asarray(predict_fn(build_features(raw)))
+                names, counts = np.unique(labels, return_counts=True)
+                for name, count in zip(names.tolist(), counts.tolist()):
+                    labels_total[name] = labels_total.get(name, 0) + count
+                faulty = data["line"][lo:hi][labels != "Normal"]
+                for i, count in zip(*np.unique(faulty, return_counts=True)):
+                    key = "/".join(segment.lines[int(i)])
+                    faults_by_line[key] = faults_by_line.get(key, 0) + int(count)
+                rows += hi - lo
+        return {"rows": rows, "labels": labels_total, "faults_by_line": faults_by_line}
+
+    def describe(self, kind=None):
+        kinds = [kind] if kind else list(KINDS)
+        return {
+            k: [{"segment": os.path.basename(s.path), "rows": s.rows, "t_min": s.t_min, "t_max": s.t_max,
+                 "lines": len(s.lines)} for s in self.segments(k)]
+            for k in kinds
+        }
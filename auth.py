@@ -1,19 +1,37 @@
+import os
 from passlib.context import CryptContext
 from jose import jwt, JWTError
 from datetime import datetime, timedelta
+from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 import models, database
+from principal_cache import PrincipalCache
+from password_hasher import PasswordHasher, HasherBusy
 
 # SECURITY CONFIG
 SECRET_KEY = "kseb-hackathon-secret-key"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 24 * 60  # 1 Day
+# Authenticated-user cache: repeat requests with the same token skip the users SELECT
+PRINCIPAL_CACHE_ENABLED = os.getenv("AUTH_PRINCIPAL_CACHE", "1") == "1"
+PRINCIPAL_CACHE_SIZE = int(os.getenv("AUTH_PRINCIPAL_CACHE_SIZE", "10000"))
+PRINCIPAL_CACHE_TTL_S = float(os.getenv("AUTH_PRINCIPAL_CACHE_TTL_S", "60"))
+# bcrypt cost; stored hashes with a different cost are re-hashed on the next login
+BCRYPT_ROUNDS = int(os.getenv("AUTH_BCRYPT_ROUNDS", "12"))
+# Dedicated bcrypt threads (0 = half the cores) and how many hashes may be queued or running before /token answers 503
+HASH_WORKERS = int(os.getenv("AUTH_HASH_WORKERS", "0")) or max(1, (os.cpu_count() or 2) // 2)
+HASH_MAX_PENDING = int(os.getenv("AUTH_HASH_MAX_PENDING", "64"))
 
 # Setup Password Hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+hasher = PasswordHasher(pwd_context, HASH_WORKERS, HASH_MAX_PENDING)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+# EventSource cannot set headers, so streams may pass the token as ?access_token=
+oauth2_scheme_optional = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
+
+principal_cache = PrincipalCache(PRINCIPAL_CACHE_SIZE, PRINCIPAL_CACHE_TTL_S)
 
 # --- PASSWORD HELPERS ---
 
@@ -24,6 +42,28 @@ def get_password_hash(password):
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password[:72], hashed_password)
 
+async def hash_password_async(password):
+    """get_password_hash on the bcrypt pool. Raises 503 when the pool is saturated."""
+    if not isinstance(password, str): password = str(password)
+    try:
+        return await hasher.hash(password[:72])
+    except HasherBusy:
+        raise _busy_exception()
+
+async def verify_and_update_async(plain_password, hashed_password):
+    """(matches, new hash or None) on the bcrypt pool; a new hash means the cost changed."""
+    try:
+        return await hasher.verify_and_update(plain_password[:72], hashed_password)
+    except HasherBusy:
+        raise _busy_exception()
+
+def _busy_exception():
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many logins in progress, retry shortly",
+        headers={"Retry-After": "1"},
+    )
+
 # --- TOKEN GENERATION ---
 
 def create_access_token(data: dict):
@@ -34,7 +74,12 @@ def create_access_token(data: dict):
 
 # --- LOGIN DEPENDENCY ---
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_read_db)):
+    if PRINCIPAL_CACHE_ENABLED:
+        user, generation = principal_cache.get(token)
+        if user is not None:
+            return user
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -52,8 +97,33 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     user = db.query(models.User).filter(models.User.userid == userid).first()
     if user is None:
         raise credentials_exception
+    if PRINCIPAL_CACHE_ENABLED:
+        # Detached and fully loaded, so other requests can read it after this session closes
+        db.expunge(user)
+        principal_cache.put(token, user, payload.get("exp", float("inf")), generation)
     return user
 
+def invalidate_principal(userid):
+    """Call after a user's id, password or role changes so cached sessions re-check the database."""
+    principal_cache.invalidate(userid)
+
+def get_stream_user(access_token: Optional[str] = None, token: Optional[str] = Depends(oauth2_scheme_optional)):
+    """
+    Same as get_current_user, but also accepts the token as a query parameter.
+    Uses its own short-lived session so long-lived streams don't pin a pooled connection.
+    """
+    if not (token or access_token):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    db = database.ReadSessionLocal()
+    try:
+        return get_current_user(token or access_token, db)
+    finally:
+        db.close()
+
 # --- ROLE CHECKER ---
 
 def require_admin(user: models.User = Depends(get_current_user)):
@@ -0,0 +1,65 @@
+"""
+Shared input generators for the offline scripts in this folder.
+Run every script from the repo root, e.g. `python benchmarks/compiled_forest_agreement.py`.
+"""
+import contextlib
+import importlib.util
+import io
+import os
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+FEATURES = [
+    "Load_KW", "PF",
+    "Va", "Vb", "Vc",
+    "Ia", "Ib", "Ic",
+    "Dev_Va", "Dev_Vb", "Dev_Vc",
+    "Dev_Ia", "Dev_Ib", "Dev_Ic"
+]
+
+
+def load_training_module():
+    """Imports `ML model.py` (the file name has a space, so no plain import)."""
+    path = os.path.join(REPO_DIR, "ML model.py")
+    spec = importlib.util.spec_from_file_location("ml_model", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def training_dataset(samples=5000, seed=0):
+    """
+    Fresh draw from the training distribution.
+    Returns (X as N x 14 float64 matrix, y as label array).
+    """
+    import numpy as np
+
+    ml_model = load_training_module()
+    ml_model.SAMPLES = samples
+    np.random.seed(seed)
+    with contextlib.redirect_stdout(io.StringIO()):
+        df = ml_model.generate_robust_dataset()
+    return df[FEATURES].to_numpy(dtype=np.float64), df["Fault"].to_numpy()
+
+
+def simulation_dataset(samples_per_scenario=1000, seed=0, scenarios=None):
+    """
+    Payload dicts from simulation.generate_sample for every scenario.
+    Returns (list of schemas.HardwareInput, list of scenario names).
+    """
+    import random
+
+    import schemas
+    import simulation
+
+    rng = random.Random(seed)
+    scenarios = scenarios or list(dict.fromkeys(simulation.SCENARIOS))
+    records, names = [], []
+    for scenario in scenarios:
+        for _ in range(samples_per_scenario):
+            records.append(schemas.HardwareInput(**simulation.generate_sample(scenario, rng)))
+            names.append(scenario)
+    return records, names
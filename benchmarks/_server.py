@@ -0,0 +1,79 @@
+"""
+Runs the API under uvicorn in a scratch directory (fresh grid.db) for the
+HTTP benchmarks in this folder, and logs in an officer for protected routes.
+"""
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import requests
+
+from _datasets import REPO_DIR
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class ApiServer:
+    def __init__(self, env=None, workers=1):
+        self.env = dict(os.environ, PYTHONPATH=REPO_DIR, **(env or {}))
+        self.workers = workers
+        self.port = free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self._tmp = None
+        self._proc = None
+
+    def __enter__(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self._proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(self.port),
+             "--workers", str(self.workers), "--log-level", "warning"],
+            cwd=self._tmp.name, env=self.env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        deadline = time.time() + 60
+        while time.time() < deadline:
+            try:
+                requests.get(f"{self.url}/docs", timeout=1)
+                return self
+            except requests.RequestException:
+                time.sleep(0.2)
+        self.__exit__(None, None, None)
+        raise RuntimeError("API server did not start")
+
+    def __exit__(self, *exc):
+        if self._proc is not None:
+            self._proc.terminate()
+            self._proc.wait(timeout=30)
+        if self._tmp is not None:
+            self._tmp.cleanup()
+
+    def login(self):
+        """Creates a temporary officer and returns Authorization headers."""
+        creds = requests.post(f"{self.url}/admin/create-temp-credentials", json={"role": "officer"}).json()
+        token = requests.post(f"{self.url}/token", data={
+            "username": creds["userid"], "password": creds["password"],
+        }).json()["access_token"]
+        return {"Authorization": f"Bearer {token}"}
+
+
+def percentiles(samples_ms):
+    """p50 / p95 / p99 / max of a list of latencies in ms."""
+    import numpy as np
+
+    if not samples_ms:
+        return {"count": 0}
+    values = np.asarray(samples_ms)
+    return {
+        "count": len(values),
+        "p50_ms": float(np.percentile(values, 50)),
+        "p95_ms": float(np.percentile(values, 95)),
+        "p99_ms": float(np.percentile(values, 99)),
+        "max_ms": float(values.max()),
+    }
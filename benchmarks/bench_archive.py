@@ -0,0 +1,165 @@
+"""
+Columnar archive (archive.py) vs SQLite rows for long-range analytics.
+
+Writes --rows synthetic telemetry samples (--lines lines, one batch per
+simulated second) into archive segments, then times:
+  - per-line aggregate (min/max/mean/RMS of 8 features) over everything,
+    from memory-mapped segments
+  - the same aggregate over the first --sqlite-rows samples stored as rows
+    in SQLite, once as a SQL GROUP BY and once fetched through the ORM
+    style row path and aggregated in Python
+  - a one-hour, one-line range scan
+  - re-scoring --rescore-rows samples with the primary fault model
+Throughputs are reported in rows/s so the different sizes compare.
+
+Usage: python benchmarks/bench_archive.py [--rows 5000000 --lines 100 --sqlite-rows 500000] [--json out.json]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+from sqlalchemy import Column, Float, Integer, MetaData, String, Table, create_engine, func, insert, select
+
+import _datasets  # noqa: F401  (puts the repo on sys.path)
+
+import archive
+
+
+class _Rec:
+    __slots__ = ("substation_id", "line_id")
+
+    def __init__(self, substation_id, line_id):
+        self.substation_id = substation_id
+        self.line_id = line_id
+
+
+def synthetic_batches(rows, lines, seed=0):
+    rng = np.random.default_rng(seed)
+    records = [_Rec(f"SUB-{n % 4:02d}", f"LINE-{n:03d}") for n in range(lines)]
+    base = np.array([20.0, 0.9, 230.0, 230.0, 230.0, 30.0, 30.0, 30.0])
+    t0 = 1_700_000_000.0
+    for tick in range(rows // lines):
+        raw = base + rng.normal(0, 1, size=(lines, 8)) * np.array([5, 0.05, 3, 3, 3, 4, 4, 4])
+        yield records, raw, t0 + tick
+
+
+def sqlite_baseline(path, batches, limit):
+    engine = create_engine(f"sqlite:///{path}")
+    meta = MetaData()
+    table = Table("raw_samples", meta, Column("id", Integer, primary_key=True), Column("ts", Float),
+                  Column("substation_id", String), Column("line_id", String),
+                  *[Column(name, Float) for name in archive.FEATURES])
+    meta.create_all(engine)
+    loaded = 0
+    with engine.begin() as conn:
+        for records, raw, ts in batches:
+            conn.execute(insert(table), [
+                {"ts": ts, "substation_id": r.substation_id, "line_id": r.line_id,
+                 **dict(zip(archive.FEATURES, row))} for r, row in zip(records, raw.tolist())
+            ])
+            loaded += len(records)
+            if loaded >= limit:
+                break
+
+    with engine.connect() as conn:
+        started = time.perf_counter()
+        cols = [table.c.substation_id, table.c.line_id, func.count()]
+        for name in archive.FEATURES:
+            c = table.c[name]
+            cols += [func.min(c), func.max(c), func.avg(c), func.avg(c * c)]
+        conn.execute(select(*cols).group_by(table.c.substation_id, table.c.line_id)).all()
+        sql_s = time.perf_counter() - started
+
+        started = time.perf_counter()
+        totals = {}
+        for row in conn.execute(select(table)):
+            key = (row.substation_id, row.line_id)
+            values = [getattr(row, name) for name in archive.FEATURES]
+            t = totals.get(key)
+            if t is None:
+                totals[key] = [1, list(values), list(values), list(values), [v * v for v in values]]
+            else:
+                t[0] += 1
+                for j, v in enumerate(values):
+                    t[1][j] = min(t[1][j], v)
+                    t[2][j] = max(t[2][j], v)
+                    t[3][j] += v
+                    t[4][j] += v * v
+        rows_s = time.perf_counter() - started
+    engine.dispose()
+    return loaded, sql_s, rows_s
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    parser.add_argument("--lines", type=int, default=100)
+    parser.add_argument("--sqlite-rows", type=int, default=500_000)
+    parser.add_argument("--rescore-rows", type=int, default=200_000)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.join(tmp, "archive")
+        writer = archive.ArchiveWriter(root, retention_s=0, max_bytes=0)  # keep every synthetic segment
+        started = time.perf_counter()
+        for records, raw, ts in synthetic_batches(args.rows, args.lines):
+            writer.append_telemetry(records, raw, ts)
+        writer.close()
+        write_s = time.perf_counter() - started
+        stats = writer.stats()
+
+        reader = archive.ArchiveReader(root)
+        t_min = reader.segments("telemetry")[0].t_min
+        t_max = reader.segments("telemetry")[-1].t_max
+
+        started = time.perf_counter()
+        agg = reader.aggregate(t_min, t_max + 1)
+        agg_s = time.perf_counter() - started
+        rows = sum(line["samples"] for line in agg)
+
+        started = time.perf_counter()
+        window = reader.scan("telemetry", t_min + 3600, t_min + 7200, ["timestamp", "current_a"], "SUB-00", "LINE-000")
+        scan_ms = (time.perf_counter() - started) * 1000
+
+        import ai_engine
+        rescore_end = t_min + args.rescore_rows / args.lines
+        started = time.perf_counter()
+        model = ai_engine.registry.primary
+        rescored = reader.rescore(t_min, rescore_end, lambda X: ai_engine.predict_with(model, X),
+                                  lambda raw: ai_engine.build_feature_matrix(None, raw))
+        rescore_s = time.perf_counter() - started
+
+        sqlite_rows, sql_s, orm_s = sqlite_baseline(
+            os.path.join(tmp, "raw.db"), synthetic_batches(args.rows, args.lines), args.sqlite_rows)
+
+    result = {
+        "rows": rows,
+        "segments": stats["segments_written"],
+        "archive_mb": stats["bytes_written"] / 1e6,
+        "write_rows_per_s": args.rows / write_s,
+        "archive_aggregate_rows_per_s": rows / agg_s,
+        "sqlite_group_by_rows_per_s": sqlite_rows / sql_s,
+        "sqlite_row_fetch_rows_per_s": sqlite_rows / orm_s,
+        "one_hour_one_line_scan_ms": scan_ms,
+        "one_hour_one_line_rows": int(len(window["timestamp"])),
+        "rescore_rows_per_s": rescored["rows"] / rescore_s,
+    }
+    print(f"archive: {rows} rows in {result['segments']} segments ({result['archive_mb']:.0f} MB), "
+          f"written at {result['write_rows_per_s']:,.0f} rows/s")
+    print(f"aggregate: archive {result['archive_aggregate_rows_per_s']:,.0f} rows/s | "
+          f"SQLite GROUP BY {result['sqlite_group_by_rows_per_s']:,.0f} rows/s | "
+          f"SQLite row fetch {result['sqlite_row_fetch_rows_per_s']:,.0f} rows/s")
+    print(f"1 h / 1 line scan: {result['one_hour_one_line_rows']} rows in {scan_ms:.1f} ms; "
+          f"rescore {result['rescore_rows_per_s']:,.0f} rows/s")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
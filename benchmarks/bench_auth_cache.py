@@ -0,0 +1,89 @@
+"""
+Per-request auth overhead with the principal cache (auth.principal_cache)
+on and off.
+
+Starts the API twice (AUTH_PRINCIPAL_CACHE=1 / 0), logs in --users officers
+and has --clients threads poll GET /api/dashboard (an in-memory read, so
+auth dominates) with those tokens for --seconds. Reports throughput,
+latency percentiles and the server's cache hit rate, then checks that a
+token stops working as soon as /register renames its user.
+
+Usage: python benchmarks/bench_auth_cache.py [--clients 8 --users 4 --seconds 10] [--json out.json]
+"""
+import argparse
+import json
+import threading
+import time
+
+import requests
+
+from _server import ApiServer, percentiles
+
+
+def poll(server, headers, seconds, latencies, errors):
+    session = requests.Session()
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        r = session.get(f"{server.url}/api/dashboard", headers=headers)
+        latencies.append((time.perf_counter() - started) * 1000)
+        if r.status_code != 200:
+            errors.append(r.status_code)
+
+
+def register_revokes(server, headers):
+    """Old token must be rejected right after /register changes the user id."""
+    requests.get(f"{server.url}/api/dashboard", headers=headers)  # warm the cache
+    r = requests.post(f"{server.url}/register", headers=headers, json={
+        "first_name": "Bench", "last_name": "User", "phone_number": "0000000000", "email": "bench@example.com",
+        "substation_id": "SUB-00", "substation_location": "Bench", "new_userid": f"BENCH-{server.port}",
+        "new_password": "bench-pass",
+    })
+    return r.status_code == 200 and requests.get(f"{server.url}/api/dashboard", headers=headers).status_code == 401
+
+
+def run(enabled, args):
+    with ApiServer({"AUTH_PRINCIPAL_CACHE": "1" if enabled else "0"}) as server:
+        tokens = [server.login() for _ in range(args.users)]
+        latencies, errors = [], []
+        threads = [threading.Thread(target=poll, args=(server, tokens[n % len(tokens)], args.seconds, latencies, errors))
+                   for n in range(args.clients)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        admin = server.login()
+        cache = requests.get(f"{server.url}/api/metrics", headers=admin).json()["auth"]
+        revoked = register_revokes(server, tokens[0])
+    return {
+        "cache": enabled,
+        "requests_per_s": len(latencies) / args.seconds,
+        "errors": len(errors),
+        "latency": percentiles(latencies),
+        "hit_rate": cache["hit_rate"],
+        "old_token_rejected_after_register": revoked,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--users", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    results = [run(False, args), run(True, args)]
+    for r in results:
+        lat = r["latency"]
+        print(f"cache {'on ' if r['cache'] else 'off'}: {r['requests_per_s']:.0f} req/s, "
+              f"p50 {lat['p50_ms']:.2f} ms, p99 {lat['p99_ms']:.2f} ms, hit rate {r['hit_rate']:.3f}, "
+              f"errors {r['errors']}, old token rejected after /register: {r['old_token_rejected_after_register']}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
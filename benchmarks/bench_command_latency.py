@@ -0,0 +1,131 @@
+"""
+Manual command latency: time from POST /api/control/{action} until the
+target device has the command, for devices holding the long-poll open
+(GET /hardware/commands/{sub}/{line}) vs devices that only see commands
+piggybacked on their periodic /hardware/data heartbeat.
+
+Every device acks what it receives; the server-side issue-to-delivery and
+issue-to-ack trackers from /api/metrics are reported alongside the
+client-side numbers. Also checks that no command reached the wrong line.
+A command issued before the line's previous one was delivered supersedes it
+(command_queue.py), so "received" plus "superseded" adds up to "issued".
+
+Usage: python benchmarks/bench_command_latency.py [--lines 20 --commands 200 --heartbeat-s 2] [--json out.json]
+"""
+import argparse
+import json
+import random
+import threading
+import time
+
+import requests
+
+from _server import ApiServer, percentiles
+
+import simulation
+
+
+def run_mode(mode, args):
+    with ApiServer() as server:
+        headers = server.login()
+        lines = [(f"SUB-{n % 4:02d}", f"LINE-{n:03d}") for n in range(args.lines)]
+        stop = threading.Event()
+        received = {}  # command_id -> (receive time, line it arrived on)
+        lock = threading.Lock()
+
+        def on_command(command_id, key):
+            with lock:
+                received[command_id] = (time.perf_counter(), key)
+            requests.post(f"{server.url}/hardware/commands/{command_id}/ack",
+                          params={"substation_id": key[0], "line_id": key[1]})
+
+        def long_poll_device(key):
+            session = requests.Session()
+            while not stop.is_set():
+                resp = session.get(f"{server.url}/hardware/commands/{key[0]}/{key[1]}", params={"timeout": 1})
+                for cmd in resp.json()["commands"]:
+                    on_command(cmd["command_id"], key)
+
+        def heartbeat_device(key, seed):
+            rng = random.Random(seed)
+            session = requests.Session()
+            time.sleep(rng.uniform(0, args.heartbeat_s))
+            while not stop.is_set():
+                payload = dict(simulation.generate_sample("NORMAL", rng), substation_id=key[0], line_id=key[1])
+                data = session.post(f"{server.url}/hardware/data", json=payload).json()
+                if data.get("command_id"):
+                    on_command(data["command_id"], key)
+                stop.wait(args.heartbeat_s)
+
+        # Every line reports once so commands can target it
+        for key in lines:
+            requests.post(f"{server.url}/hardware/data",
+                          json=dict(simulation.generate_sample("NORMAL"), substation_id=key[0], line_id=key[1]))
+
+        if mode == "longpoll":
+            devices = [threading.Thread(target=long_poll_device, args=(key,)) for key in lines]
+        else:
+            devices = [threading.Thread(target=heartbeat_device, args=(key, i)) for i, key in enumerate(lines)]
+        for t in devices:
+            t.start()
+        time.sleep(0.5)
+
+        issued = {}  # command_id -> (issue time, target line)
+        rng = random.Random(0)
+        for _ in range(args.commands):
+            key = rng.choice(lines)
+            started = time.perf_counter()
+            resp = requests.post(f"{server.url}/api/control/{rng.choice(['TRIP', 'RESET'])}",
+                                 params={"substation_id": key[0], "line_id": key[1]}, headers=headers).json()
+            issued[resp["command_id"]] = (started, key)
+            time.sleep(args.interval_s)
+
+        deadline = time.time() + args.heartbeat_s * 2 + 2
+        while time.time() < deadline:
+            superseded = requests.get(f"{server.url}/api/metrics", headers=headers).json()["commands"]["superseded"]
+            with lock:
+                if len(received) + superseded >= len(issued):
+                    break
+            time.sleep(0.1)
+        stop.set()
+        for t in devices:
+            t.join()
+        metrics = requests.get(f"{server.url}/api/metrics", headers=headers).json()["commands"]
+
+    latencies = [(received[cid][0] - t0) * 1000 for cid, (t0, _) in issued.items() if cid in received]
+    return {
+        "mode": mode,
+        "issued": len(issued),
+        "received": len(latencies),
+        "wrong_line": sum(1 for cid, (_, key) in issued.items() if cid in received and received[cid][1] != key),
+        "latency": percentiles(latencies),
+        "server": metrics,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lines", type=int, default=20)
+    parser.add_argument("--commands", type=int, default=200)
+    parser.add_argument("--interval-s", type=float, default=0.02, help="pause between issued commands")
+    parser.add_argument("--heartbeat-s", type=float, default=2, help="heartbeat period in heartbeat mode")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    results = [run_mode(mode, args) for mode in ("longpoll", "heartbeat")]
+
+    for r in results:
+        lat = r["latency"]
+        ack = r["server"]["issue_to_ack"]
+        print(f"{r['mode']:<10} received {r['received']}/{r['issued']} (superseded {r['server']['superseded']})  "
+              f"wrong line {r['wrong_line']}  "
+              f"p50={lat.get('p50_ms', 0):.1f}ms p99={lat.get('p99_ms', 0):.1f}ms  "
+              f"server ack p50={ack.get('p50_ms', 0):.1f}ms  redelivered={r['server']['redelivered']}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Consumer meter readings: one request per reading (/api/consumer/reading) vs
+one batch (/api/consumer/readings/batch).
+
+Seeds --meters consumers straight into the server's scratch database, then
+sends the same reading stream (--per-meter readings per meter, about a
+third above the trip threshold, some low voltages, a few unknown meters)
+twice, each to its own copy of the meters: singly for the first
+--single-sample readings, and in batches of --batch for everything.
+Checks that both paths leave identical trip counts / voltages for the
+meters they both saw and reports readings/s.
+
+Usage: python benchmarks/bench_consumer_batch.py [--meters 10000 --batch 10000] [--json out.json]
+"""
+import argparse
+import json
+import os
+import random
+import time
+
+import requests
+from sqlalchemy import create_engine, insert, select
+
+from _server import ApiServer
+
+import models
+
+
+def readings_for(meters, per_meter, prefix, seed=0):
+    rng = random.Random(seed)
+    out = []
+    for _ in range(per_meter):
+        for n in range(meters):
+            out.append({
+                "meter_id": f"{prefix}-{n:06d}" if rng.random() > 0.001 else f"{prefix}-UNKNOWN-{n}",
+                "power_kw": rng.choice([2.0, 3.5, 4.0, 6.5, 7.0, 1.0]),
+                "voltage": rng.choice([230.0, 228.0, 231.0, 120.0, 170.0, 232.0, 229.0, 233.0]),
+                "power_factor": round(rng.uniform(0.8, 1.0), 3),
+            })
+    rng.shuffle(out)
+    return out
+
+
+def registered_officer(server):
+    headers = server.login()
+    r = requests.post(f"{server.url}/register", headers=headers, json={
+        "first_name": "Bench", "last_name": "User", "phone_number": "0", "email": "bench@example.com",
+        "substation_id": "SUB-01", "substation_location": "Bench", "new_userid": "BENCH", "new_password": "bench-pass",
+    })
+    r.raise_for_status()
+    token = requests.post(f"{server.url}/token", data={"username": "BENCH", "password": "bench-pass"}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--meters", type=int, default=10000)
+    parser.add_argument("--per-meter", type=int, default=2)
+    parser.add_argument("--batch", type=int, default=10000)
+    parser.add_argument("--single-sample", type=int, default=2000)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    # Readings reach the database through the meter index's write-behind flush
+    with ApiServer({"METER_FLUSH_MS": "100"}) as server:
+        headers = registered_officer(server)
+        engine = create_engine(f"sqlite:///{os.path.join(server._tmp.name, 'grid.db')}")
+        with engine.begin() as conn:
+            for prefix in ("SINGLE", "BATCH"):
+                conn.execute(insert(models.Consumer.__table__), [
+                    {"meter_id": f"{prefix}-{n:06d}", "substation_id": "SUB-01", "trip_count": 0,
+                     "voltage": 0.0, "power_factor": 0.0} for n in range(args.meters)
+                ])
+
+        single = readings_for(args.meters, args.per_meter, "SINGLE")[:args.single_sample]
+        session = requests.Session()
+        started = time.perf_counter()
+        for reading in single:
+            session.post(f"{server.url}/api/consumer/reading", json=reading, headers=headers)
+        single_s = time.perf_counter() - started
+
+        batched = readings_for(args.meters, args.per_meter, "BATCH")
+        started = time.perf_counter()
+        summary = {"recorded": 0, "unknown_meters": 0, "trips": 0}
+        for i in range(0, len(batched), args.batch):
+            r = session.post(f"{server.url}/api/consumer/readings/batch", json=batched[i:i + args.batch], headers=headers)
+            r.raise_for_status()
+            for key in summary:
+                summary[key] += r.json()[key]
+        batch_s = time.perf_counter() - started
+
+        # Replay the single-path prefix through the batch path on fresh meters and compare end states
+        with engine.begin() as conn:
+            conn.execute(insert(models.Consumer.__table__), [
+                {"meter_id": f"CHECK-{n:06d}", "substation_id": "SUB-01", "trip_count": 0, "voltage": 0.0,
+                 "power_factor": 0.0} for n in range(args.meters)
+            ])
+        check = [dict(r, meter_id=r["meter_id"].replace("SINGLE", "CHECK", 1)) for r in single]
+        session.post(f"{server.url}/api/consumer/readings/batch", json=check, headers=headers).raise_for_status()
+        time.sleep(1)
+        table = models.Consumer.__table__
+        with engine.connect() as conn:
+            state = {m: (t, v, pf) for m, t, v, pf in conn.execute(
+                select(table.c.meter_id, table.c.trip_count, table.c.voltage, table.c.power_factor))}
+        engine.dispose()
+        mismatches = sum(1 for n in range(args.meters)
+                         if state[f"SINGLE-{n:06d}"] != state[f"CHECK-{n:06d}"])
+
+    result = {
+        "single_readings_per_s": len(single) / single_s,
+        "batch_readings_per_s": len(batched) / batch_s,
+        "batch_size": args.batch,
+        "batch_readings": len(batched),
+        **summary,
+        "state_mismatches": mismatches,
+    }
+    print(f"single: {result['single_readings_per_s']:.0f} readings/s ({len(single)} readings)")
+    print(f"batch of {args.batch}: {result['batch_readings_per_s']:.0f} readings/s ({len(batched)} readings, "
+          f"{summary['recorded']} recorded, {summary['unknown_meters']} unknown, {summary['trips']} trips)")
+    print(f"end state single vs batch path: {mismatches} mismatching meters")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+Dashboard fan-out: hundreds of dashboards following live grid state, either
+streaming /api/stream/dashboard (SSE) or polling /api/dashboard at the same
+rate, while a feeder posts telemetry batches for a set of lines.
+
+Reports per mode: updates received, staleness (receive time minus the
+line's last_updated), server CPU seconds and, for streaming, how many
+deliberately slow clients (small receive buffer, never read) the server
+dropped. Clients are raw asyncio HTTP/1.1 connections so a few hundred fit
+in one process.
+
+Usage: python benchmarks/bench_dashboard_stream.py [--clients 300 --slow 20 --seconds 15 --hz 2 --lines 50] [--json out.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import threading
+import time
+from datetime import datetime
+
+import requests
+
+from _server import ApiServer, percentiles
+
+import simulation
+
+
+def server_cpu_seconds(pid):
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def staleness_ms(lines, received):
+    return [
+        (received - datetime.fromisoformat(line["last_updated"]).timestamp()) * 1000
+        for line in lines if line.get("last_updated")
+    ]
+
+
+def feeder(url, lines, rate_hz, stop, fault_ratio, seed=0):
+    """Posts one batch per tick containing a reading for every line."""
+    rng = random.Random(seed)
+    session = requests.Session()
+    interval = 1.0 / rate_hz
+    while not stop.is_set():
+        started = time.perf_counter()
+        batch = []
+        for n in range(lines):
+            scenario = "SLG" if rng.random() < fault_ratio else "NORMAL"
+            batch.append(dict(simulation.generate_sample(scenario, rng), substation_id=f"SUB-{n % 5:02d}", line_id=f"LINE-{n:03d}"))
+        session.post(f"{url}/hardware/data/batch", json=batch)
+        time.sleep(max(0.0, interval - (time.perf_counter() - started)))
+
+
+async def open_http(port, path, token, rcvbuf=None):
+    sock = socket.socket()
+    if rcvbuf:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+    sock.setblocking(False)
+    await asyncio.get_running_loop().sock_connect(sock, ("127.0.0.1", port))
+    reader, writer = await asyncio.open_connection(sock=sock, limit=1 << 22)
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\nAuthorization: Bearer {token}\r\n\r\n".encode())
+    await writer.drain()
+    return reader, writer
+
+
+async def read_response(reader):
+    """(status, body) of one keep-alive Content-Length response."""
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode().partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    return status, await reader.readexactly(length)
+
+
+async def stream_client(port, token, deadline, result):
+    reader, writer = await open_http(port, "/api/stream/dashboard", token)
+    event = None
+    try:
+        while time.time() < deadline:
+            try:
+                line = await asyncio.wait_for(reader.readline(), timeout=max(0.01, deadline - time.time()))
+            except asyncio.TimeoutError:
+                break
+            if not line:
+                break
+            line = line.decode().rstrip("\r\n")
+            if line.startswith("event: "):
+                event = line[7:]
+            elif line.startswith("data: ") and event:
+                payload = json.loads(line[6:])
+                result["events"][event] = result["events"].get(event, 0) + 1
+                if event == "lines":
+                    result["staleness"].extend(staleness_ms(payload["lines"], time.time()))
+                if event == "overflow":
+                    break
+    finally:
+        writer.close()
+
+
+async def slow_client(port, token, deadline):
+    _, writer = await open_http(port, "/api/stream/dashboard", token, rcvbuf=4096)
+    await asyncio.sleep(max(0.0, deadline - time.time()))
+    writer.close()
+
+
+async def poll_client(port, token, deadline, interval, result):
+    reader, writer = await open_http(port, "/api/dashboard", token)
+    try:
+        while True:
+            status, body = await read_response(reader)
+            received = time.time()
+            key = "poll" if status == 200 else f"poll_{status}"
+            result["events"][key] = result["events"].get(key, 0) + 1
+            if status == 200:
+                result["staleness"].extend(staleness_ms(json.loads(body)["lines"], received))
+            await asyncio.sleep(interval * random.uniform(0.9, 1.1))
+            if time.time() >= deadline:
+                break
+            writer.write(f"GET /api/dashboard HTTP/1.1\r\nHost: localhost\r\nAuthorization: Bearer {token}\r\n\r\n".encode())
+            await writer.drain()
+    finally:
+        writer.close()
+
+
+async def run_clients(mode, port, token, args):
+    deadline = time.time() + args.seconds
+    result = {"events": {}, "staleness": []}
+    tasks = []
+    for _ in range(args.clients):
+        if mode == "stream":
+            tasks.append(stream_client(port, token, deadline, result))
+        else:
+            tasks.append(poll_client(port, token, deadline, 1.0 / args.hz, result))
+    if mode == "stream":
+        tasks += [slow_client(port, token, deadline) for _ in range(args.slow)]
+    for err in await asyncio.gather(*tasks, return_exceptions=True):
+        if isinstance(err, Exception):
+            result["errors"] = result.get("errors", 0) + 1
+            result["last_error"] = repr(err)
+    return result
+
+
+def run_mode(mode, args):
+    env = {"DASHBOARD_STREAM_MAX_HZ": str(args.hz), "DASHBOARD_STREAM_FAULT_QUEUE": str(args.fault_queue)}
+    with ApiServer(env) as server:
+        token = server.login()["Authorization"].split(" ", 1)[1]
+        stop = threading.Event()
+        feed = threading.Thread(target=feeder, args=(server.url, args.lines, args.feed_hz, stop, args.fault_ratio))
+        feed.start()
+        cpu_before = server_cpu_seconds(server._proc.pid)
+        result = asyncio.run(run_clients(mode, server.port, token, args))
+        cpu = server_cpu_seconds(server._proc.pid) - cpu_before
+        metrics = requests.get(f"{server.url}/api/metrics", headers={"Authorization": f"Bearer {token}"}).json()
+        stop.set()
+        feed.join()
+
+    return {
+        "mode": mode,
+        "clients": args.clients,
+        "events": result["events"],
+        "errors": result.get("errors", 0),
+        "last_error": result.get("last_error"),
+        "staleness": percentiles(result["staleness"]),
+        "server_cpu_s": cpu,
+        "stream_stats": metrics.get("dashboard_stream") if mode == "stream" else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=300)
+    parser.add_argument("--slow", type=int, default=20, help="stream clients that never read")
+    parser.add_argument("--seconds", type=float, default=15)
+    parser.add_argument("--hz", type=float, default=2, help="max stream rate / poll rate per client")
+    parser.add_argument("--lines", type=int, default=50)
+    parser.add_argument("--feed-hz", type=float, default=10, help="telemetry batches per second")
+    parser.add_argument("--fault-ratio", type=float, default=0.02)
+    parser.add_argument("--fault-queue", type=int, default=100)
+    parser.add_argument("--modes", default="stream,poll")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    results = [run_mode(mode, args) for mode in args.modes.split(",")]
+
+    for r in results:
+        s = r["staleness"]
+        print(f"{r['mode']:<7} clients={r['clients']} events={r['events']} errors={r['errors']} {r['last_error'] or ''} server_cpu={r['server_cpu_s']:.1f}s "
+              f"staleness p50={s.get('p50_ms', 0):.0f}ms p99={s.get('p99_ms', 0):.0f}ms")
+        if r["stream_stats"]:
+            print(f"        stream: {r['stream_stats']}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
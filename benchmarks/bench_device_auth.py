@@ -0,0 +1,108 @@
+"""
+Cost of device HMAC authentication (device_auth.py) on /hardware/data.
+
+1. In-process, per request: DeviceVerifier.verify on a typical JSON sample,
+   vs the officer path (JWT decode + users SELECT on a scratch SQLite db).
+2. End to end: the same signed samples posted with DeviceSigner to a server
+   with DEVICE_AUTH_MODE=off and =enforce; reports latency and rejections
+   (must be 0), then replays one captured request (must be 401).
+
+Usage: python benchmarks/bench_device_auth.py [--requests 2000] [--json out.json]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import requests
+from jose import jwt
+from sqlalchemy.orm import sessionmaker
+
+from _server import ApiServer, percentiles
+
+import auth
+import database
+import device_auth
+import models
+
+SAMPLE = {"substation_id": "SUB-01", "line_id": "LINE-001", "load_kw": 20.0, "pf": 0.9, "voltage_a": 230.0,
+          "voltage_b": 230.0, "voltage_c": 230.0, "current_a": 30.0, "current_b": 30.0, "current_c": 30.0}
+
+
+def in_process(n, tmp):
+    keys = os.path.join(tmp, "keys.json")
+    with open(keys, "w") as f:
+        json.dump({f"dev-{i}": f"secret-{i}" for i in range(1000)}, f)
+    verifier = device_auth.DeviceVerifier(keys, mode="enforce")
+    body = json.dumps(SAMPLE).encode()
+    signed = []
+    for counter in range(1, n + 1):
+        signed.append((str(counter), device_auth.signature(b"secret-7", "dev-7", counter, "POST", "/hardware/data", body)))
+
+    started = time.perf_counter()
+    for counter, sig in signed:
+        assert verifier.verify("dev-7", counter, sig, "POST", "/hardware/data", body) is None
+    hmac_us = (time.perf_counter() - started) / n * 1e6
+
+    writer, _ = database.create_engines(f"sqlite:///{os.path.join(tmp, 'grid.db')}", "tuned")
+    models.Base.metadata.create_all(bind=writer)
+    Session = sessionmaker(bind=writer)
+    db = Session()
+    db.add(models.User(userid="OFFICER-1", hashed_password="x", role="officer"))
+    db.commit()
+    db.close()
+    token = auth.create_access_token({"sub": "OFFICER-1"})
+    started = time.perf_counter()
+    for _ in range(n):
+        userid = jwt.decode(token, auth.SECRET_KEY, algorithms=[auth.ALGORITHM])["sub"]
+        db = Session()
+        db.query(models.User).filter(models.User.userid == userid).first()
+        db.close()
+    jwt_us = (time.perf_counter() - started) / n * 1e6
+    writer.dispose()
+    return {"hmac_verify_us": hmac_us, "jwt_plus_db_us": jwt_us}
+
+
+def end_to_end(mode, n, tmp):
+    keys = os.path.join(tmp, "keys.json")
+    with open(keys, "w") as f:
+        json.dump({"bench-device": "bench-secret"}, f)
+    signer = device_auth.DeviceSigner("bench-device", "bench-secret")
+    with ApiServer({"DEVICE_AUTH_MODE": mode, "DEVICE_KEYS_FILE": keys}) as server:
+        session = requests.Session()
+        latencies, failures = [], 0
+        for _ in range(n):
+            started = time.perf_counter()
+            r = session.post(f"{server.url}/hardware/data", json=SAMPLE, auth=signer)
+            latencies.append((time.perf_counter() - started) * 1000)
+            failures += r.status_code != 200
+        # Replay the last request byte for byte
+        replay = session.send(r.request).status_code
+        headers = server.login()
+        stats = requests.get(f"{server.url}/api/metrics", headers=headers).json()["device_auth"]
+    return {"mode": mode, "latency": percentiles(latencies), "failures": failures, "replay_status": replay, "server": stats}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cost = in_process(args.requests, tmp)
+        print(f"per request: HMAC verify {cost['hmac_verify_us']:.1f} us vs JWT decode + users SELECT {cost['jwt_plus_db_us']:.1f} us")
+        runs = [end_to_end(mode, args.requests, tmp) for mode in ("off", "enforce")]
+    for r in runs:
+        lat = r["latency"]
+        print(f"/hardware/data auth {r['mode']:<7}: p50 {lat['p50_ms']:.2f} ms, p99 {lat['p99_ms']:.2f} ms, "
+              f"{r['failures']} failures, replay -> {r['replay_status']}, server rejected {r['server']['rejected']}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"in_process": cost, "end_to_end": runs}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
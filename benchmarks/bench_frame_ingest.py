@@ -0,0 +1,138 @@
+"""
+Binary telemetry frames vs JSON on the ingest path.
+
+1. Decode cost in-process: JSON bytes -> pydantic HardwareInput list -> raw
+   feature matrix, vs frame bytes -> telemetry_frame.decode (NumPy).
+2. End to end against a live server: the same float32-rounded simulation
+   samples posted to /hardware/data/batch (JSON) and /hardware/data/frames.
+   Every command and reason must match; throughput of both is reported.
+
+Usage: python benchmarks/bench_frame_ingest.py [--per-scenario 200 --batch 100] [--json out.json]
+"""
+import argparse
+import json
+import time
+
+import requests
+from pydantic import TypeAdapter
+
+from _datasets import simulation_dataset
+from _server import ApiServer
+
+import ai_engine
+import schemas
+import telemetry_frame
+
+
+class _StaticIds:
+    """In-process stand-in for IdRegistry (decode cost only, no database)."""
+
+    def __init__(self, ids):
+        self._names = {i: name for (_, name), i in ids.items()}
+
+    def names(self, ids):
+        return [self._names[i] for i in ids.tolist()]
+
+
+def payloads(per_scenario, seed=0):
+    records, _ = simulation_dataset(per_scenario, seed)
+    out = []
+    for n, r in enumerate(records):
+        p = telemetry_frame.to_float32(r.model_dump())
+        p["substation_id"], p["line_id"] = f"SUB-{n % 4:02d}", f"LINE-{n % 32:03d}"
+        out.append(p)
+    return out
+
+
+def decode_cost(samples, batch, repeats):
+    ids = {}
+    for p in samples:
+        ids.setdefault(("substation", p["substation_id"]), len(ids) + 1)
+        ids.setdefault(("line", p["line_id"]), len(ids) + 1)
+    registry = _StaticIds(ids)
+    adapter = TypeAdapter(list[schemas.HardwareInput])
+    chunks = [samples[i:i + batch] for i in range(0, len(samples), batch)]
+    json_bodies = [json.dumps(chunk).encode() for chunk in chunks]
+    frame_bodies = [telemetry_frame.encode(chunk, ids) for chunk in chunks]
+
+    started = time.perf_counter()
+    for _ in range(repeats):
+        for body in json_bodies:
+            ai_engine.raw_feature_matrix(adapter.validate_json(body))
+    json_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for _ in range(repeats):
+        for body in frame_bodies:
+            telemetry_frame.decode(body, registry)
+    frame_s = time.perf_counter() - started
+
+    n = len(samples) * repeats
+    return {
+        "json_us_per_sample": json_s / n * 1e6,
+        "frame_us_per_sample": frame_s / n * 1e6,
+        "json_bytes_per_sample": sum(map(len, json_bodies)) / len(samples),
+        "frame_bytes_per_sample": telemetry_frame.FRAME_SIZE,
+    }
+
+
+def end_to_end(samples, batch):
+    # Prediction cache off so both runs really score every sample
+    with ApiServer({"AI_CACHE": "0"}) as server:
+        ids = {}
+        for p in samples:
+            if ("line", p["line_id"]) not in ids or ("substation", p["substation_id"]) not in ids:
+                r = requests.post(f"{server.url}/hardware/ids", json={"substation_id": p["substation_id"], "line_id": p["line_id"]}).json()
+                ids[("substation", p["substation_id"])] = r["substation"]
+                ids[("line", p["line_id"])] = r["line"]
+
+        session = requests.Session()
+        chunks = [samples[i:i + batch] for i in range(0, len(samples), batch)]
+
+        started = time.perf_counter()
+        json_results = []
+        for chunk in chunks:
+            json_results += session.post(f"{server.url}/hardware/data/batch", json=chunk).json()
+        json_s = time.perf_counter() - started
+
+        started = time.perf_counter()
+        frame_results = []
+        for chunk in chunks:
+            frame_results += session.post(f"{server.url}/hardware/data/frames", data=telemetry_frame.encode(chunk, ids),
+                                          headers={"Content-Type": "application/octet-stream"}).json()
+        frame_s = time.perf_counter() - started
+
+    mismatches = sum(1 for a, b in zip(json_results, frame_results) if a != b)
+    return {
+        "samples": len(samples),
+        "mismatches": mismatches + abs(len(json_results) - len(frame_results)),
+        "faults": sum(1 for r in json_results if r["command"] == "TRIP"),
+        "json_samples_per_s": len(samples) / json_s,
+        "frame_samples_per_s": len(samples) / frame_s,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--per-scenario", type=int, default=200)
+    parser.add_argument("--batch", type=int, default=100)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    samples = payloads(args.per_scenario)
+    cost = decode_cost(samples, args.batch, args.repeats)
+    print(f"decode: JSON+pydantic {cost['json_us_per_sample']:.2f} us/sample ({cost['json_bytes_per_sample']:.0f} B), "
+          f"frames {cost['frame_us_per_sample']:.2f} us/sample ({cost['frame_bytes_per_sample']} B)")
+
+    e2e = end_to_end(samples, args.batch)
+    print(f"end to end: {e2e['samples']} samples, {e2e['faults']} trips, {e2e['mismatches']} mismatches, "
+          f"JSON {e2e['json_samples_per_s']:.0f}/s vs frames {e2e['frame_samples_per_s']:.0f}/s")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"decode": cost, "end_to_end": e2e}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
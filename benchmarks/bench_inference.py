@@ -0,0 +1,179 @@
+"""
+Latency / throughput benchmark for ai_engine.analyze_data.
+
+Inputs are simulation.generate_sample payloads for every scenario
+(NORMAL, SLG, LL, LLG, LLL, OPEN, HIGH_Z). Three modes are measured:
+  single   - one analyze_data call per sample, per scenario
+  batch    - analyze_batch over mixed-scenario batches of each --batch-sizes
+  threads  - --threads workers calling analyze_data concurrently
+Each row reports p50/p95/p99 latency and samples/sec. Results (plus the
+git commit and the ai_engine configuration) are written as JSON so runs can
+be compared across commits with --compare.
+
+Usage:
+  python benchmarks/bench_inference.py --json bench.json
+  AI_INFERENCE_BACKEND=sklearn python benchmarks/bench_inference.py --compare bench.json
+"""
+import argparse
+import json
+import platform
+import random
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from _datasets import REPO_DIR, simulation_dataset
+
+import ai_engine
+import simulation
+
+SCENARIOS = list(dict.fromkeys(simulation.SCENARIOS))
+
+
+def summarize(name, latencies_s, samples, elapsed_s):
+    values = np.asarray(latencies_s) * 1000.0
+    return {
+        "name": name,
+        "calls": len(values),
+        "samples": samples,
+        "p50_ms": float(np.percentile(values, 50)),
+        "p95_ms": float(np.percentile(values, 95)),
+        "p99_ms": float(np.percentile(values, 99)),
+        "mean_ms": float(values.mean()),
+        "samples_per_s": samples / elapsed_s if elapsed_s else 0.0,
+    }
+
+
+def bench_single(records):
+    latencies = []
+    started = time.perf_counter()
+    for record in records:
+        t0 = time.perf_counter()
+        ai_engine.analyze_data(record)
+        latencies.append(time.perf_counter() - t0)
+    return latencies, time.perf_counter() - started
+
+
+def bench_batch(records, batch_size):
+    latencies = []
+    started = time.perf_counter()
+    for i in range(0, len(records) - batch_size + 1, batch_size):
+        batch = records[i:i + batch_size]
+        t0 = time.perf_counter()
+        ai_engine.analyze_batch(batch)
+        latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - started
+    return latencies, len(latencies) * batch_size, elapsed
+
+
+def bench_threads(records, threads):
+    latencies = []
+    lock = threading.Lock()
+
+    def call(record):
+        t0 = time.perf_counter()
+        ai_engine.analyze_data(record)
+        elapsed = time.perf_counter() - t0
+        with lock:
+            latencies.append(elapsed)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(call, records))
+    return latencies, time.perf_counter() - started
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, text=True).strip()
+    except Exception:
+        return None
+
+
+def engine_config():
+    stats = ai_engine.stats()
+    return {
+        "model_version": stats["model_version"],
+        "model_format": stats["model_format"],
+        "backend": stats["backend"],
+        "executor": stats["executor"],
+        "fast_path": stats["fast_path_enabled"],
+        "cache": stats["cache_enabled"],
+        "batching": stats["batching_enabled"],
+    }
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = {r["name"]: r for r in json.load(f)["results"]}
+    print(f"\nvs {baseline_path}")
+    print(f"{'benchmark':<22}{'p50 old':>10}{'p50 new':>10}{'p99 old':>10}{'p99 new':>10}{'rate x':>9}")
+    for r in results:
+        old = baseline.get(r["name"])
+        if old is None:
+            continue
+        ratio = r["samples_per_s"] / old["samples_per_s"] if old["samples_per_s"] else float("nan")
+        print(f"{r['name']:<22}{old['p50_ms']:>10.3f}{r['p50_ms']:>10.3f}{old['p99_ms']:>10.3f}{r['p99_ms']:>10.3f}{ratio:>9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", type=int, default=500, help="samples per scenario")
+    parser.add_argument("--batch-sizes", default="16,64,256")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--compare", help="baseline JSON from an earlier run")
+    args = parser.parse_args()
+
+    records, names = simulation_dataset(args.samples, args.seed, SCENARIOS)
+    by_scenario = {s: [r for r, n in zip(records, names) if n == s] for s in SCENARIOS}
+    mixed = list(records)
+    random.Random(args.seed).shuffle(mixed)
+
+    # Warm-up: first-call costs (process pool spawn, lazy imports) are not trip latency
+    ai_engine.analyze_batch(mixed[:64])
+    ai_engine.prediction_cache.clear()
+
+    results = []
+    for scenario, scenario_records in by_scenario.items():
+        latencies, elapsed = bench_single(scenario_records)
+        results.append(summarize(f"single/{scenario}", latencies, len(scenario_records), elapsed))
+
+    for batch_size in (int(b) for b in args.batch_sizes.split(",")):
+        latencies, samples, elapsed = bench_batch(mixed, batch_size)
+        if latencies:
+            results.append(summarize(f"batch/{batch_size}", latencies, samples, elapsed))
+
+    latencies, elapsed = bench_threads(mixed, args.threads)
+    results.append(summarize(f"threads/{args.threads}", latencies, len(mixed), elapsed))
+
+    print(f"{'benchmark':<22}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'samples/s':>12}")
+    for r in results:
+        print(f"{r['name']:<22}{r['p50_ms']:>9.3f}{r['p95_ms']:>9.3f}{r['p99_ms']:>9.3f}{r['samples_per_s']:>12.0f}")
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "config": engine_config(),
+        "samples_per_scenario": args.samples,
+        "results": results,
+    }
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved {args.json}")
+    if args.compare:
+        compare(results, args.compare)
+
+    if ai_engine.INFERENCE_EXECUTOR == "process":
+        ai_engine.process_pool.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Telemetry latency during a login burst (shift change).
+
+One thread posts a sample to /hardware/data every 1/--rate-hz s and records
+its latency, first with no logins ("idle") and then while --concurrency
+threads hammer /token (--logins in total). Run twice: with the dedicated
+bcrypt pool at its default size, and with AUTH_HASH_WORKERS set to the
+request threadpool size (40), which is roughly how hashing behaved when it
+ran on the request threads. Also reports login throughput, 503s from the
+admission limit and the deepest hashing queue seen in /api/metrics.
+
+Usage: python benchmarks/bench_login_burst.py [--logins 200 --concurrency 32] [--json out.json]
+"""
+import argparse
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from _server import ApiServer, percentiles
+
+SAMPLE = {"substation_id": "SUB-01", "line_id": "LINE-001", "load_kw": 20.0, "pf": 0.9, "voltage_a": 230.0,
+          "voltage_b": 230.0, "voltage_c": 230.0, "current_a": 30.0, "current_b": 30.0, "current_c": 30.0}
+
+
+def telemetry(server, rate_hz, stop, latencies):
+    session = requests.Session()
+    while not stop.is_set():
+        started = time.perf_counter()
+        session.post(f"{server.url}/hardware/data", json=SAMPLE)
+        latencies.append((time.perf_counter() - started) * 1000)
+        time.sleep(max(0.0, 1.0 / rate_hz - (time.perf_counter() - started)))
+
+
+def watch_queue(server, headers, stop, depths):
+    while not stop.is_set():
+        stats = requests.get(f"{server.url}/api/metrics", headers=headers).json()["password_hashing"]
+        depths.append(stats["queue_depth"])
+        time.sleep(0.1)
+
+
+def run(label, env, args):
+    with ApiServer(env) as server:
+        users = [requests.post(f"{server.url}/admin/create-temp-credentials", json={"role": "officer"}).json()
+                 for _ in range(args.users)]
+        headers = server.login()
+
+        idle = []
+        stop = threading.Event()
+        t = threading.Thread(target=telemetry, args=(server, args.rate_hz, stop, idle))
+        t.start()
+        time.sleep(args.idle_s)
+        stop.set()
+        t.join()
+
+        burst, depths, statuses = [], [], []
+        stop = threading.Event()
+        watchers = [threading.Thread(target=telemetry, args=(server, args.rate_hz, stop, burst)),
+                    threading.Thread(target=watch_queue, args=(server, headers, stop, depths))]
+        for w in watchers:
+            w.start()
+
+        def login(n):
+            creds = users[n % len(users)]
+            r = requests.post(f"{server.url}/token", data={"username": creds["userid"], "password": creds["password"]})
+            statuses.append(r.status_code)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(args.concurrency) as pool:
+            list(pool.map(login, range(args.logins)))
+        burst_s = time.perf_counter() - started
+        stop.set()
+        for w in watchers:
+            w.join()
+
+    return {
+        "mode": label,
+        "telemetry_idle": percentiles(idle),
+        "telemetry_during_burst": percentiles(burst),
+        "logins_ok": statuses.count(200),
+        "logins_503": statuses.count(503),
+        "logins_per_s": statuses.count(200) / burst_s,
+        "max_queue_depth": max(depths, default=0),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--users", type=int, default=8)
+    parser.add_argument("--rate-hz", type=float, default=20)
+    parser.add_argument("--idle-s", type=float, default=5)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    results = [
+        run("threadpool-sized (40)", {"AUTH_HASH_WORKERS": "40", "AUTH_HASH_MAX_PENDING": "100000"}, args),
+        run("dedicated pool (default)", {}, args),
+    ]
+    for r in results:
+        idle, busy = r["telemetry_idle"], r["telemetry_during_burst"]
+        print(f"{r['mode']}: telemetry p50/p99 idle {idle['p50_ms']:.1f}/{idle['p99_ms']:.1f} ms, "
+              f"burst {busy['p50_ms']:.1f}/{busy['p99_ms']:.1f} ms | logins {r['logins_ok']} ok "
+              f"({r['logins_per_s']:.1f}/s), {r['logins_503']} x 503, max queue {r['max_queue_depth']}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
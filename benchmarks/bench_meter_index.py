@@ -0,0 +1,120 @@
+"""
+Concurrent trip increments: the old per-reading ORM read-modify-write
+(SELECT consumer, trip_count += 1, commit) vs meter_index.MeterIndex
+(in-memory increment + write-behind flush), in-process on a scratch SQLite
+database (--profile, default "default" like the server; "tuned" has a
+single writer connection, which serializes the old path instead).
+
+--threads threads each record --per-thread tripping readings spread over
+--meters meters (few meters = heavy contention). Reports readings/s and
+lost increments (expected trips minus what ends up in the database).
+
+Usage: python benchmarks/bench_meter_index.py [--threads 8 --per-thread 500 --meters 4 --profile default] [--json out.json]
+"""
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import sessionmaker
+
+import _datasets  # noqa: F401  (puts the repo on sys.path)
+
+import database
+import meter_index
+import models
+
+
+def seed(path, meters, profile):
+    writer, _ = database.create_engines(f"sqlite:///{path}", profile)
+    models.Base.metadata.create_all(bind=writer)
+    with writer.begin() as conn:
+        conn.execute(insert(models.Consumer.__table__), [
+            {"meter_id": f"M-{n}", "substation_id": "SUB-01", "trip_count": 0, "voltage": 0.0, "power_factor": 0.0}
+            for n in range(meters)
+        ])
+    return writer, sessionmaker(bind=writer)
+
+
+def db_trips(engine):
+    with engine.connect() as conn:
+        return sum(conn.execute(select(models.Consumer.trip_count)).scalars())
+
+
+def run_threads(threads, per_thread, fn):
+    errors = []
+
+    def worker(t):
+        for i in range(per_thread):
+            try:
+                fn(t, i)
+            except Exception as e:  # SQLite "database is locked" etc. count as lost too
+                errors.append(e)
+
+    pool = [threading.Thread(target=worker, args=(t,)) for t in range(threads)]
+    started = time.perf_counter()
+    for p in pool:
+        p.start()
+    for p in pool:
+        p.join()
+    return time.perf_counter() - started, len(errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--per-thread", type=int, default=500)
+    parser.add_argument("--meters", type=int, default=4)
+    parser.add_argument("--profile", default="default", choices=("default", "tuned"))
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+    expected = args.threads * args.per_thread
+    results = {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine, Session = seed(os.path.join(tmp, "orm.db"), args.meters, args.profile)
+
+        def orm_reading(t, i):
+            db = Session()
+            try:
+                consumer = db.query(models.Consumer).filter(models.Consumer.meter_id == f"M-{(t + i) % args.meters}").first()
+                consumer.trip_count += 1
+                consumer.voltage, consumer.power_factor = 230.0, 0.9
+                db.commit()
+                db.refresh(consumer)
+            finally:
+                db.close()
+
+        elapsed, errors = run_threads(args.threads, args.per_thread, orm_reading)
+        results["orm_read_modify_write"] = {"readings_per_s": expected / elapsed, "errors": errors,
+                                            "lost_increments": expected - db_trips(engine)}
+        engine.dispose()
+
+        engine, Session = seed(os.path.join(tmp, "index.db"), args.meters, args.profile)
+        index = meter_index.MeterIndex(Session, flush_ms=100)
+        index.start()
+
+        def index_reading(t, i):
+            index.record(f"M-{(t + i) % args.meters}", True, 230.0, 0.9)
+
+        elapsed, errors = run_threads(args.threads, args.per_thread, index_reading)
+        index.close()
+        results["meter_index"] = {"readings_per_s": expected / elapsed, "errors": errors,
+                                  "lost_increments": expected - db_trips(engine),
+                                  "flushes": index.flushes, "rows_written": index.rows_written}
+        engine.dispose()
+
+    for name, r in results.items():
+        print(f"{name:<22}: {r['readings_per_s']:>9.0f} readings/s, {r['lost_increments']} of {expected} increments lost"
+              f" ({r['errors']} errors)")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
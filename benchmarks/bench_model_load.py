@@ -0,0 +1,104 @@
+"""
+Startup and memory comparison: pickle load vs memory-mapped model arrays.
+
+Starts N worker processes per format (like `uvicorn --workers N`), keeps
+them alive together, and reports per-worker import/load time plus RSS, PSS
+and private memory from /proc/self/smaps_rollup. PSS splits shared pages
+between the processes mapping them, so it shows what each worker really costs.
+
+Usage: python benchmarks/bench_model_load.py --workers 4 [--json out.json]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from _datasets import REPO_DIR
+
+WORKER = r"""
+import json, sys, time
+started = time.perf_counter()
+import ai_engine
+import_s = time.perf_counter() - started
+from compiled_forest import CompiledForest
+
+# Touch every node once, as the first trip decision would
+compiled = ai_engine.registry.primary.compiled
+compiled.predict([[20, 0.9, 230, 230, 230, 30, 30, 30, 0, 0, 0, 0, 0, 0]])
+for name in CompiledForest.ARRAYS:
+    getattr(compiled, name).sum()
+
+mem = {}
+with open("/proc/self/smaps_rollup") as f:
+    for line in f:
+        parts = line.split()
+        if parts[0] in ("Rss:", "Pss:", "Private_Clean:", "Private_Dirty:", "Shared_Clean:"):
+            mem[parts[0].rstrip(":")] = int(parts[1])
+print(json.dumps({
+    "import_ms": import_s * 1000,
+    "load_ms": ai_engine.registry.primary.load_seconds * 1000,
+    "rss_kib": mem["Rss"],
+    "pss_kib": mem["Pss"],
+    "private_kib": mem["Private_Clean"] + mem["Private_Dirty"],
+}), flush=True)
+sys.stdin.readline()  # stay alive until every worker has reported
+"""
+
+
+def run_format(fmt, workers):
+    env = dict(os.environ, AI_MODEL_FORMAT=fmt, PYTHONPATH=REPO_DIR)
+    procs = [
+        subprocess.Popen([sys.executable, "-c", WORKER], cwd=REPO_DIR, env=env,
+                         stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+        for _ in range(workers)
+    ]
+    results = []
+    for proc in procs:
+        for line in proc.stdout:
+            if line.startswith("{"):
+                results.append(json.loads(line))
+                break
+    for proc in procs:
+        proc.stdin.write("\n")
+        proc.stdin.flush()
+        proc.wait()
+
+    def avg(key):
+        return sum(r[key] for r in results) / len(results)
+
+    return {
+        "format": fmt,
+        "workers": workers,
+        "import_ms": avg("import_ms"),
+        "load_ms": avg("load_ms"),
+        "rss_kib": avg("rss_kib"),
+        "pss_kib": avg("pss_kib"),
+        "private_kib": avg("private_kib"),
+        "total_pss_kib": sum(r["pss_kib"] for r in results),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    if not os.path.isdir(os.path.join(REPO_DIR, "model", "final_fault_model.forest")):
+        sys.exit("Run `python export_model.py` first.")
+
+    rows = [run_format(fmt, args.workers) for fmt in ("pickle", "mmap")]
+
+    print(f"{'format':<8}{'import ms':>11}{'load ms':>10}{'RSS MiB':>10}{'PSS MiB':>10}{'private MiB':>13}{'total PSS MiB':>15}")
+    for r in rows:
+        print(f"{r['format']:<8}{r['import_ms']:>11.0f}{r['load_ms']:>10.1f}{r['rss_kib'] / 1024:>10.1f}"
+              f"{r['pss_kib'] / 1024:>10.1f}{r['private_kib'] / 1024:>13.1f}{r['total_pss_kib'] / 1024:>15.1f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+/api/dashboard tail latency while /hardware/data is saturated, with fault
+inference in the API process (AI_EXECUTOR=thread) vs in worker processes
+(AI_EXECUTOR=process).
+
+Fast path and cache are switched off and the sklearn backend is used so
+every telemetry request really runs the forest.
+
+Usage: python benchmarks/bench_process_pool.py [--seconds 15 --senders 16 --batch 1] [--json out.json]
+"""
+import argparse
+import json
+import random
+import threading
+import time
+
+import requests
+
+from _server import ApiServer, percentiles
+
+import simulation
+
+
+def run_mode(executor, args):
+    env = {
+        "AI_EXECUTOR": executor,
+        "AI_INFERENCE_BACKEND": args.backend,
+        "AI_FAST_PATH": "0",
+        "AI_CACHE": "0",
+    }
+    with ApiServer(env) as server:
+        headers = server.login()
+        stop = threading.Event()
+        sent = [0]
+        sent_lock = threading.Lock()
+
+        def sender(seed):
+            rng = random.Random(seed)
+            session = requests.Session()
+            while not stop.is_set():
+                scenario = "NORMAL" if rng.random() < 0.9 else rng.choice(simulation.SCENARIOS)
+                if args.batch > 1:
+                    body = [simulation.generate_sample(scenario, rng) for _ in range(args.batch)]
+                    session.post(f"{server.url}/hardware/data/batch", json=body, timeout=30)
+                else:
+                    session.post(f"{server.url}/hardware/data", json=simulation.generate_sample(scenario, rng), timeout=30)
+                with sent_lock:
+                    sent[0] += args.batch
+
+        def dashboard_latencies(seconds):
+            session = requests.Session()
+            latencies = []
+            deadline = time.perf_counter() + seconds
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                session.get(f"{server.url}/api/dashboard", headers=headers, timeout=30)
+                latencies.append((time.perf_counter() - started) * 1000)
+                time.sleep(0.02)
+            return latencies
+
+        # Warm up workers / model, then measure idle and saturated dashboards
+        requests.post(f"{server.url}/hardware/data", json=simulation.generate_sample("NORMAL"))
+        idle = dashboard_latencies(2)
+
+        threads = [threading.Thread(target=sender, args=(i,), daemon=True) for i in range(args.senders)]
+        for t in threads:
+            t.start()
+        time.sleep(1)
+        started = time.perf_counter()
+        sent[0] = 0
+        loaded = dashboard_latencies(args.seconds)
+        elapsed = time.perf_counter() - started
+        stop.set()
+        for t in threads:
+            t.join(timeout=30)
+
+        return {
+            "executor": executor,
+            "telemetry_samples_per_s": sent[0] / elapsed,
+            "dashboard_idle": percentiles(idle),
+            "dashboard_loaded": percentiles(loaded),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--seconds", type=float, default=15)
+    parser.add_argument("--senders", type=int, default=16)
+    parser.add_argument("--batch", type=int, default=1, help="rows per request (>1 uses /hardware/data/batch)")
+    parser.add_argument("--backend", default="sklearn", choices=["sklearn", "compiled"])
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    results = [run_mode(mode, args) for mode in ("thread", "process")]
+
+    print(f"{'executor':<9}{'telemetry/s':>13}{'idle p99':>10}{'load p50':>10}{'load p95':>10}{'load p99':>10}")
+    for r in results:
+        idle, loaded = r["dashboard_idle"], r["dashboard_loaded"]
+        print(f"{r['executor']:<9}{r['telemetry_samples_per_s']:>13.0f}{idle['p99_ms']:>10.1f}"
+              f"{loaded['p50_ms']:>10.1f}{loaded['p95_ms']:>10.1f}{loaded['p99_ms']:>10.1f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Rollup maintenance and query cost (rollups.RollupStore), in-process on a
+scratch SQLite database with the tuned profile.
+
+Feeds --lines lines at --rate-hz for --hours of simulated time (one batch
+per tick carrying every line, synthetic timestamps), flushing once per
+simulated --flush-s. Reports maintenance cost per sample, rows and bytes
+written per raw sample (write amplification), open-bucket memory, then
+query latency and rows returned for chart ranges from 5 minutes to the
+full span.
+
+Usage: python benchmarks/bench_rollups.py [--lines 20 --rate-hz 1 --hours 6] [--json out.json]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+from sqlalchemy.orm import sessionmaker
+
+import _datasets  # noqa: F401  (puts the repo on sys.path)
+
+import database
+import models
+import rollups
+
+
+class _Rec:
+    __slots__ = ("substation_id", "line_id")
+
+    def __init__(self, substation_id, line_id):
+        self.substation_id = substation_id
+        self.line_id = line_id
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lines", type=int, default=20)
+    parser.add_argument("--rate-hz", type=float, default=1)
+    parser.add_argument("--hours", type=float, default=6)
+    parser.add_argument("--flush-s", type=float, default=1)
+    parser.add_argument("--max-points", type=int, default=500)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "grid.db")
+        writer, _ = database.create_engines(f"sqlite:///{path}", "tuned")
+        models.Base.metadata.create_all(bind=writer)
+        store = rollups.RollupStore(sessionmaker(bind=writer), retention_s={1: 0, 60: 0, 3600: 0})
+
+        rng = np.random.default_rng(0)
+        records = [_Rec(f"SUB-{n % 4:02d}", f"LINE-{n:03d}") for n in range(args.lines)]
+        t0 = 1_700_000_000.0
+        ticks = int(args.hours * 3600 * args.rate_hz)
+        step = 1.0 / args.rate_hz
+        next_flush = t0 + args.flush_s
+        add_s = flush_s = 0.0
+
+        for tick in range(ticks):
+            now = t0 + tick * step
+            raw = rng.normal(230.0, 5.0, size=(args.lines, len(rollups.FEATURES)))
+            started = time.perf_counter()
+            store.add(records, raw, now)
+            add_s += time.perf_counter() - started
+            if now >= next_flush:
+                started = time.perf_counter()
+                store.seal_idle(now)
+                store.flush()
+                flush_s += time.perf_counter() - started
+                next_flush = now + args.flush_s
+        store.seal_idle(seal_all=True)
+        store.flush()
+
+        samples = ticks * args.lines
+        stats = store.stats()
+        end = t0 + ticks * step
+        queries = []
+        for label, span in (("5 min", 300), ("1 h", 3600), ("6 h", 6 * 3600), ("full", end - t0)):
+            span = min(span, end - t0)
+            started = time.perf_counter()
+            series = store.query("SUB-00", "LINE-000", end - span, end, args.max_points)
+            queries.append({
+                "range": label, "resolution": series["resolution"], "points": len(series["t"]),
+                "raw_samples_covered": int(span * args.rate_hz),
+                "ms": (time.perf_counter() - started) * 1000,
+            })
+        db_bytes = os.path.getsize(path) + (os.path.getsize(path + "-wal") if os.path.exists(path + "-wal") else 0)
+        writer.dispose()
+
+    result = {
+        "samples": samples,
+        "add_us_per_sample": add_s / samples * 1e6,
+        "flush_us_per_sample": flush_s / samples * 1e6,
+        "rows_written": stats["rows_written"],
+        "rows_per_sample": stats["rows_per_sample"],
+        "bytes_per_sample": stats["bytes_written"] / samples,
+        "open_buckets_bytes": stats["open_buckets_bytes"],
+        "db_bytes": db_bytes,
+        "queries": queries,
+    }
+    print(f"{samples} samples: add {result['add_us_per_sample']:.2f} us/sample, flush {result['flush_us_per_sample']:.2f} us/sample")
+    print(f"rows written {result['rows_written']} ({result['rows_per_sample']:.3f} per sample, "
+          f"{result['bytes_per_sample']:.1f} B/sample), open buckets {result['open_buckets_bytes']} B, db {db_bytes / 1e6:.1f} MB")
+    for q in queries:
+        print(f"  {q['range']:<6} -> {q['resolution']:>4}s buckets, {q['points']:>4} points "
+              f"(covers {q['raw_samples_covered']} raw samples) in {q['ms']:.1f} ms")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Concurrent read/write benchmark for the SQLite storage profiles in database.py.
+
+Writers insert FaultLog rows (one commit per batch of --write-batch rows,
+as the ingest path does) while readers run the /api/dashboard query
+(latest 20 FaultLog rows). Each profile gets a fresh database file.
+Reports write and read throughput, tail latency and lock errors.
+
+Usage: python benchmarks/bench_sqlite_profiles.py [--seconds 10 --writers 2 --readers 8] [--json out.json]
+"""
+import argparse
+import datetime
+import json
+import os
+import tempfile
+import threading
+import time
+
+from sqlalchemy.orm import sessionmaker
+
+from _server import percentiles
+
+import database
+import models
+
+
+def run_profile(profile, args):
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'grid.db')}"
+        writer_engine, reader_engine = database.create_engines(url, profile, readers=args.readers)
+        models.Base.metadata.create_all(bind=writer_engine)
+        WriteSession = sessionmaker(bind=writer_engine)
+        ReadSession = sessionmaker(bind=reader_engine)
+
+        stop = threading.Event()
+        lock = threading.Lock()
+        write_ms, read_ms = [], []
+        errors = {"write": 0, "read": 0}
+        rows_written = [0]
+
+        def writer(worker_id):
+            while not stop.is_set():
+                rows = [{
+                    "substation_id": f"SUB-{worker_id}", "line_id": "FEEDER-05",
+                    "timestamp": datetime.datetime.utcnow(),
+                    "voltage": 200.0, "current": 18500.0, "fault_type": "LG", "status": "Active",
+                } for _ in range(args.write_batch)]
+                started = time.perf_counter()
+                db = WriteSession()
+                try:
+                    db.bulk_insert_mappings(models.FaultLog, rows)
+                    db.commit()
+                    with lock:
+                        write_ms.append((time.perf_counter() - started) * 1000)
+                        rows_written[0] += len(rows)
+                except Exception:
+                    db.rollback()
+                    with lock:
+                        errors["write"] += 1
+                finally:
+                    db.close()
+
+        def reader():
+            while not stop.is_set():
+                started = time.perf_counter()
+                db = ReadSession()
+                try:
+                    db.query(models.FaultLog).order_by(models.FaultLog.timestamp.desc()).limit(20).all()
+                    with lock:
+                        read_ms.append((time.perf_counter() - started) * 1000)
+                except Exception:
+                    with lock:
+                        errors["read"] += 1
+                finally:
+                    db.close()
+
+        threads = [threading.Thread(target=writer, args=(i,)) for i in range(args.writers)]
+        threads += [threading.Thread(target=reader) for _ in range(args.readers)]
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        time.sleep(args.seconds)
+        stop.set()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+
+        writer_engine.dispose()
+        reader_engine.dispose()
+
+        return {
+            "profile": profile,
+            "write_commits_per_s": len(write_ms) / elapsed,
+            "rows_per_s": rows_written[0] / elapsed,
+            "reads_per_s": len(read_ms) / elapsed,
+            "write_latency": percentiles(write_ms),
+            "read_latency": percentiles(read_ms),
+            "errors": errors,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--write-batch", type=int, default=1, help="rows per commit")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    results = [run_profile(profile, args) for profile in ("default", "tuned")]
+
+    print(f"{'profile':<9}{'commits/s':>11}{'reads/s':>10}{'write p50':>11}{'write p99':>11}"
+          f"{'read p50':>10}{'read p99':>10}{'errors w/r':>12}")
+    for r in results:
+        w, rd = r["write_latency"], r["read_latency"]
+        print(f"{r['profile']:<9}{r['write_commits_per_s']:>11.0f}{r['reads_per_s']:>10.0f}"
+              f"{w.get('p50_ms', 0):>11.2f}{w.get('p99_ms', 0):>11.2f}"
+              f"{rd.get('p50_ms', 0):>10.2f}{rd.get('p99_ms', 0):>10.2f}"
+              f"{r['errors']['write']:>6}/{r['errors']['read']:<5}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Checks that compiled_forest.CompiledForest gives the same labels as model.predict
+on fresh samples from the training distribution (`ML model.py`), both with
+the full traversal and with early-exit voting (plus its average tree count).
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from _datasets import training_dataset
+
+import ai_engine
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--samples", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    X, _ = training_dataset(args.samples, args.seed)
+    primary = ai_engine.registry.primary
+    if primary.sklearn_model is None:
+        sys.exit("Needs the pickled model: run with AI_MODEL_FORMAT=pickle")
+
+    start = time.perf_counter()
+    expected = primary.sklearn_model.predict(X)
+    sklearn_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = primary.compiled.predict(X)
+    compiled_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    indices, margins, trees = primary.compiled.predict_early_exit(X)
+    early_s = time.perf_counter() - start
+    early = primary.compiled.classes[indices]
+
+    mismatches = int(np.sum(expected != actual))
+    early_mismatches = int(np.sum(expected != early))
+    print(f"Samples:     {len(X)}")
+    print(f"Mismatches:  {mismatches} (compiled), {early_mismatches} (early exit)")
+    print(f"sklearn:     {sklearn_s * 1000:.1f} ms")
+    print(f"compiled:    {compiled_s * 1000:.1f} ms")
+    print(f"early exit:  {early_s * 1000:.1f} ms")
+    print(f"Trees evaluated (early exit): mean {trees.mean():.1f} of {primary.compiled.n_trees}")
+    for label in np.unique(expected):
+        in_class = expected == label
+        print(f"   {label:<7} mean trees {trees[in_class].mean():5.1f}   mean margin {margins[in_class].mean():5.1f}")
+
+    # Single-row latency is what a trip decision on /hardware/data pays
+    row = X[:1]
+    for name, fn in (("sklearn", primary.sklearn_model.predict), ("compiled", primary.compiled.predict),
+                     ("early", primary.compiled.predict_early_exit)):
+        runs = 200
+        start = time.perf_counter()
+        for _ in range(runs):
+            fn(row)
+        print(f"{name:<9} single row: {(time.perf_counter() - start) / runs * 1e6:.0f} us")
+
+    return 1 if mismatches or early_mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
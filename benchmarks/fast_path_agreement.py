@@ -0,0 +1,114 @@
+"""
+Offline agreement report: physics fast path vs the full fault model.
+
+Every sample the fast path would answer "Normal" is also scored by the
+forest. A sample is MASKED when the fast path says Normal but the model
+says fault - that must never happen. Data comes from the training
+distribution (`ML model.py`), from every simulation.py scenario, and from
+an in-band sweep over light loads and low power factors (0-60 kW, pf
+0.1-1, every phase inside the bands) that the training data never covers.
+Also checks that ai_engine's fast-path envelope matches `ML model.py`.
+
+Usage: python benchmarks/fast_path_agreement.py [--v-band 10 --i-band 3 --sweep 200000] [--json out.json]
+Exit status is 1 if any sample is masked or the envelopes differ.
+"""
+import argparse
+import json
+import sys
+from collections import Counter
+
+import numpy as np
+
+from _datasets import load_training_module, simulation_dataset, training_dataset
+
+import ai_engine
+
+
+def evaluate(source, X, truth, v_band, i_band):
+    fast = ai_engine.fast_path_mask(X, v_band, i_band)
+    predicted = np.asarray(ai_engine.predict_labels(X))
+
+    masked = fast & (predicted != "Normal")
+    rows = []
+    for label in sorted(set(truth)):
+        in_class = truth == label
+        rows.append({
+            "source": source,
+            "class": str(label),
+            "samples": int(in_class.sum()),
+            "fast_path": int((fast & in_class).sum()),
+            "model_fault": int(((predicted != "Normal") & in_class).sum()),
+            "masked": int((masked & in_class).sum()),
+        })
+    return rows, Counter(predicted[masked].tolist())
+
+
+def in_band_sweep(samples, v_band, i_band, seed=0):
+    """
+    Samples whose every phase is inside the fast-path bands, over loads and
+    power factors well beyond the training envelope. Labelled "Normal".
+    """
+    rng = np.random.default_rng(seed)
+    load = rng.uniform(0, 60, samples)
+    pf = rng.uniform(0.1, 1.0, samples)
+    i_expected = np.where(pf > 0.1, load * 1000 / (3 * ai_engine.NOMINAL_V_PHASE * np.maximum(pf, 0.1)), 0.0)
+    raw = np.empty((samples, 8))
+    raw[:, 0], raw[:, 1] = load, pf
+    raw[:, 2:5] = ai_engine.NOMINAL_V_PHASE + rng.uniform(-v_band, v_band, (samples, 3))
+    raw[:, 5:8] = np.maximum(0.0, i_expected[:, None] + rng.uniform(-i_band, i_band, (samples, 3)))
+    return ai_engine.build_feature_matrix(None, raw), np.full(samples, "Normal")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--samples", type=int, default=20000, help="training-distribution samples")
+    parser.add_argument("--per-scenario", type=int, default=2000, help="simulation samples per scenario")
+    parser.add_argument("--sweep", type=int, default=200000, help="light-load / low-pf in-band samples")
+    parser.add_argument("--v-band", type=float, default=ai_engine.FAST_PATH_V_BAND)
+    parser.add_argument("--i-band", type=float, default=ai_engine.FAST_PATH_I_BAND)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write the report to this file")
+    args = parser.parse_args()
+
+    X_train, y_train = training_dataset(args.samples, args.seed)
+    records, scenarios = simulation_dataset(args.per_scenario, args.seed)
+    X_sim = ai_engine.build_feature_matrix(records)
+    X_sweep, y_sweep = in_band_sweep(args.sweep, args.v_band, args.i_band, args.seed)
+
+    ml_model = load_training_module()
+    envelope_ok = (ai_engine.FAST_PATH_LOAD_KW == tuple(map(float, ml_model.LOAD_KW_RANGE))
+                   and ai_engine.FAST_PATH_PF == tuple(map(float, ml_model.PF_RANGE)))
+
+    report, masked_labels = [], Counter()
+    for source, X, truth in (("ML model.py", X_train, y_train), ("simulation.py", X_sim, np.asarray(scenarios)),
+                             ("in-band sweep", X_sweep, y_sweep)):
+        rows, masked = evaluate(source, X, truth, args.v_band, args.i_band)
+        report.extend(rows)
+        masked_labels.update(masked)
+
+    print(f"Fast path bands: |dV| <= {args.v_band} V, |dI| <= {args.i_band} A, "
+          f"I_expected >= {ai_engine.FAST_PATH_MIN_EXPECTED_I:.2f} A, load {ai_engine.FAST_PATH_LOAD_KW} kW, "
+          f"pf {ai_engine.FAST_PATH_PF}")
+    print(f"Training envelope: load {ml_model.LOAD_KW_RANGE} kW, pf {ml_model.PF_RANGE}"
+          f"{'' if envelope_ok else '  <-- DOES NOT MATCH the fast path'}\n")
+    print(f"{'source':<15}{'class':<9}{'samples':>9}{'fast path':>11}{'model fault':>13}{'MASKED':>8}")
+    for r in report:
+        print(f"{r['source']:<15}{r['class']:<9}{r['samples']:>9}{r['fast_path']:>11}{r['model_fault']:>13}{r['masked']:>8}")
+
+    total = sum(r["samples"] for r in report)
+    fast = sum(r["fast_path"] for r in report)
+    masked_total = sum(r["masked"] for r in report)
+    print(f"\nFast path answered {fast}/{total} samples ({fast / total:.1%}); masked faults: {masked_total}")
+    if masked_labels:
+        print(f"Masked model labels: {dict(masked_labels)}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"v_band": args.v_band, "i_band": args.i_band, "envelope_ok": envelope_ok, "rows": report},
+                      f, indent=2)
+
+    return 1 if masked_total or not envelope_ok else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
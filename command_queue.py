@@ -0,0 +1,220 @@
+import asyncio
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+from metrics import LatencyTracker
+
+# --- CONFIG ---
+# Delivered but unacknowledged commands become deliverable again after this long
+COMMAND_ACK_TIMEOUT_S = float(os.getenv("COMMAND_ACK_TIMEOUT_S", "2"))
+# Commands nobody picked up / acknowledged within this long are dropped as expired
+COMMAND_TTL_S = float(os.getenv("COMMAND_TTL_S", "60"))
+COMMAND_LONG_POLL_MAX_S = float(os.getenv("COMMAND_LONG_POLL_MAX_S", "30"))
+COMMAND_HISTORY = int(os.getenv("COMMAND_HISTORY", "1000"))
+
+
+class Command:
+    """One manual TRIP / RESET addressed to a single line."""
+
+    __slots__ = ("id", "substation_id", "line_id", "action", "issued_by", "issued_at",
+                 "created", "delivered", "acked", "attempts", "status")
+
+    def __init__(self, command_id, substation_id, line_id, action, issued_by):
+        self.id = command_id
+        self.substation_id = substation_id
+        self.line_id = line_id
+        self.action = action
+        self.issued_by = issued_by
+        self.issued_at = datetime.now(timezone.utc)
+        self.created = time.monotonic()
+        self.delivered = None  # monotonic time of the latest delivery
+        self.acked = None
+        self.attempts = 0
+        self.status = "pending"  # pending -> delivered -> acked | expired | superseded
+
+    def describe(self):
+        return {
+            "command_id": self.id,
+            "substation_id": self.substation_id,
+            "line_id": self.line_id,
+            "action": self.action,
+            "issued_by": self.issued_by,
+            "issued_at": self.issued_at.isoformat(),
+            "status": self.status,
+            "attempts": self.attempts,
+            "ack_ms": (self.acked - self.created) * 1000 if self.acked else None,
+        }
+
+
+class CommandRouter:
+    """
+    Per-(substation, line) manual command queues with acknowledgements.
+
+    Devices hold a long-poll open on their own line (`poll`) and get a
+    command the moment it is issued; heartbeats still pick commands up
+    (`take`) for devices that never poll. A delivered command stays
+    outstanding until the device acks it; if no ack arrives within
+    COMMAND_ACK_TIMEOUT_S it is delivered again, and after COMMAND_TTL_S
+    it expires. Issuing a command supersedes whatever is still outstanding
+    on that line, so only the newest command is ever (re)delivered.
+    Commands live in memory only.
+    """
+
+    def __init__(self, ack_timeout_s=COMMAND_ACK_TIMEOUT_S, ttl_s=COMMAND_TTL_S, history=COMMAND_HISTORY):
+        self.ack_timeout_s = ack_timeout_s
+        self.ttl_s = ttl_s
+        self._ids = itertools.count(1)
+        self._queues = {}  # (substation_id, line_id) -> deque of outstanding commands
+        self._events = {}  # (substation_id, line_id) -> asyncio.Event for long-pollers
+        self._commands = {}  # id -> Command, most recent `history` kept for status lookups
+        self._history = history
+        self._lock = threading.Lock()
+        self._loop = None
+        self.delivery_latency = LatencyTracker()
+        self.ack_latency = LatencyTracker()
+        self.counts = {"issued": 0, "delivered": 0, "redelivered": 0, "acked": 0, "expired": 0,
+                       "superseded": 0, "stale_acks": 0}
+        self.waiting_polls = 0
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+
+    def _wake(self, key):
+        event = self._events.get(key)
+        if event is None:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            event.set()
+        elif self._loop is not None:
+            self._loop.call_soon_threadsafe(event.set)
+
+    def issue(self, substation_id, line_id, action, issued_by=None):
+        key = (substation_id, line_id)
+        with self._lock:
+            command = Command(next(self._ids), substation_id, line_id, action, issued_by)
+            queue = self._queues.setdefault(key, deque())
+            # A newer command replaces anything still unacked: a late TRIP must never follow a RESET
+            while queue:
+                queue.popleft().status = "superseded"
+                self.counts["superseded"] += 1
+            queue.append(command)
+            self._commands[command.id] = command
+            if len(self._commands) > self._history:
+                # dicts keep insertion order: drop the oldest finished commands first
+                finished = [cid for cid, c in self._commands.items() if c.status in ("acked", "expired", "superseded")]
+                for old_id in finished[:len(self._commands) - self._history]:
+                    del self._commands[old_id]
+            self.counts["issued"] += 1
+        self._wake(key)
+        return command
+
+    def take(self, substation_id, line_id, limit=None):
+        """Commands due for delivery to this line (new, or unacked past the ack timeout)."""
+        key = (substation_id, line_id)
+        now = time.monotonic()
+        due = []
+        with self._lock:
+            queue = self._queues.get(key)
+            if not queue:
+                return due
+            for command in list(queue):
+                if now - command.created > self.ttl_s:
+                    queue.remove(command)
+                    command.status = "expired"
+                    self.counts["expired"] += 1
+                    continue
+                if command.delivered is not None and now - command.delivered < self.ack_timeout_s:
+                    continue
+                if command.delivered is None:
+                    self.delivery_latency.observe(now - command.created)
+                    self.counts["delivered"] += 1
+                else:
+                    self.counts["redelivered"] += 1
+                command.delivered = now
+                command.attempts += 1
+                command.status = "delivered"
+                due.append(command)
+                if limit is not None and len(due) >= limit:
+                    break
+        return due
+
+    async def poll(self, substation_id, line_id, timeout_s):
+        """Long-poll: returns as soon as a command is due for this line, or [] after timeout_s."""
+        key = (substation_id, line_id)
+        deadline = time.monotonic() + min(timeout_s, COMMAND_LONG_POLL_MAX_S)
+        event = self._events.get(key)
+        if event is None:
+            event = self._events[key] = asyncio.Event()
+        self.waiting_polls += 1
+        try:
+            while True:
+                event.clear()
+                due = self.take(substation_id, line_id)
+                remaining = deadline - time.monotonic()
+                if due or remaining <= 0:
+                    return due
+                # Wake for new commands, or when an unacked one is due again
+                with self._lock:
+                    outstanding = [c.delivered for c in self._queues.get(key, ()) if c.delivered is not None]
+                if outstanding:
+                    remaining = min(remaining, max(0.0, min(outstanding) + self.ack_timeout_s - time.monotonic()))
+                try:
+                    await asyncio.wait_for(event.wait(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self.waiting_polls -= 1
+
+    def ack(self, command_id, substation_id=None, line_id=None):
+        """
+        Marks a command acknowledged, only while it is still current (pending or
+        delivered, within its TTL). Returns the command - its status is "acked",
+        or "superseded" / "expired" for a stale ack, which changes nothing - or
+        None if unknown / addressed elsewhere.
+        """
+        with self._lock:
+            command = self._commands.get(command_id)
+            if command is None:
+                return None
+            if substation_id is not None and (substation_id, line_id) != (command.substation_id, command.line_id):
+                return None
+            if command.status in ("pending", "delivered"):
+                now = time.monotonic()
+                queue = self._queues.get((command.substation_id, command.line_id))
+                if queue and command in queue:
+                    queue.remove(command)
+                if now - command.created > self.ttl_s:
+                    command.status = "expired"
+                    self.counts["expired"] += 1
+                else:
+                    command.acked = now
+                    command.status = "acked"
+                    self.ack_latency.observe(command.acked - command.created)
+                    self.counts["acked"] += 1
+            if command.status != "acked":
+                self.counts["stale_acks"] += 1
+            return command
+
+    def get(self, command_id):
+        with self._lock:
+            command = self._commands.get(command_id)
+            return command.describe() if command else None
+
+    def stats(self):
+        with self._lock:
+            outstanding = sum(len(q) for q in self._queues.values())
+        return {
+            **self.counts,
+            "outstanding": outstanding,
+            "waiting_polls": self.waiting_polls,
+            "issue_to_delivery": self.delivery_latency.stats(),
+            "issue_to_ack": self.ack_latency.stats(),
+        }
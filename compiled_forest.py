@@ -0,0 +1,201 @@
+import json
+import os
+
+import numpy as np
+
+
+class CompiledForest:
+    """
+    RandomForestClassifier flattened into contiguous node arrays.
+    All trees share one set of arrays; tree t starts at roots[t].
+    Leaves point to themselves, so at most max_depth vectorised steps
+    walk every (row, tree) pair to its leaf without branching in Python.
+    """
+
+    def __init__(self, feature, threshold, children, value, roots, classes, max_depth):
+        self.feature = feature      # int32  [n_nodes] split feature (0 on leaves)
+        self.threshold = threshold  # float64[n_nodes] split threshold
+        self.children = children    # int32  [n_nodes, 2] (right, left): column 1 when X[f] <= threshold
+        self.value = value          # float64[n_nodes, n_classes] leaf class distribution
+        self.roots = roots          # int32  [n_trees] root node of each tree
+        self.classes = classes      # labels, same order as model.classes_
+        self.max_depth = int(max_depth)
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @classmethod
+    def from_sklearn(cls, forest):
+        features, thresholds, children, values, roots = [], [], [], [], []
+        offset = 0
+        max_depth = 0
+
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            n = tree.node_count
+            is_leaf = tree.children_left == -1
+            node_ids = np.arange(n)
+
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(tree.threshold)
+            children.append(np.stack([
+                np.where(is_leaf, node_ids, tree.children_right),
+                np.where(is_leaf, node_ids, tree.children_left),
+            ], axis=1) + offset)
+
+            # Same normalisation as DecisionTreeClassifier.predict_proba
+            leaf_value = tree.value[:, 0, :]
+            totals = leaf_value.sum(axis=1, keepdims=True)
+            totals[totals == 0.0] = 1.0
+            values.append(leaf_value / totals)
+
+            roots.append(offset)
+            offset += n
+            max_depth = max(max_depth, tree.max_depth)
+
+        return cls(
+            feature=np.ascontiguousarray(np.concatenate(features), dtype=np.int32),
+            threshold=np.ascontiguousarray(np.concatenate(thresholds), dtype=np.float64),
+            children=np.ascontiguousarray(np.concatenate(children), dtype=np.int32),
+            value=np.ascontiguousarray(np.concatenate(values), dtype=np.float64),
+            roots=np.asarray(roots, dtype=np.int32),
+            classes=np.asarray(forest.classes_),
+            max_depth=max_depth,
+        )
+
+    def apply(self, X, first_tree=0, last_tree=None):
+        """Leaf node of trees [first_tree, last_tree) for every row: int array [n_rows, n_trees]"""
+        # sklearn trees compare float32 inputs against float64 thresholds
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        flat_x = X.ravel()
+        row_offsets = (np.arange(X.shape[0]) * X.shape[1])[:, None]
+        flat_children = self.children.ravel()
+        roots = self.roots[first_tree:last_tree]
+        nodes = np.broadcast_to(roots, (X.shape[0], len(roots)))
+
+        for _ in range(self.max_depth):
+            go_left = flat_x[row_offsets + self.feature[nodes]] <= self.threshold[nodes]
+            next_nodes = flat_children[nodes * 2 + go_left]
+            if np.array_equal(next_nodes, nodes):
+                break  # every (row, tree) already sits on a leaf
+            nodes = next_nodes
+        return nodes
+
+    def predict_proba(self, X):
+        leaf_values = self.value[self.apply(X)]  # [n_rows, n_trees, n_classes]
+        # Accumulate tree by tree (cumsum is sequential) to match sklearn's rounding
+        return leaf_values.cumsum(axis=1)[:, -1, :] / self.n_trees
+
+    def predict(self, X):
+        return self.classes[np.argmax(self.predict_proba(X), axis=1)]
+
+    def predict_early_exit(self, X):
+        """
+        Scores trees in order and stops a row as soon as the remaining trees
+        cannot overturn its leading class. Each tree adds at most 1.0 to any
+        class, so a lead over the runner-up larger than the number of trees
+        left is final; the result always equals predict().
+
+        Returns (class indices, vote margins, trees evaluated per row). The
+        margin is leader minus runner-up, in trees, when the row stopped.
+        """
+        X = np.ascontiguousarray(np.atleast_2d(X), dtype=np.float32)
+        n_rows, n_classes = X.shape[0], self.value.shape[1]
+        votes = np.zeros((n_rows, n_classes))
+        margins = np.zeros(n_rows)
+        trees_evaluated = np.full(n_rows, self.n_trees, dtype=np.int32)
+        active = np.arange(n_rows)
+        done = 0
+
+        while len(active) and done < self.n_trees:
+            remaining = self.n_trees - done
+            if done:
+                top2 = np.sort(votes[active], axis=1)[:, -2:]
+                margin = top2[:, 1] - top2[:, 0]
+                final = margin > remaining + 1e-9
+                if final.any():
+                    margins[active[final]] = margin[final]
+                    trees_evaluated[active[final]] = done
+                    active = active[~final]
+                    margin = margin[~final]
+                    if not len(active):
+                        break
+            else:
+                margin = np.zeros(len(active))
+
+            # Fewest further trees after which some active row could become final:
+            # m trees can grow a margin by at most m while remaining shrinks by m
+            step = int(np.min((remaining - margin) // 2)) + 1
+            step = max(1, min(step, remaining))
+
+            leaf_values = self.value[self.apply(X[active], done, done + step)]
+            # Sequential accumulation in tree order, as in predict_proba
+            stacked = np.concatenate([votes[active][:, None, :], leaf_values], axis=1)
+            votes[active] = stacked.cumsum(axis=1)[:, -1, :]
+            done += step
+
+        if len(active):
+            top2 = np.sort(votes[active], axis=1)[:, -2:]
+            margins[active] = top2[:, 1] - top2[:, 0]
+
+        # Rows that stopped early have a decided leader; the rest match predict_proba
+        indices = np.argmax(votes / self.n_trees, axis=1)
+        return indices, margins, trees_evaluated
+
+    # --- ARRAY STORAGE ---
+    # One raw .npy file per node array plus meta.json. np.load(mmap_mode="r")
+    # maps them read-only, so every worker shares one page-cache copy.
+    ARRAYS = ("feature", "threshold", "children", "value", "roots")
+
+    def save(self, path):
+        os.makedirs(path, exist_ok=True)
+        for name in self.ARRAYS:
+            np.save(os.path.join(path, f"{name}.npy"), getattr(self, name))
+        meta = {
+            "classes": [str(c) for c in self.classes],
+            "max_depth": self.max_depth,
+            "n_trees": self.n_trees,
+        }
+        with open(os.path.join(path, "meta.json"), "w") as f:
+            json.dump(meta, f, indent=2)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        mode = "r" if mmap else None
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mode) for name in cls.ARRAYS}
+        return cls(classes=np.asarray(meta["classes"]), max_depth=meta["max_depth"], **arrays)
+
+
+def load_model(pkl_path, forest_path=None, use_mmap=False):
+    """
+    Returns (sklearn_model, compiled_forest). With use_mmap and an exported
+    forest directory, only the mapped arrays are loaded and sklearn_model is None.
+    """
+    if use_mmap and forest_path and os.path.isdir(forest_path):
+        return None, CompiledForest.load(forest_path, mmap=True)
+
+    import joblib
+    forest = joblib.load(pkl_path)
+    return forest, CompiledForest.from_sklearn(forest)
+
+
+def predict_class_indices(X, compiled, sklearn_model=None, backend="compiled", compiled_max_rows=256):
+    """
+    Index into compiled.classes for every row, plus the total number of
+    trees evaluated. "early_exit" always uses the compiled forest; otherwise
+    the compiled traversal serves small batches and sklearn (when loaded)
+    serves "sklearn" mode and big batches, where its Cython traversal is faster.
+    """
+    if backend == "early_exit":
+        indices, _, trees_evaluated = compiled.predict_early_exit(X)
+        return indices, int(trees_evaluated.sum())
+
+    small_batch = len(X) <= compiled_max_rows
+    if sklearn_model is None or (backend == "compiled" and small_batch):
+        proba = compiled.predict_proba(X)
+    else:
+        proba = sklearn_model.predict_proba(X)
+    return np.argmax(proba, axis=1), len(X) * compiled.n_trees
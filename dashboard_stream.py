@@ -0,0 +1,192 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# --- CONFIG ---
+# Upper bound on line-update messages per second to one dashboard; updates in between are coalesced
+STREAM_MAX_HZ = float(os.getenv("DASHBOARD_STREAM_MAX_HZ", "2"))
+# Fault events waiting for one client; a client that falls this far behind is disconnected
+STREAM_FAULT_QUEUE = int(os.getenv("DASHBOARD_STREAM_FAULT_QUEUE", "100"))
+STREAM_MAX_CLIENTS = int(os.getenv("DASHBOARD_STREAM_MAX_CLIENTS", "1000"))
+STREAM_KEEPALIVE_S = float(os.getenv("DASHBOARD_STREAM_KEEPALIVE_S", "15"))
+
+
+def sse(event, data):
+    """One Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+class StreamClient:
+    """Pending updates for one connected dashboard."""
+
+    __slots__ = ("substation_id", "lines", "faults", "wake", "overflowed")
+
+    def __init__(self, substation_id):
+        self.substation_id = substation_id
+        self.lines = {}  # (substation_id, line_id) -> latest state, overwritten until sent
+        self.faults = deque()
+        self.wake = asyncio.Event()
+        self.overflowed = False
+
+    def wants(self, substation_id):
+        return self.substation_id is None or self.substation_id == substation_id
+
+
+class DashboardBroadcaster:
+    """
+    Fans live line state and new fault events out to streaming dashboards.
+
+    Publishers (the ingest path) only touch each client's pending dict and
+    fault deque under one lock, then wake the client's stream coroutine.
+    Fault events are sent as soon as the coroutine runs. Line updates for
+    the same line are coalesced to the latest value and sent at most
+    max_hz times a second, so a slow reader sees fewer, fresher updates.
+    Fault events are never coalesced: a client
+    whose fault backlog exceeds STREAM_FAULT_QUEUE is told so and dropped
+    (it reconnects and resyncs from the snapshot) rather than buffering
+    without limit.
+    """
+
+    def __init__(self, max_hz=STREAM_MAX_HZ, fault_queue=STREAM_FAULT_QUEUE,
+                 max_clients=STREAM_MAX_CLIENTS, keepalive_s=STREAM_KEEPALIVE_S):
+        self.min_interval = 1.0 / max_hz if max_hz > 0 else 0.0
+        self.fault_queue = fault_queue
+        self.max_clients = max_clients
+        self.keepalive_s = keepalive_s
+        self._clients = set()
+        self._lock = threading.Lock()
+        self._loop = None
+        self.published = 0
+        self.dropped_clients = 0
+        self.rejected_clients = 0
+        self.messages_sent = 0
+        self.coalesced = 0
+
+    @property
+    def has_clients(self):
+        return bool(self._clients)
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+
+    def _wake(self, client):
+        # Publishers may run on worker threads; asyncio.Event is loop-bound
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            client.wake.set()
+        elif self._loop is not None:
+            self._loop.call_soon_threadsafe(client.wake.set)
+
+    def publish_line(self, state):
+        """state: LineState dict as returned by live_state."""
+        key = (state["substation_id"], state["line_id"])
+        with self._lock:
+            if not self._clients:
+                return
+            self.published += 1
+            targets = []
+            for client in self._clients:
+                if not client.overflowed and client.wants(key[0]):
+                    if key in client.lines:
+                        self.coalesced += 1
+                    client.lines[key] = state
+                    targets.append(client)
+        for client in targets:
+            self._wake(client)
+
+    def publish_fault(self, event):
+        with self._lock:
+            if not self._clients:
+                return
+            self.published += 1
+            targets = []
+            for client in self._clients:
+                if client.overflowed or not client.wants(event["substation_id"]):
+                    continue
+                if len(client.faults) >= self.fault_queue:
+                    client.overflowed = True
+                    client.faults.clear()
+                    client.lines.clear()
+                else:
+                    client.faults.append(event)
+                targets.append(client)
+        for client in targets:
+            self._wake(client)
+
+    def _take_faults(self, client):
+        with self._lock:
+            faults = list(client.faults)
+            client.faults.clear()
+            return faults, client.overflowed
+
+    def _take_lines(self, client):
+        with self._lock:
+            lines, client.lines = client.lines, {}
+            return list(lines.values())
+
+    async def stream(self, substation_id=None, snapshot=None):
+        """
+        Async generator of SSE messages for one client: the initial snapshot,
+        then fault events as they happen and line updates at most max_hz.
+        """
+        client = StreamClient(substation_id)
+        with self._lock:
+            if len(self._clients) >= self.max_clients:
+                self.rejected_clients += 1
+                yield sse("overflow", {"reason": "too many stream clients"})
+                return
+            self._clients.add(client)
+        try:
+            yield sse("snapshot", {"lines": snapshot or [], "at": time.time()})
+            last_lines = 0.0
+            while True:
+                client.wake.clear()
+
+                # Faults go out immediately, never coalesced
+                faults, overflowed = self._take_faults(client)
+                if overflowed:
+                    self.dropped_clients += 1
+                    yield sse("overflow", {"reason": "client too slow, reconnect to resync"})
+                    return
+                for fault in faults:
+                    yield sse("fault", dict(fault, at=time.time()))
+                self.messages_sent += len(faults)
+
+                # Line updates: latest value per line, rate limited
+                if time.monotonic() - last_lines >= self.min_interval:
+                    lines = self._take_lines(client)
+                    if lines:
+                        yield sse("lines", {"lines": lines, "at": time.time()})
+                        self.messages_sent += 1
+                        last_lines = time.monotonic()
+
+                with self._lock:
+                    pending = bool(client.lines)
+                timeout = max(0.0, last_lines + self.min_interval - time.monotonic()) if pending else self.keepalive_s
+                try:
+                    await asyncio.wait_for(client.wake.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    if not pending:
+                        yield ": keepalive\n\n"
+        finally:
+            with self._lock:
+                self._clients.discard(client)
+
+    def stats(self):
+        with self._lock:
+            clients = list(self._clients)
+        return {
+            "clients": len(clients),
+            "published": self.published,
+            "messages_sent": self.messages_sent,
+            "coalesced_updates": self.coalesced,
+            "dropped_clients": self.dropped_clients,
+            "rejected_clients": self.rejected_clients,
+            "max_hz": 1.0 / self.min_interval if self.min_interval else None,
+        }
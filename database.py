@@ -1,11 +1,53 @@
-from sqlalchemy import create_engine
+import os
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, declarative_base
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./grid.db"
+SQLALCHEMY_DATABASE_URL = os.getenv("GRID_DB_URL", "sqlite:///./grid.db")
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+# "default" = one plain engine, SQLite's rollback journal (writers block dashboard readers)
+# "tuned"   = WAL + tuned pragmas, a single writer connection and a pool of read-only readers
+STORAGE_PROFILE = os.getenv("GRID_DB_PROFILE", "default")
+READER_POOL_SIZE = int(os.getenv("GRID_DB_READERS", "8"))
+
+# Applied on every new connection in the tuned profile
+TUNED_PRAGMAS = [
+    ("busy_timeout", 5000),        # wait for the write lock instead of failing at once
+    ("journal_mode", "WAL"),       # readers never block the writer and vice versa
+    ("synchronous", "NORMAL"),     # fsync at checkpoints, not every commit (safe with WAL)
+    ("cache_size", -65536),        # 64 MiB page cache per connection
+    ("mmap_size", 268435456),      # read pages straight from a 256 MiB mapping
+    ("temp_store", "MEMORY"),
+]
+
+def _pragma_listener(pragmas):
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas:
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+    return set_pragmas
+
+def create_engines(url=SQLALCHEMY_DATABASE_URL, profile=STORAGE_PROFILE, readers=READER_POOL_SIZE):
+    """Returns (writer_engine, reader_engine). Both are the same engine in the default profile."""
+    connect_args = {"check_same_thread": False}
+    if profile == "default":
+        engine = create_engine(url, connect_args=connect_args)
+        return engine, engine
+    if profile != "tuned":
+        raise ValueError(f"Unknown storage profile '{profile}'. Use 'default' or 'tuned'")
+
+    # One connection: writes queue in the pool instead of fighting over SQLite's lock
+    writer = create_engine(url, connect_args=connect_args, pool_size=1, max_overflow=0, pool_timeout=30)
+    event.listen(writer, "connect", _pragma_listener(TUNED_PRAGMAS))
+
+    reader = create_engine(url, connect_args=connect_args, pool_size=readers, max_overflow=0, pool_timeout=30)
+    event.listen(reader, "connect", _pragma_listener(TUNED_PRAGMAS + [("query_only", "ON")]))
+    return writer, reader
+
+engine, read_engine = create_engines()
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
 Base = declarative_base()
 
 def get_db():
@@ -13,4 +55,12 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+def get_read_db():
+    """Session for endpoints that only read; never holds the writer connection."""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
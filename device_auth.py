@@ -0,0 +1,258 @@
+"""
+HMAC authentication for /hardware/* requests.
+
+Each device has a shared secret in DEVICE_KEYS_FILE ({"device id": "secret"}).
+A device can be limited to the lines it controls with
+{"device id": {"secret": "...", "lines": ["SUB-01/LINE-001", "SUB-02/*"]}};
+the command routes then refuse to poll or ack any other line's commands.
+A plain string secret leaves the device unrestricted.
+A request carries
+
+    X-Device-Id         the device id
+    X-Device-Counter    a number that increases with every request
+    X-Device-Signature  hex HMAC-SHA256(secret, id \\n counter \\n METHOD \\n path?query \\n sha256(body))
+
+Verification is one SHA-256 of the body and one HMAC against an in-memory
+key table; no database access. The key file is re-read when its mtime
+changes (checked at most every DEVICE_KEYS_RELOAD_S), so keys can be added
+or rotated without a restart. Replays are caught with a per-device sliding
+window: the highest counter seen plus a DEVICE_REPLAY_WINDOW-bit bitmap of
+the counters just below it, so slightly out-of-order requests still pass.
+
+Window state lives in memory and restarts empty; DeviceSigner starts its
+counter from the clock so a restarted device keeps moving forward.
+
+DEVICE_AUTH_MODE: "off" (no checks), "monitor" (check and count, never
+reject) or "enforce" (401 on any failure).
+"""
+import hashlib
+import hmac
+import json
+import os
+import threading
+import time
+
+import requests
+from fastapi import HTTPException, Request, status
+
+# --- CONFIG ---
+DEVICE_AUTH_MODE = os.getenv("DEVICE_AUTH_MODE", "off")
+DEVICE_KEYS_FILE = os.getenv("DEVICE_KEYS_FILE", "device_keys.json")
+DEVICE_KEYS_RELOAD_S = float(os.getenv("DEVICE_KEYS_RELOAD_S", "5"))
+DEVICE_REPLAY_WINDOW = int(os.getenv("DEVICE_REPLAY_WINDOW", "64"))
+MODES = ("off", "monitor", "enforce")
+
+HEADER_ID = "X-Device-Id"
+HEADER_COUNTER = "X-Device-Counter"
+HEADER_SIGNATURE = "X-Device-Signature"
+REASONS = ("missing_headers", "unknown_device", "bad_signature", "replayed", "too_old", "wrong_line")
+
+
+def signature(key, device_id, counter, method, path, body):
+    """Hex HMAC-SHA256 over the request. path includes the query string, exactly as sent."""
+    message = b"\n".join([
+        device_id.encode(), str(counter).encode(), method.upper().encode(), path.encode(),
+        hashlib.sha256(body or b"").hexdigest().encode(),
+    ])
+    return hmac.new(key, message, hashlib.sha256).hexdigest()
+
+
+class _ReplayWindow:
+    __slots__ = ("highest", "seen")
+
+    def __init__(self):
+        self.highest = 0
+        self.seen = 0  # bit i set = counter (highest - i) already used
+
+    def accept(self, counter, size):
+        """None if the counter is fresh (and records it), else the rejection reason."""
+        if counter > self.highest:
+            shift = counter - self.highest
+            self.seen = ((self.seen << shift) | 1) & ((1 << size) - 1) if shift < size else 1
+            self.highest = counter
+            return None
+        offset = self.highest - counter
+        if offset >= size:
+            return "too_old"
+        if self.seen >> offset & 1:
+            return "replayed"
+        self.seen |= 1 << offset
+        return None
+
+
+class DeviceVerifier:
+    def __init__(self, keys_file=DEVICE_KEYS_FILE, mode=DEVICE_AUTH_MODE, window=DEVICE_REPLAY_WINDOW,
+                 reload_s=DEVICE_KEYS_RELOAD_S):
+        if mode not in MODES:
+            raise ValueError(f"Unknown DEVICE_AUTH_MODE '{mode}'. Use one of {MODES}")
+        self.keys_file = keys_file
+        self.mode = mode
+        self.window = max(1, int(window))
+        self.reload_s = reload_s
+        self._keys = {}  # device id -> secret bytes; replaced wholesale on reload
+        self._lines = {}  # device id -> frozenset of "SUB/LINE" and "SUB/*"; absent = any line
+        self._mtime = None
+        self._next_check = 0.0
+        self._windows = {}  # device id -> _ReplayWindow
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+
+        self.accepted = 0
+        self.rejected = dict.fromkeys(REASONS, 0)
+        self.reloads = 0
+        self.reload_errors = 0
+        if mode != "off":
+            self.reload()
+
+    # --- key table ---
+
+    def reload(self):
+        """Re-reads the key file. On any error the current table stays in place."""
+        with self._reload_lock:
+            try:
+                mtime = os.stat(self.keys_file).st_mtime_ns
+                with open(self.keys_file) as f:
+                    table = json.load(f)
+                keys, lines = {}, {}
+                for device, entry in table.items():
+                    if isinstance(entry, dict):
+                        keys[str(device)] = str(entry["secret"]).encode()
+                        if entry.get("lines") is not None:
+                            lines[str(device)] = frozenset(str(line) for line in entry["lines"])
+                    else:
+                        keys[str(device)] = str(entry).encode()
+            except (OSError, ValueError, AttributeError, KeyError, TypeError) as e:
+                self.reload_errors += 1
+                print(f"⚠️ DEVICE KEYS: could not load {self.keys_file} ({e}), keeping {len(self._keys)} keys")
+                return False
+            self._keys, self._lines, self._mtime = keys, lines, mtime
+            self.reloads += 1
+            print(f"🔑 DEVICE KEYS: {len(keys)} devices loaded from {self.keys_file}")
+            return True
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + self.reload_s
+        try:
+            mtime = os.stat(self.keys_file).st_mtime_ns
+        except OSError:
+            return
+        if mtime != self._mtime:
+            self.reload()
+
+    # --- verification ---
+
+    def verify(self, device_id, counter, sig, method, path, body):
+        """None if the request is authentic and fresh, else the rejection reason."""
+        if not (device_id and counter and sig):
+            return self._reject("missing_headers")
+        self._maybe_reload()
+        key = self._keys.get(device_id)
+        if key is None:
+            return self._reject("unknown_device")
+        try:
+            counter = int(counter)
+        except ValueError:
+            return self._reject("missing_headers")
+        if counter <= 0 or not hmac.compare_digest(signature(key, device_id, counter, method, path, body), sig):
+            return self._reject("bad_signature")
+        # Only authentic requests may move the window
+        with self._lock:
+            window = self._windows.get(device_id)
+            if window is None:
+                window = self._windows[device_id] = _ReplayWindow()
+            reason = window.accept(counter, self.window)
+            if reason is None:
+                self.accepted += 1
+                return None
+            self.rejected[reason] += 1
+            return reason
+
+    def allows(self, device_id, substation_id, line_id):
+        """True if the device's key may act for this line."""
+        allowed = self._lines.get(device_id)
+        return allowed is None or f"{substation_id}/{line_id}" in allowed or f"{substation_id}/*" in allowed
+
+    def check_line(self, request: Request, substation_id, line_id):
+        """
+        Route-level check that the authenticated device is bound to this line.
+        Requests that failed authentication in monitor mode were already counted
+        and are not checked again.
+        """
+        device_id = getattr(request.state, "device_id", None)
+        if self.mode == "off" or device_id is None or self.allows(device_id, substation_id, line_id):
+            return
+        self._reject("wrong_line")
+        if self.mode == "enforce":
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
+                                detail=f"Device {device_id} is not bound to {substation_id}/{line_id}")
+
+    def _reject(self, reason):
+        with self._lock:
+            self.rejected[reason] += 1
+        return reason
+
+    async def __call__(self, request: Request):
+        """FastAPI dependency for device routes."""
+        if self.mode == "off":
+            return None
+        headers = request.headers
+        path = (request.scope.get("raw_path") or request.url.path.encode()).decode("latin-1")
+        if request.scope.get("query_string"):
+            path += "?" + request.scope["query_string"].decode("latin-1")
+        reason = self.verify(headers.get(HEADER_ID), headers.get(HEADER_COUNTER), headers.get(HEADER_SIGNATURE),
+                             request.method, path, await request.body())
+        if reason is not None:
+            if self.mode == "enforce":
+                raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=f"Device authentication failed: {reason}")
+            return None
+        request.state.device_id = headers.get(HEADER_ID)
+        return request.state.device_id
+
+    def stats(self):
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "keys": len(self._keys),
+                "line_bound_keys": len(self._lines),
+                "devices_seen": len(self._windows),
+                "accepted": self.accepted,
+                "rejected": dict(self.rejected),
+                "reloads": self.reloads,
+                "reload_errors": self.reload_errors,
+            }
+
+
+class DeviceSigner(requests.auth.AuthBase):
+    """
+    Client side: requests.post(url, json=..., auth=DeviceSigner(id, secret)).
+    Signs the exact bytes requests is about to send. Thread-safe.
+    """
+
+    def __init__(self, device_id, key):
+        self.device_id = device_id
+        self.key = key.encode() if isinstance(key, str) else key
+        self._lock = threading.Lock()
+        # Microseconds since the epoch: always above whatever this device sent before a restart
+        self._counter = time.time_ns() // 1000
+
+    def next_counter(self):
+        with self._lock:
+            self._counter += 1
+            return self._counter
+
+    def __call__(self, r):
+        body = r.body.encode() if isinstance(r.body, str) else r.body
+        counter = self.next_counter()
+        r.headers[HEADER_ID] = self.device_id
+        r.headers[HEADER_COUNTER] = str(counter)
+        r.headers[HEADER_SIGNATURE] = signature(self.key, self.device_id, counter, r.method, r.path_url, body)
+        return r
+
+
+def signer_from_env(prefix):
+    """DeviceSigner from <prefix>_DEVICE_ID / <prefix>_DEVICE_KEY, or None (unsigned) if unset."""
+    device_id = os.getenv(f"{prefix}_DEVICE_ID", "")
+    return DeviceSigner(device_id, os.getenv(f"{prefix}_DEVICE_KEY", "")) if device_id else None
@@ -0,0 +1,30 @@
+"""
+Exports the trained forest into the memory-mappable array format used by
+ai_engine when AI_MODEL_FORMAT=mmap.
+
+Usage: python export_model.py [model.pkl] [output.forest]
+Re-run after every retrain with `ML model.py`.
+"""
+import os
+import sys
+
+import joblib
+
+import ai_engine
+from compiled_forest import CompiledForest
+
+
+def export(pkl_path, out_path):
+    forest = joblib.load(pkl_path)
+    compiled = CompiledForest.from_sklearn(forest)
+    compiled.save(out_path)
+
+    size = sum(os.path.getsize(os.path.join(out_path, f)) for f in os.listdir(out_path))
+    print(f"✅ Exported {compiled.n_trees} trees ({len(compiled.feature)} nodes, {size / 1024:.0f} KiB) to {out_path}")
+    return out_path
+
+
+if __name__ == "__main__":
+    src = sys.argv[1] if len(sys.argv) > 1 else ai_engine.MODEL_PATH
+    dst = sys.argv[2] if len(sys.argv) > 2 else os.path.splitext(src)[0] + ".forest"
+    export(src, dst)
@@ -0,0 +1,205 @@
+"""
+Write-behind writer for models.FaultLog.
+
+Rows are buffered in memory and written with one bulk INSERT in one
+transaction every flush_interval_ms or every max_rows rows, whichever comes
+first. That turns a fault storm's per-row SQLite fsyncs into one per flush.
+
+Durability modes (FAULT_LOG_DURABILITY) trade flush interval against rows
+at risk if the process dies:
+  strict   - flush inside add(); nothing is ever only in memory
+  balanced - flush every 50 ms / 200 rows (default)
+  relaxed  - flush every 1000 ms / 5000 rows
+FAULT_LOG_FLUSH_MS / FAULT_LOG_FLUSH_ROWS override the mode's numbers.
+
+When a flush fails the rows stay buffered and the worker retries with
+exponential backoff (up to FAULT_LOG_MAX_BACKOFF_S). At most
+FAULT_LOG_MAX_BUFFERED rows are kept; beyond that the oldest are dropped
+and counted, so a database that stays down cannot exhaust memory.
+"""
+import atexit
+import os
+import threading
+import time
+
+from sqlalchemy import insert
+
+import models
+from metrics import LatencyTracker
+
+FAULT_LOG_MAX_BUFFERED = int(os.getenv("FAULT_LOG_MAX_BUFFERED", "100000"))
+FAULT_LOG_MAX_BACKOFF_S = float(os.getenv("FAULT_LOG_MAX_BACKOFF_S", "5"))
+
+DURABILITY_MODES = {
+    "strict": (0, 1),
+    "balanced": (50, 200),
+    "relaxed": (1000, 5000),
+}
+
+
+class FaultLogWriter:
+    def __init__(self, session_factory, durability="balanced", flush_interval_ms=None, max_rows=None,
+                 max_buffered=FAULT_LOG_MAX_BUFFERED, max_backoff_s=FAULT_LOG_MAX_BACKOFF_S):
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"Unknown durability mode '{durability}'. Use one of {tuple(DURABILITY_MODES)}")
+        default_ms, default_rows = DURABILITY_MODES[durability]
+        self.session_factory = session_factory
+        self.durability = durability
+        self.flush_interval_s = (default_ms if flush_interval_ms is None else flush_interval_ms) / 1000.0
+        self.max_rows = max(1, default_rows if max_rows is None else max_rows)
+        self.max_buffered = max(self.max_rows, max_buffered)
+        self.max_backoff_s = max_backoff_s
+
+        self._buffer = []
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()  # one transaction at a time
+        self._worker = None
+        self._closed = False
+        self._stop = threading.Event()  # cuts a retry backoff short on close()
+
+        self.rows_written = 0
+        self.flushes = 0
+        self.errors = 0
+        self.dropped_rows = 0
+        self.consecutive_failures = 0
+        self.largest_flush = 0
+        self.flush_latency = LatencyTracker()
+        self.row_age = LatencyTracker()  # add() -> committed
+
+    def _trim(self):
+        """Drop the oldest rows past max_buffered. Caller holds self._cond."""
+        excess = len(self._buffer) - self.max_buffered
+        if excess > 0:
+            del self._buffer[:excess]
+            self.dropped_rows += excess
+            print(f"❌ FAULT LOG BUFFER FULL: dropped {excess} oldest rows ({self.dropped_rows} total)")
+
+    @property
+    def synchronous(self):
+        return self.flush_interval_s <= 0 or self.max_rows <= 1
+
+    def start(self):
+        with self._cond:
+            if self._worker is None and not self.synchronous:
+                self._closed = False
+                self._stop.clear()
+                self._worker = threading.Thread(target=self._run, name="faultlog-writer", daemon=True)
+                self._worker.start()
+                atexit.register(self.close)
+
+    def add(self, rows):
+        """Queue FaultLog column dicts. In strict mode they are committed before this returns."""
+        if not rows:
+            return
+        stamped = [(row, time.perf_counter()) for row in rows]
+        if self.synchronous:
+            with self._cond:
+                self._buffer.extend(stamped)
+                self._trim()
+            self.flush()
+            return
+
+        if self._worker is None:
+            self.start()
+        with self._cond:
+            self._buffer.extend(stamped)
+            self._trim()
+            if len(self._buffer) >= self.max_rows:
+                self._cond.notify()
+
+    def flush(self):
+        """Write everything buffered so far in one transaction."""
+        with self._flush_lock:
+            with self._cond:
+                pending, self._buffer = self._buffer, []
+            if not pending:
+                return 0
+
+            started = time.perf_counter()
+            db = self.session_factory()
+            try:
+                db.execute(insert(models.FaultLog), [row for row, _ in pending])
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                self.errors += 1
+                self.consecutive_failures += 1
+                print(f"❌ FAULT LOG FLUSH ERROR ({len(pending)} rows kept for retry): {e}")
+                with self._cond:
+                    self._buffer[:0] = pending
+                    self._trim()
+                return 0
+            finally:
+                db.close()
+
+            committed = time.perf_counter()
+            self.consecutive_failures = 0
+            self.flush_latency.observe(committed - started)
+            for _, added in pending:
+                self.row_age.observe(committed - added)
+            self.flushes += 1
+            self.rows_written += len(pending)
+            self.largest_flush = max(self.largest_flush, len(pending))
+            return len(pending)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._buffer and not self._closed:
+                    self._cond.wait()  # idle until the first row arrives
+                if self._closed and not self._buffer:
+                    return
+                # Give the batch up to one interval to fill, unless it is already full
+                deadline = time.monotonic() + self.flush_interval_s
+                while len(self._buffer) < self.max_rows and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+            if not self.flush() and self._buffer:
+                if self._closed:
+                    return  # close() makes the last attempt; don't retry forever on shutdown
+                # Write failed: back off (doubling, capped) before retrying
+                backoff = max(self.flush_interval_s, 0.05) * 2 ** min(self.consecutive_failures - 1, 16)
+                self._stop.wait(min(backoff, self.max_backoff_s))
+
+    def close(self):
+        """Flush on shutdown and stop the background thread."""
+        with self._cond:
+            self._closed = True
+            self._stop.set()
+            self._cond.notify_all()
+            worker, self._worker = self._worker, None
+        if worker is not None:
+            worker.join(timeout=10)
+        self.flush()
+
+    def stats(self):
+        with self._cond:
+            buffered = len(self._buffer)
+        return {
+            "durability": self.durability,
+            "flush_interval_ms": self.flush_interval_s * 1000.0,
+            "flush_rows": self.max_rows,
+            "buffered_rows_at_risk": buffered,
+            "rows_written": self.rows_written,
+            "flushes": self.flushes,
+            "avg_rows_per_flush": self.rows_written / self.flushes if self.flushes else 0.0,
+            "largest_flush": self.largest_flush,
+            "errors": self.errors,
+            "consecutive_failures": self.consecutive_failures,
+            "dropped_rows": self.dropped_rows,
+            "flush_latency": self.flush_latency.stats(),
+            "row_age_at_commit": self.row_age.stats(),
+        }
+
+
+def from_env(session_factory):
+    flush_ms = os.getenv("FAULT_LOG_FLUSH_MS")
+    flush_rows = os.getenv("FAULT_LOG_FLUSH_ROWS")
+    return FaultLogWriter(
+        session_factory,
+        durability=os.getenv("FAULT_LOG_DURABILITY", "balanced"),
+        flush_interval_ms=float(flush_ms) if flush_ms else None,
+        max_rows=int(flush_rows) if flush_rows else None,
+    )
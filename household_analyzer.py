@@ -1,12 +1,53 @@
 """
 Household Electricity Management - Simplified
-Only email notifications for trip count > 5
+Trip / voltage rules for meter readings and email notifications for trip count > 5
 """
 
+import os
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 
+import numpy as np
+
+# --- READING RULES ---
+THRESHOLD_POWER = 5.0  # kW; a reading above this counts as a trip
+TRIP_LIMIT = 5  # Email sent when trip_count reaches this
+VOLTAGE_LOW_BELOW = 130.0
+PHASE_CHANGE_MAX = 180.0
+# Largest upload accepted by /api/consumer/readings/batch
+BATCH_MAX_READINGS = int(os.getenv("CONSUMER_BATCH_MAX", "20000"))
+
+# Index = code returned by classify_voltages
+FAULT_TYPES = (None, "VOLTAGE_LOW", "PHASE_CHANGE")
+FAULT_MESSAGES = (
+    "Normal operation",
+    "⚠️ VOLTAGE FLUCTUATION: Voltage below 130V detected",
+    "⚠️ PHASE CHANGE: Voltage between 130-180V (phase change detected)",
+)
+
+
+def classify_voltages(voltages):
+    """Fault code per reading: 0 normal, 1 VOLTAGE_LOW (< 130 V), 2 PHASE_CHANGE (130-180 V)."""
+    voltages = np.asarray(voltages, dtype=np.float64)
+    return np.select([voltages < VOLTAGE_LOW_BELOW, voltages <= PHASE_CHANGE_MAX], [1, 2], 0).astype(np.uint8)
+
+
+def classify_voltage(voltage):
+    """(fault_type, message) for one reading."""
+    code = int(classify_voltages([voltage])[0])
+    return FAULT_TYPES[code], FAULT_MESSAGES[code]
+
+
+def trips(power_kw):
+    """True where the reading exceeds the threshold power."""
+    return np.asarray(power_kw, dtype=np.float64) > THRESHOLD_POWER
+
+
+def should_email(trip_count, consumer_email):
+    """Threshold email rule shared by the single and batch reading endpoints."""
+    return bool(consumer_email) and trip_count >= TRIP_LIMIT
+
 
 def send_threshold_increase_email(consumer_email: str, consumer_name: str, trip_count: int):
     """
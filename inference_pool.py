@@ -0,0 +1,100 @@
+"""
+Fault-model inference in worker processes, outside the API process's GIL.
+
+Workers are started with "spawn" (safe next to uvicorn's threads) and load
+each model file once, on first use, through compiled_forest.load_model.
+Requests carry a float32 C-contiguous matrix - the dtype both backends
+score in anyway - and replies are int8 class indices (plus a tree count), so the only data
+crossing the process boundary is one raw buffer each way.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+import compiled_forest
+
+# --- WORKER SIDE ---
+
+_worker_models = {}  # (pkl_path, forest_path, use_mmap) -> (sklearn_model, compiled)
+
+
+def _get_model(key):
+    if key not in _worker_models:
+        _worker_models[key] = compiled_forest.load_model(*key)
+    return _worker_models[key]
+
+
+def _init_worker(model_key):
+    _get_model(model_key)
+
+
+def _predict_in_worker(model_key, X, backend, compiled_max_rows):
+    sklearn_model, compiled = _get_model(model_key)
+    indices, trees_evaluated = compiled_forest.predict_class_indices(X, compiled, sklearn_model, backend, compiled_max_rows)
+    return indices.astype(np.int8), trees_evaluated
+
+
+# --- API PROCESS SIDE ---
+
+class ProcessInferencePool:
+    def __init__(self, pkl_path, forest_path, use_mmap, workers=None):
+        self.model_key = (pkl_path, forest_path, use_mmap)
+        self.workers = workers or max(1, (os.cpu_count() or 2) // 2)
+        self._executor = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._calls = 0
+        self._rows = 0
+
+    def start(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.model_key,),
+                )
+                print(f"🧠 AI ENGINE: Started {self.workers} inference worker processes")
+        return self._executor
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def predict_indices(self, X, backend="compiled", compiled_max_rows=256, model_key=None):
+        """Returns (class indices, trees evaluated), like compiled_forest.predict_class_indices."""
+        executor = self._executor or self.start()
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        with self._lock:
+            self._in_flight += 1
+            self._calls += 1
+            self._rows += len(X)
+        try:
+            future = executor.submit(_predict_in_worker, model_key or self.model_key, X, backend, compiled_max_rows)
+            return future.result()
+        except BrokenProcessPool:
+            # A worker died (OOM, kill); drop the pool so the next call starts a fresh one
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+            raise
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "running": self._executor is not None,
+                "workers": self.workers,
+                "in_flight": self._in_flight,
+                "calls": self._calls,
+                "rows": self._rows,
+            }
@@ -0,0 +1,141 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class MicroBatchScheduler:
+    """
+    Collects feature rows from concurrent callers and scores them together.
+    A batch closes when max_batch_size rows are waiting or max_wait_ms has
+    passed since its first row arrived, whichever comes first. Each caller
+    gets a Future that resolves to the labels for its own rows.
+    """
+
+    def __init__(self, predict_fn, max_batch_size=64, max_wait_ms=2.0):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait_s = max(0.0, float(max_wait_ms)) / 1000.0
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._running = False
+
+        # Counters (read through stats())
+        self._batches = 0
+        self._requests = 0
+        self._rows = 0
+        self._full_batches = 0
+        self._wait_total_s = 0.0
+
+    def start(self):
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+            self._worker = threading.Thread(target=self._run, name="ai-microbatch", daemon=True)
+            self._worker.start()
+
+    def stop(self):
+        with self._lock:
+            if not self._running:
+                return
+            self._running = False
+        self._queue.put(None)
+        self._worker.join(timeout=5)
+        # Fail whatever is still queued so no caller waits on a Future forever
+        with self._lock:
+            if self._running:
+                return  # a submit() restarted the worker; it owns the queue now
+            leftover = []
+            while True:
+                try:
+                    leftover.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if self._worker.is_alive():
+                self._queue.put(None)  # still finishing a batch; let it exit afterwards
+        for item in leftover:
+            if item is not None and not item[1].done():
+                item[1].set_exception(RuntimeError("Inference scheduler stopped"))
+
+    def submit(self, features):
+        """Queue an N x 14 block. Returns a Future of N labels."""
+        if not self._running:
+            self.start()
+        block = np.atleast_2d(np.asarray(features, dtype=np.float64))
+        future = Future()
+        self._queue.put((block, future, time.perf_counter()))
+        return future
+
+    def predict(self, features):
+        return self.submit(features).result()
+
+    def _collect(self, first):
+        batch = [first]
+        rows = len(first[0])
+        deadline = first[2] + self.max_wait_s
+
+        while rows < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)  # let _run see the stop marker
+                break
+            batch.append(item)
+            rows += len(item[0])
+        return batch, rows
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+
+            batch, rows = self._collect(first)
+            started = time.perf_counter()
+            matrix = np.vstack([block for block, _, _ in batch])
+
+            try:
+                labels = self.predict_fn(matrix)
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                labels = None
+
+            if labels is not None:
+                offset = 0
+                for block, future, _ in batch:
+                    future.set_result(list(labels[offset:offset + len(block)]))
+                    offset += len(block)
+
+            with self._lock:
+                self._batches += 1
+                self._requests += len(batch)
+                self._rows += rows
+                if rows >= self.max_batch_size:
+                    self._full_batches += 1
+                self._wait_total_s += sum(started - queued for _, _, queued in batch)
+
+    def stats(self):
+        with self._lock:
+            batches = self._batches
+            return {
+                "running": self._running,
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait_s * 1000.0,
+                "queued": self._queue.qsize(),
+                "batches": batches,
+                "requests": self._requests,
+                "rows": self._rows,
+                "full_batches": self._full_batches,
+                "avg_batch_rows": self._rows / batches if batches else 0.0,
+                "fill_ratio": self._rows / (batches * self.max_batch_size) if batches else 0.0,
+                "avg_queue_wait_ms": self._wait_total_s / self._requests * 1000.0 if self._requests else 0.0,
+            }
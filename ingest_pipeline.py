@@ -0,0 +1,128 @@
+"""
+Staged telemetry ingest: parse -> record + infer + dispatch -> (ack) -> persist / notify.
+
+Recording (history, rollups, archive), inference and command dispatch run
+together in one threadpool call, so the event loop never waits on their
+locks. The breaker command goes back to the device as soon as that is
+done. Fault rows and alerts are handed to background consumers through
+bounded asyncio queues:
+  * persist - when full, the handler waits (backpressure), fault rows are never dropped
+  * notify  - when full, the alert is dropped and counted
+"""
+import asyncio
+import time
+
+from starlette.concurrency import run_in_threadpool
+
+from metrics import LatencyTracker
+
+STAGES = ("parse", "record", "infer", "dispatch", "enqueue", "persist", "notify", "ack")
+
+
+class IngestPipeline:
+    def __init__(self, infer_fn, persist_fn, notify_fn, persist_queue_size=10000, notify_queue_size=1000):
+        self.infer_fn = infer_fn        # (records, *args) -> results, runs on the threadpool
+        self.persist_fn = persist_fn    # (list of fault events) -> None, runs on the threadpool
+        self.notify_fn = notify_fn      # (fault event) -> None, runs on the threadpool
+        self.persist_queue_size = persist_queue_size
+        self.notify_queue_size = notify_queue_size
+
+        self.latency = {stage: LatencyTracker() for stage in STAGES}
+        self.notify_dropped = 0
+        self.persist_errors = 0
+        self.notify_errors = 0
+
+        self._persist_queue = None
+        self._notify_queue = None
+        self._tasks = []
+
+    @property
+    def running(self):
+        return bool(self._tasks)
+
+    def start(self):
+        """Create the queues and consumers on the running event loop."""
+        if self.running:
+            return
+        self._persist_queue = asyncio.Queue(maxsize=self.persist_queue_size)
+        self._notify_queue = asyncio.Queue(maxsize=self.notify_queue_size)
+        self._tasks = [
+            asyncio.create_task(self._persist_loop(), name="ingest-persist"),
+            asyncio.create_task(self._notify_loop(), name="ingest-notify"),
+        ]
+
+    async def stop(self):
+        """Drain both queues, then stop the consumers."""
+        if not self.running:
+            return
+        await self._persist_queue.join()
+        await self._notify_queue.join()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def observe(self, stage, started):
+        self.latency[stage].observe(time.perf_counter() - started)
+
+    async def infer(self, records, *args):
+        started = time.perf_counter()
+        results = await run_in_threadpool(self.infer_fn, records, *args)
+        self.observe("infer", started)
+        return results
+
+    async def enqueue(self, fault_events):
+        if not fault_events:
+            return
+        if not self.running:
+            self.start()
+        queued_at = time.perf_counter()
+        for event in fault_events:
+            await self._persist_queue.put((event, queued_at))
+            try:
+                self._notify_queue.put_nowait((event, queued_at))
+            except asyncio.QueueFull:
+                self.notify_dropped += 1
+        self.observe("enqueue", queued_at)
+
+    async def _persist_loop(self):
+        while True:
+            items = [await self._persist_queue.get()]
+            # Whatever else is already waiting goes into the same write
+            while not self._persist_queue.empty():
+                items.append(self._persist_queue.get_nowait())
+            try:
+                await run_in_threadpool(self.persist_fn, [event for event, _ in items])
+            except Exception as e:
+                self.persist_errors += 1
+                print(f"❌ FAULT LOG PERSIST ERROR: {e}")
+            finally:
+                for _, queued_at in items:
+                    self.observe("persist", queued_at)
+                    self._persist_queue.task_done()
+
+    async def _notify_loop(self):
+        while True:
+            event, queued_at = await self._notify_queue.get()
+            try:
+                await run_in_threadpool(self.notify_fn, event)
+            except Exception as e:
+                self.notify_errors += 1
+                print(f"❌ ALERT ERROR: {e}")
+            finally:
+                self.observe("notify", queued_at)
+                self._notify_queue.task_done()
+
+    def stats(self):
+        return {
+            "running": self.running,
+            "persist_queue": self._persist_queue.qsize() if self._persist_queue else 0,
+            "persist_queue_max": self.persist_queue_size,
+            "notify_queue": self._notify_queue.qsize() if self._notify_queue else 0,
+            "notify_queue_max": self.notify_queue_size,
+            "notify_dropped": self.notify_dropped,
+            "persist_errors": self.persist_errors,
+            "notify_errors": self.notify_errors,
+            # infer includes record and dispatch; persist/notify are measured from enqueue to completion
+            "latency": {stage: tracker.stats() for stage, tracker in self.latency.items()},
+        }
@@ -0,0 +1,126 @@
+import os
+import threading
+from datetime import datetime, timezone
+
+# --- CONFIG ---
+LIVE_STATE_SHARDS = int(os.getenv("LIVE_STATE_SHARDS", "16"))
+
+# Status transitions per observed event (manual commands set the status directly)
+STATUS_FOR_EVENT = {"fault": "CRITICAL", "TRIP": "MANUAL_TRIP", "RESET": "STABLE"}
+
+
+class LineState:
+    """Latest reading and status of one (substation, line)."""
+
+    __slots__ = ("substation_id", "line_id", "voltage", "current", "status", "last_updated")
+
+    def __init__(self, substation_id, line_id):
+        self.substation_id = substation_id
+        self.line_id = line_id
+        self.voltage = 0.0
+        self.current = 0.0
+        self.status = "STABLE"
+        self.last_updated = None
+
+    def as_dict(self):
+        return {
+            "substation_id": self.substation_id,
+            "line_id": self.line_id,
+            "voltage": self.voltage,
+            "current": self.current,
+            "status": self.status,
+            "last_updated": self.last_updated.isoformat() if self.last_updated else None,
+        }
+
+
+class _Shard:
+    __slots__ = ("lock", "lines", "contended")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.lines = {}
+        self.contended = 0
+
+    def acquire(self):
+        if not self.lock.acquire(blocking=False):
+            self.lock.acquire()
+            self.contended += 1
+
+
+class LiveStateStore:
+    """
+    Live grid state keyed by (substation_id, line_id).
+
+    Lines hash onto a fixed set of shards, each with its own lock, so
+    updates to different lines rarely contend. Snapshots take every shard
+    lock in a fixed order and copy the records out, giving a consistent
+    view of all lines in O(lines).
+    """
+
+    def __init__(self, shards=LIVE_STATE_SHARDS):
+        self._shards = [_Shard() for _ in range(max(1, shards))]
+
+    def _shard(self, key):
+        return self._shards[hash(key) % len(self._shards)]
+
+    def update(self, substation_id, line_id, voltage, current, event="normal"):
+        """
+        Record a reading. `event` is "fault", "normal" or a manual command
+        ("TRIP" / "RESET"); a normal reading clears CRITICAL back to STABLE
+        but leaves MANUAL_TRIP in place. Returns the new status.
+        """
+        key = (substation_id, line_id)
+        shard = self._shard(key)
+        shard.acquire()
+        try:
+            state = shard.lines.get(key)
+            if state is None:
+                state = shard.lines[key] = LineState(substation_id, line_id)
+            state.voltage = voltage
+            state.current = current
+            state.last_updated = datetime.now(timezone.utc)
+            if event in STATUS_FOR_EVENT:
+                state.status = STATUS_FOR_EVENT[event]
+            elif state.status == "CRITICAL":
+                state.status = "STABLE"
+            return state.status
+        finally:
+            shard.lock.release()
+
+    def get(self, substation_id, line_id):
+        """Copy of one line's state as a dict, or None if it never reported."""
+        key = (substation_id, line_id)
+        shard = self._shard(key)
+        shard.acquire()
+        try:
+            state = shard.lines.get(key)
+            return state.as_dict() if state else None
+        finally:
+            shard.lock.release()
+
+    def snapshot(self, substation_id=None, line_id=None):
+        """Consistent copy of all lines (optionally filtered), most recently updated first."""
+        for shard in self._shards:
+            shard.acquire()
+        try:
+            lines = [
+                state.as_dict()
+                for shard in self._shards
+                for state in shard.lines.values()
+                if (substation_id is None or state.substation_id == substation_id)
+                and (line_id is None or state.line_id == line_id)
+            ]
+        finally:
+            for shard in reversed(self._shards):
+                shard.lock.release()
+        lines.sort(key=lambda line: line["last_updated"], reverse=True)
+        return lines
+
+    def stats(self):
+        sizes = [len(shard.lines) for shard in self._shards]
+        return {
+            "lines": sum(sizes),
+            "shards": len(self._shards),
+            "max_shard_lines": max(sizes),
+            "contended_acquires": sum(shard.contended for shard in self._shards),
+        }
@@ -1,17 +1,107 @@
 import secrets
-import random
-from fastapi import FastAPI, Depends, HTTPException, status
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+from fastapi import FastAPI, Depends, HTTPException, Request, status, BackgroundTasks
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from sqlalchemy import func
+import numpy as np
+from pydantic import TypeAdapter, ValidationError
 import models, database, schemas, auth, ai_engine, notifications, simulation
+from ingest_pipeline import IngestPipeline
+import fault_log_writer
+import live_state
+import telemetry_history
+import dashboard_stream
+import command_queue
+import telemetry_frame
+import rollups
+import archive
+import device_auth
 import serial_bridge
-from datetime import datetime, timezone, timedelta
+from datetime import datetime
 import household_analyzer
+import meter_index
 
 models.Base.metadata.create_all(bind=database.engine)
-app = FastAPI(title="KSEB Smart Grid")
+
+
+# Group-commit writer: one bulk INSERT per flush instead of one commit per fault
+fault_writer = fault_log_writer.from_env(database.SessionLocal)
+
+# HMAC check for /hardware/* (DEVICE_AUTH_MODE=off|monitor|enforce); keys live in memory, no DB lookups
+device_verifier = device_auth.DeviceVerifier()
+device_routes = [Depends(device_verifier)]
+
+# Immutable columnar segments of raw telemetry and faults for long-range analytics
+archive_writer = archive.ArchiveWriter() if archive.ARCHIVE_ENABLED else None
+archive_reader = archive.ArchiveReader()
+
+def _persist_faults(events):
+    """Pipeline persist stage: hand rows to the group-commit writer (and the archive)."""
+    fault_writer.add(events)
+    if archive_writer:
+        archive_writer.append_faults(events)
+
+def _process_batch(records, raw, received_at):
+    """
+    Pipeline infer stage, on the threadpool: recent history, rollups and archive,
+    then the model, then command dispatch. Returns (responses, fault events).
+    """
+    started = time.perf_counter()
+    if raw is None:
+        raw = ai_engine.raw_feature_matrix(records)
+    telemetry.record(records, received_at, raw)
+    rollup_store.add(records, raw, received_at)
+    if archive_writer:
+        archive_writer.append_telemetry(records, raw, received_at)
+    ingest_pipeline.observe("record", started)
+    results = ai_engine.analyze_batch(records, raw)
+    started = time.perf_counter()
+    responses, fault_events = _dispatch_results(records, results)
+    for event in fault_events:
+        broadcaster.publish_fault(event)
+    ingest_pipeline.observe("dispatch", started)
+    return responses, fault_events
+
+def _notify_fault(event):
+    """Pipeline notify stage."""
+    notifications.send_alert("9988776655", "officer@kseb.in", event["fault_type"], event["current"], event["voltage"])
+
+# Pushes live line state and fault events to /api/stream/dashboard clients
+broadcaster = dashboard_stream.DashboardBroadcaster()
+
+ingest_pipeline = IngestPipeline(_process_batch, _persist_faults, _notify_fault)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    fault_writer.start()
+    ingest_pipeline.start()
+    broadcaster.start()
+    commands.start()
+    rollup_store.start()
+    meters.start()
+    if archive_writer:
+        archive_writer.start()
+    yield
+    # Flush pending fault rows and alerts before the process exits
+    await ingest_pipeline.stop()
+    ai_engine.scheduler.stop()
+    ai_engine.process_pool.shutdown()
+    fault_writer.close()
+    rollup_store.close()
+    meters.close()
+    if archive_writer:
+        archive_writer.close()
+
+
+app = FastAPI(title="KSEB Smart Grid", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -21,15 +111,23 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# --- GLOBAL LIVE CACHE ---
-live_grid_state = {
-    "voltage": 0.0,
-    "current": 0.0,
-    "status": "WAITING",
-    "last_updated": datetime.utcnow()
-}
+# --- LIVE GRID STATE (per substation / line) ---
+live_grid = live_state.LiveStateStore()
+
+# Last HISTORY_SECONDS of raw samples per line, for trip investigation
+telemetry = telemetry_history.TelemetryHistory()
+
+# 1 s / 1 min / 1 h per-line rollups for historical charts
+rollup_store = rollups.RollupStore(database.SessionLocal, read_session_factory=database.ReadSessionLocal)
 
-manual_command_queue = None
+# meter_id -> consumer state; readings update memory, dirty rows are written in batches
+meters = meter_index.MeterIndex(database.SessionLocal, read_session_factory=database.ReadSessionLocal)
+
+# Interned ids for binary telemetry frames
+frame_ids = telemetry_frame.IdRegistry(database.SessionLocal, database.ReadSessionLocal)
+
+# Manual TRIP / RESET per (substation, line), delivered by long-poll or heartbeat
+commands = command_queue.CommandRouter()
 
 
 # ============================================================================
@@ -55,11 +153,15 @@ def create_temp_user(req: schemas.TempUserCreate, db: Session = Depends(database
     return {"userid": temp_id, "password": temp_pass}
 
 @app.post("/token", response_model=schemas.Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(database.get_db)):
-    user = db.query(models.User).filter(models.User.userid == form_data.username).first()
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(database.get_read_db)):
+    user = await run_in_threadpool(db.query(models.User).filter(models.User.userid == form_data.username).first)
     
-    if not user or not auth.verify_password(form_data.password, user.hashed_password):
+    # bcrypt runs on its own pool so a login burst can't starve the telemetry threadpool
+    valid, new_hash = await auth.verify_and_update_async(form_data.password, user.hashed_password) if user else (False, None)
+    if not valid:
         raise HTTPException(status_code=400, detail="Incorrect credentials")
+    if new_hash:
+        await run_in_threadpool(_store_rehash, user.id, new_hash)
     
     token = auth.create_access_token(data={"sub": user.userid})
     return {
@@ -69,19 +171,32 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
         "is_registered": user.is_registered
     }
 
+def _store_rehash(user_pk, new_hash):
+    """Replace a hash made with an old bcrypt cost (same password, so sessions stay valid)."""
+    db = database.SessionLocal()
+    try:
+        db.query(models.User).filter(models.User.id == user_pk).update({models.User.hashed_password: new_hash})
+        db.commit()
+    finally:
+        db.close()
+
 @app.post("/register")
-def register(
+async def register(
     form: schemas.RegistrationForm, 
     current_user: models.User = Depends(auth.get_current_user), 
     db: Session = Depends(database.get_db)
 ):
-    try:
-        if not current_user:
-            raise HTTPException(status_code=401, detail="Invalid Session")
+    if not current_user:
+        raise HTTPException(status_code=401, detail="Invalid Session")
 
-        if current_user.is_registered:
-            return {"msg": "Already registered"}
-        
+    if current_user.is_registered:
+        return {"msg": "Already registered"}
+
+    hashed_password = await auth.hash_password_async(form.new_password)
+    return await run_in_threadpool(_complete_registration, form, current_user, hashed_password, db)
+
+def _complete_registration(form, current_user, hashed_password, db):
+    try:
         taken_user = db.query(models.User).filter(models.User.userid == form.new_userid).first()
         if taken_user:
             raise HTTPException(status_code=400, detail="New UserID already exists")
@@ -98,11 +213,13 @@ def register(
         user_in_db.substation_id = form.substation_id
         user_in_db.substation_location = form.substation_location
         user_in_db.userid = form.new_userid
-        user_in_db.hashed_password = auth.get_password_hash(form.new_password)
+        user_in_db.hashed_password = hashed_password
         user_in_db.is_registered = True
         
         db.commit()
         db.refresh(user_in_db)
+        # The old id/password must stop working now, not when its cache entry expires
+        auth.invalidate_principal(current_user.userid)
         
         return {"msg": "Registration Complete. Please login with new credentials."}
 
@@ -118,17 +235,41 @@ def register(
 # ============================================================================
 
 @app.get("/api/dashboard")
-def get_dashboard(user: models.User = Depends(auth.get_current_user), db: Session = Depends(database.get_db)):
+def get_dashboard(
+    substation_id: Optional[str] = None,
+    line_id: Optional[str] = None,
+    user: models.User = Depends(auth.get_current_user),
+    db: Session = Depends(database.get_read_db)
+):
     logs = db.query(models.FaultLog).order_by(models.FaultLog.timestamp.desc()).limit(20).all()
+    lines = live_grid.snapshot(substation_id, line_id)
+    latest = lines[0] if lines else None
     
+    # Top-level readings mirror the most recently updated line
     return {
-        "current_reading": live_grid_state["current"],
-        "voltage_reading": live_grid_state["voltage"],
-        "grid_status": live_grid_state["status"],
-        "last_updated": live_grid_state["last_updated"].isoformat(),
+        "current_reading": latest["current"] if latest else 0.0,
+        "voltage_reading": latest["voltage"] if latest else 0.0,
+        "grid_status": latest["status"] if latest else "WAITING",
+        "last_updated": latest["last_updated"] if latest else None,
+        "lines": lines,
         "logs": logs
     }
 
+@app.get("/api/stream/dashboard")
+async def stream_dashboard(substation_id: Optional[str] = None, user: models.User = Depends(auth.get_stream_user)):
+    """
+    Server-Sent Events feed of live line state and new faults, replacing
+    /api/dashboard polling. Starts with a snapshot of every (matching) line,
+    then sends one `fault` event per detection as it happens and coalesced
+    `lines` updates at most DASHBOARD_STREAM_MAX_HZ times a second. An
+    `overflow` event means the client fell behind and should reconnect.
+    """
+    return StreamingResponse(
+        broadcaster.stream(substation_id, live_grid.snapshot(substation_id)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @app.get("/api/map", response_model=list[schemas.MapPin])
 def get_map_pins(user: models.User = Depends(auth.get_current_user)):
     lat = 9.93
@@ -150,9 +291,7 @@ def get_map_pins(user: models.User = Depends(auth.get_current_user)):
 # ============================================================================
 
 @app.post("/api/input-grid-data")
-def input_grid_data(manual_input: schemas.ManualGridInput, user: models.User = Depends(auth.get_current_user), db: Session = Depends(database.get_db)):
-    global manual_command_queue, live_grid_state
-    
+async def input_grid_data(manual_input: schemas.ManualGridInput, user: models.User = Depends(auth.get_current_user)):
     hardware_data = schemas.HardwareInput(
         substation_id=manual_input.substation_id,
         line_id=manual_input.line_id,
@@ -166,7 +305,7 @@ def input_grid_data(manual_input: schemas.ManualGridInput, user: models.User = D
         current_c=manual_input.current_a
     )
     
-    result = receive_data(hardware_data, db)
+    result = await receive_data(hardware_data)
     
     return {
         **result,
@@ -174,69 +313,353 @@ def input_grid_data(manual_input: schemas.ManualGridInput, user: models.User = D
         "message": f"Data processed from dashboard input by {user.userid}"
     }
 
-@app.post("/hardware/data")
-def receive_data(data: schemas.HardwareInput, db: Session = Depends(database.get_db)):
-    global manual_command_queue, live_grid_state
-    
-    is_fault, fault_msg, voltage = ai_engine.analyze_data(data)
-    
-    live_grid_state["voltage"] = voltage
-    live_grid_state["current"] = data.current_a
-    live_grid_state["last_updated"] = datetime.now(timezone.utc)
+def _publish_line(data):
+    """Push the line's new live state to streaming dashboards (no-op without clients)."""
+    if broadcaster.has_clients:
+        broadcaster.publish_line(live_grid.get(data.substation_id, data.line_id))
 
-    command_to_send = "CONTINUE"
+def _dispatch_results(records, results):
+    """
+    Applies AI results to the live cache and returns (one command per record, fault events).
+    A manual command due for a record's own line is piggybacked on its response
+    (for devices that don't hold the command long-poll open).
+    Fault events are persisted and alerted later by the ingest pipeline.
+    """
+    responses = []
+    fault_events = []
 
-    if manual_command_queue:
-        print(f"⚠️ EXECUTING MANUAL COMMAND: {manual_command_queue}")
-        command_to_send = manual_command_queue
-        
-        if command_to_send == "TRIP":
-            live_grid_state["status"] = "MANUAL_TRIP"
-        elif command_to_send == "RESET":
-            live_grid_state["status"] = "STABLE"
-            
-        manual_command_queue = None 
-        return {"command": command_to_send, "reason": "Manual Override"}
+    for data, (is_fault, fault_msg, voltage) in zip(records, results):
+        command_to_send = "CONTINUE"
 
-    if is_fault:
-        live_grid_state["status"] = "CRITICAL"
-        print(f"🚨 FAULT DETECTED: {fault_msg}")
-        
-        log = models.FaultLog(
-            substation_id=data.substation_id, line_id=data.line_id,
-            voltage=voltage, current=data.current_a, 
-            fault_type=fault_msg, status="Active"
-        )
-        db.add(log)
-        db.commit()
-        
-        notifications.send_alert("9988776655", "officer@kseb.in", fault_msg, data.current_a, voltage)
-        
-        command_to_send = "TRIP"
-    else:
-        if live_grid_state["status"] == "CRITICAL":
-            live_grid_state["status"] = "STABLE"
+        manual = commands.take(data.substation_id, data.line_id, limit=1)
+        if manual:
+            command = manual[0]
+            print(f"⚠️ EXECUTING MANUAL COMMAND: {command.action} -> {data.substation_id}/{data.line_id}")
+            live_grid.update(data.substation_id, data.line_id, voltage, data.current_a, command.action)
+            _publish_line(data)
+            responses.append({"command": command.action, "reason": "Manual Override", "command_id": command.id})
+            continue
+
+        live_grid.update(data.substation_id, data.line_id, voltage, data.current_a, "fault" if is_fault else "normal")
+        _publish_line(data)
+
+        if is_fault:
+            print(f"🚨 FAULT DETECTED: {fault_msg}")
             
-        command_to_send = "CONTINUE"
+            fault_events.append({
+                "substation_id": data.substation_id, "line_id": data.line_id,
+                "timestamp": datetime.utcnow(),  # detection time, not write time
+                "voltage": voltage, "current": data.current_a,
+                "fault_type": fault_msg, "status": "Active"
+            })
+            
+            command_to_send = "TRIP"
+        else:
+            command_to_send = "CONTINUE"
+
+        responses.append({"command": command_to_send, "reason": fault_msg})
+
+    return responses, fault_events
+
+_hardware_batch_adapter = TypeAdapter(list[schemas.HardwareInput])
+
+async def parse_hardware_input(request: Request) -> schemas.HardwareInput:
+    """Pipeline parse stage (timed), same validation errors as a plain body parameter."""
+    body = await request.body()
+    started = time.perf_counter()
+    try:
+        data = schemas.HardwareInput.model_validate_json(body)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+    ingest_pipeline.observe("parse", started)
+    return data
+
+async def parse_hardware_batch(request: Request) -> list[schemas.HardwareInput]:
+    body = await request.body()
+    started = time.perf_counter()
+    try:
+        batch = _hardware_batch_adapter.validate_json(body)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+    ingest_pipeline.observe("parse", started)
+    return batch
+
+async def parse_hardware_frames(request: Request):
+    """Binary frames -> columnar FrameBatch; no JSON or pydantic per sample."""
+    body = await request.body()
+    started = time.perf_counter()
+    try:
+        # Off the event loop: an unknown id can mean an id table reload
+        decoded = await run_in_threadpool(telemetry_frame.decode, body, frame_ids)
+    except telemetry_frame.FrameError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    ingest_pipeline.observe("parse", started)
+    return decoded
+
+async def _ingest(records, raw=None):
+    """record + infer + dispatch -> enqueue persist/notify. Returns as soon as the commands are known."""
+    started = time.perf_counter()
+    # History, rollups, archive, the model and command dispatch (command queue, live state) all
+    # take locks, so they share one thread hop; the loop only hands fault events to the queues
+    responses, fault_events = await ingest_pipeline.infer(records, raw, time.time())
+    await ingest_pipeline.enqueue(fault_events)
+    ingest_pipeline.observe("ack", started)
+    return responses
+
+@app.post("/hardware/data", dependencies=device_routes)
+async def receive_data(data: schemas.HardwareInput = Depends(parse_hardware_input)):
+    return (await _ingest([data]))[0]
+
+@app.post("/hardware/data/batch", dependencies=device_routes)
+async def receive_data_batch(batch: list[schemas.HardwareInput] = Depends(parse_hardware_batch)):
+    """
+    Buffered readings from a substation: one feature matrix, one model call.
+    Returns one command per record, in the order received.
+    """
+    return await _ingest(batch)
 
-    return {"command": command_to_send, "reason": fault_msg}
+@app.post("/hardware/ids", dependencies=device_routes)
+def register_telemetry_ids(req: schemas.TelemetryIdRequest):
+    """Interned ids for a substation / line, used in binary telemetry frames. Idempotent."""
+    try:
+        return {
+            "substation_id": req.substation_id, "line_id": req.line_id,
+            "substation": frame_ids.intern("substation", req.substation_id),
+            "line": frame_ids.intern("line", req.line_id),
+        }
+    except telemetry_frame.FrameError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@app.post("/hardware/data/frames", dependencies=device_routes)
+async def receive_data_frames(batch = Depends(parse_hardware_frames)):
+    """
+    Same as /hardware/data/batch for binary frames (see telemetry_frame.py):
+    body is N back-to-back 36-byte frames, response is one command per frame.
+    """
+    return await _ingest(batch, batch.raw)
+
+@app.post("/admin/ai/backend/{backend}")
+def set_inference_backend(backend: str, user: models.User = Depends(auth.require_admin)):
+    """Switch fault-model inference (compiled, sklearn, early_exit) without a restart."""
+    try:
+        active = ai_engine.set_backend(backend)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    print(f"🧠 AI BACKEND SET TO '{active}' by {user.userid}")
+    return {"backend": active}
+
+@app.get("/admin/models")
+def list_models(user: models.User = Depends(auth.require_admin)):
+    """Available versions plus the shadow comparison (every ingested row, per class and per path)."""
+    return {**ai_engine.registry.describe(), "shadow_stats": ai_engine.shadow_scorer.stats()}
+
+@app.post("/admin/models/{version}/promote")
+def promote_model(version: str, user: models.User = Depends(auth.require_admin)):
+    """Make a trained version the trip-decision model, no restart needed."""
+    try:
+        promoted = ai_engine.promote_model(version)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Could not load model '{version}': {e}")
+    print(f"🧠 MODEL '{promoted.version}' PROMOTED by {user.userid}")
+    return {"primary": promoted.version, "model": promoted.describe()}
+
+@app.post("/admin/models/{version}/shadow")
+def shadow_model(version: str, user: models.User = Depends(auth.require_admin)):
+    """Score a version alongside the primary without letting it trip anything."""
+    try:
+        shadow = ai_engine.set_shadow_model(version)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Could not load model '{version}': {e}")
+    print(f"👥 MODEL '{shadow.version}' SET AS SHADOW by {user.userid}")
+    return {"shadow": shadow.version, "model": shadow.describe()}
+
+@app.delete("/admin/models/shadow")
+def clear_shadow_model(user: models.User = Depends(auth.require_admin)):
+    ai_engine.set_shadow_model(None)
+    return {"shadow": None}
+
+@app.post("/admin/devices/reload")
+def reload_device_keys(user: models.User = Depends(auth.require_admin)):
+    """Re-read DEVICE_KEYS_FILE now instead of waiting for the mtime check."""
+    if not device_verifier.reload():
+        raise HTTPException(status_code=500, detail=f"Could not load {device_verifier.keys_file}, previous keys kept")
+    return device_verifier.stats()
+
+@app.get("/api/metrics")
+def get_metrics(user: models.User = Depends(auth.get_current_user)):
+    return {
+        "inference": ai_engine.stats(),
+        "ingest": ingest_pipeline.stats(),
+        "fault_log_writer": fault_writer.stats(),
+        "live_state": live_grid.stats(),
+        "telemetry_history": telemetry.stats(),
+        "dashboard_stream": broadcaster.stats(),
+        "commands": commands.stats(),
+        "rollups": rollup_store.stats(),
+        "meters": meters.stats(),
+        "archive": archive_writer.stats() if archive_writer else None,
+        "auth": auth.principal_cache.stats(),
+        "password_hashing": auth.hasher.stats(),
+        "device_auth": device_verifier.stats(),
+        "frame_ids": frame_ids.stats(),
+    }
+
+@app.get("/api/telemetry/{substation_id}/{line_id}")
+def get_telemetry_windows(
+    substation_id: str,
+    line_id: str,
+    windows: str = "10,60,300",
+    user: models.User = Depends(auth.get_current_user)
+):
+    """min / max / mean / RMS per feature over each lookback window (comma-separated seconds)."""
+    try:
+        lookbacks = [float(w) for w in windows.split(",") if w.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="windows must be comma-separated seconds, e.g. 10,60,300")
+    if not lookbacks or min(lookbacks) <= 0:
+        raise HTTPException(status_code=400, detail="windows must be positive")
+    if max(lookbacks) > telemetry_history.HISTORY_SECONDS:
+        raise HTTPException(status_code=400, detail=f"History only covers the last {telemetry_history.HISTORY_SECONDS:g}s")
+
+    result = telemetry.windows(substation_id, line_id, lookbacks)
+    if result is None:
+        raise HTTPException(status_code=404, detail="No telemetry for this line")
+    return {"substation_id": substation_id, "line_id": line_id, "windows": result}
+
+@app.get("/api/telemetry/{substation_id}/{line_id}/history")
+def get_telemetry_history(
+    substation_id: str,
+    line_id: str,
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+    max_points: int = rollups.ROLLUP_MAX_POINTS,
+    resolution: Optional[int] = None,
+    user: models.User = Depends(auth.get_current_user)
+):
+    """
+    Rolled-up series for charts. start / end are epoch seconds (default: the last hour).
+    Uses the finest of 1 s / 60 s / 3600 s buckets that fits max_points, unless resolution is given.
+    """
+    end = time.time() if end is None else end
+    start = end - 3600 if start is None else start
+    if start >= end or max_points < 1:
+        raise HTTPException(status_code=400, detail="Need start < end and max_points >= 1")
+    if resolution is not None and resolution not in rollups.RESOLUTIONS:
+        raise HTTPException(status_code=400, detail=f"resolution must be one of {rollups.RESOLUTIONS}")
+    series = rollup_store.query(substation_id, line_id, start, end, max_points, resolution)
+    return {"substation_id": substation_id, "line_id": line_id, "start": start, "end": end, **series}
+
+def _resolve_command_target(user, substation_id, line_id):
+    """Explicit target, or the only live line (of the user's substation) when unambiguous."""
+    if substation_id and line_id:
+        return substation_id, line_id
+    lines = live_grid.snapshot(substation_id or user.substation_id)
+    if not lines and not substation_id:
+        lines = live_grid.snapshot()
+    if line_id:
+        lines = [line for line in lines if line["line_id"] == line_id]
+    if len(lines) != 1:
+        raise HTTPException(status_code=400, detail="Specify substation_id and line_id for the target line.")
+    return lines[0]["substation_id"], lines[0]["line_id"]
+
+@app.get("/admin/archive/segments")
+def list_archive_segments(user: models.User = Depends(auth.require_admin)):
+    return {"writer": archive_writer.stats() if archive_writer else None, "segments": archive_reader.describe()}
+
+@app.get("/api/archive/aggregate")
+def archive_aggregate(
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+    substation_id: Optional[str] = None,
+    line_id: Optional[str] = None,
+    user: models.User = Depends(auth.get_current_user)
+):
+    """Per-line min / max / mean / RMS over archived telemetry in [start, end) (epoch seconds, default: last 24 h)."""
+    end = time.time() if end is None else end
+    start = end - 86400 if start is None else start
+    return {"start": start, "end": end, "lines": archive_reader.aggregate(start, end, substation_id, line_id)}
+
+@app.post("/admin/archive/rescore")
+def archive_rescore(
+    start: float,
+    end: float,
+    version: Optional[str] = None,
+    substation_id: Optional[str] = None,
+    line_id: Optional[str] = None,
+    user: models.User = Depends(auth.require_admin)
+):
+    """Re-run a model version (default: primary) over archived telemetry and count what it would flag."""
+    try:
+        model = ai_engine.registry.get(version) if version else ai_engine.registry.primary
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    started = time.perf_counter()
+    result = archive_reader.rescore(
+        start, end, lambda X: ai_engine.predict_with(model, X),
+        lambda raw: ai_engine.build_feature_matrix(None, raw),
+        substation_id=substation_id, line_id=line_id,
+    )
+    return {"version": model.version, "elapsed_s": time.perf_counter() - started, **result}
 
 @app.post("/api/control/{action}")
-def manual_control(action: str, user: models.User = Depends(auth.get_current_user)):
-    global manual_command_queue
-    
+async def manual_control(
+    action: str,
+    substation_id: Optional[str] = None,
+    line_id: Optional[str] = None,
+    user: models.User = Depends(auth.get_current_user)
+):
     if action.upper() not in ["TRIP", "RESET"]:
         raise HTTPException(status_code=400, detail="Invalid action. Use TRIP or RESET.")
     
-    manual_command_queue = action.upper()
-    print(f"🛑 MANUAL COMMAND QUEUED: {action} by {user.userid}")
+    substation_id, line_id = _resolve_command_target(user, substation_id, line_id)
+    command = commands.issue(substation_id, line_id, action.upper(), user.userid)
+    print(f"🛑 MANUAL COMMAND QUEUED: {command.action} -> {substation_id}/{line_id} by {user.userid}")
     
     return {
         "status": "Queued", 
-        "action": action, 
-        "message": "Command will be sent on next heartbeat."
+        "action": command.action, 
+        "command_id": command.id,
+        "substation_id": substation_id,
+        "line_id": line_id,
+        "message": "Sent immediately to a listening device, otherwise on the line's next heartbeat."
     }
 
+@app.get("/api/control/commands/{command_id}")
+def get_command_status(command_id: int, user: models.User = Depends(auth.get_current_user)):
+    command = commands.get(command_id)
+    if command is None:
+        raise HTTPException(status_code=404, detail="Unknown command")
+    return command
+
+@app.get("/hardware/commands/{substation_id}/{line_id}", dependencies=device_routes)
+async def poll_commands(substation_id: str, line_id: str, request: Request, timeout: float = 25.0):
+    """
+    Device long-poll: returns as soon as a TRIP / RESET is issued for this line,
+    or an empty list after `timeout` seconds (capped by COMMAND_LONG_POLL_MAX_S).
+    Each command must be acknowledged or it is delivered again.
+    """
+    device_verifier.check_line(request, substation_id, line_id)
+    due = await commands.poll(substation_id, line_id, max(0.0, timeout))
+    return {"commands": [{"command_id": c.id, "command": c.action} for c in due]}
+
+@app.post("/hardware/commands/{command_id}/ack", dependencies=device_routes)
+def ack_command(command_id: int, request: Request, substation_id: Optional[str] = None, line_id: Optional[str] = None):
+    target = commands.get(command_id)
+    if target is not None:
+        # Checked against the command's own line, so a device cannot ack another line's command
+        device_verifier.check_line(request, target["substation_id"], target["line_id"])
+    command = commands.ack(command_id, substation_id, line_id)
+    if command is None:
+        raise HTTPException(status_code=404, detail="Unknown command for this line")
+    if command.status != "acked":
+        # Superseded by a newer command or expired: the action must not be reported as applied
+        raise HTTPException(status_code=409, detail=f"Command {command.id} is {command.status}, not acked")
+    return {"status": "acked", "command_id": command.id}
+
 
 # ============================================================================
 # 4. HOUSEHOLD ELECTRICITY MANAGEMENT - 3 FEATURES ONLY
@@ -277,6 +700,7 @@ def register_consumer(
     db.add(new_consumer)
     db.commit()
     db.refresh(new_consumer)
+    meters.register(new_consumer)
     
     return {
         "status": "registered",
@@ -290,8 +714,7 @@ def register_consumer(
 @app.post("/api/consumer/reading")
 def record_power_reading(
     reading: schemas.PowerReading,
-    user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(database.get_db)
+    user: models.User = Depends(auth.get_current_user)
 ):
     """
     FEATURE 1 & 2: Record power reading and check for trip/voltage faults.
@@ -302,57 +725,35 @@ def record_power_reading(
     Voltage Faults:
     - voltage < 130V: "VOLTAGE_LOW" popup
     - voltage 130-180V: "PHASE_CHANGE" popup
+    
+    State lives in the meter index (atomic increment, written to the database in batches).
     """
     
-    # Find consumer by meter_id
-    consumer = db.query(models.Consumer).filter(
-        models.Consumer.meter_id == reading.meter_id
-    ).first()
+    # Check if power exceeds threshold (household_analyzer.THRESHOLD_POWER, e.g. 5kW)
+    trip_occurred = bool(household_analyzer.trips(reading.power_kw))
     
-    if not consumer:
+    recorded = meters.record(reading.meter_id, trip_occurred, reading.voltage, reading.power_factor)
+    if recorded is None:
         raise HTTPException(status_code=404, detail="Meter not found")
-    
-    # Define threshold power for this substation (e.g., 5kW)
-    THRESHOLD_POWER = 5.0
-    TRIP_LIMIT = 5  # Email sent when trip_count reaches this
-    
-    # Check if power exceeds threshold
-    trip_occurred = reading.power_kw > THRESHOLD_POWER
-    
-    if trip_occurred:
-        consumer.trip_count += 1
-    
-    # Update consumer readings
-    consumer.power_factor = reading.power_factor
-    consumer.voltage = reading.voltage
-    db.commit()
-    db.refresh(consumer)
+    consumer_id, trip_count, email = recorded
     
     # Determine fault type based on voltage
-    fault_type = None
-    message = "Normal operation"
-    
-    if reading.voltage < 130:
-        fault_type = "VOLTAGE_LOW"
-        message = "⚠️ VOLTAGE FLUCTUATION: Voltage below 130V detected"
-    elif 130 <= reading.voltage <= 180:
-        fault_type = "PHASE_CHANGE"
-        message = "⚠️ PHASE CHANGE: Voltage between 130-180V (phase change detected)"
+    fault_type, message = household_analyzer.classify_voltage(reading.voltage)
     
     # If trip count reaches limit, send email
     email_sent = False
-    if consumer.trip_count >= TRIP_LIMIT and consumer.email:
+    if household_analyzer.should_email(trip_count, email):
         email_sent = household_analyzer.send_threshold_increase_email(
-            consumer_email=consumer.email,
-            consumer_name=f"Meter {consumer.meter_id}",
-            trip_count=consumer.trip_count
+            consumer_email=email,
+            consumer_name=f"Meter {reading.meter_id}",
+            trip_count=trip_count
         )
     
     return {
         "status": "recorded",
-        "consumer_id": consumer.id,
-        "meter_id": consumer.meter_id,
-        "trip_count": consumer.trip_count,
+        "consumer_id": consumer_id,
+        "meter_id": reading.meter_id,
+        "trip_count": trip_count,
         "trip_occurred": trip_occurred,
         "power_kw": reading.power_kw,
         "voltage": reading.voltage,
@@ -360,17 +761,81 @@ def record_power_reading(
         "fault_type": fault_type,
         "fault_message": message,
         "email_sent": email_sent,
-        "email_threshold_reached": consumer.trip_count >= TRIP_LIMIT
+        "email_threshold_reached": trip_count >= household_analyzer.TRIP_LIMIT
     }
 
 
+@app.post("/api/consumer/readings/batch")
+def record_power_readings_batch(
+    readings: list[schemas.PowerReading],
+    background_tasks: BackgroundTasks,
+    user: models.User = Depends(auth.get_current_user)
+):
+    """
+    Many meter readings at once (e.g. a data concentrator upload). Same rules as
+    /api/consumer/reading, evaluated vectorized over the batch and applied to the
+    meter index in order (meters it has not seen are fetched with one IN query;
+    the flush thread writes them back). Unknown meters are reported per reading
+    instead of failing the batch. Threshold emails go out after the response,
+    at most one per meter.
+    """
+    if len(readings) > household_analyzer.BATCH_MAX_READINGS:
+        raise HTTPException(status_code=413, detail=f"At most {household_analyzer.BATCH_MAX_READINGS} readings per batch")
+    if not readings:
+        return {"received": 0, "recorded": 0, "unknown_meters": 0, "trips": 0, "emails_queued": 0, "results": []}
+
+    meter_ids = [r.meter_id for r in readings]
+    power_kw = np.fromiter((r.power_kw for r in readings), dtype=np.float64, count=len(readings))
+    voltage = np.fromiter((r.voltage for r in readings), dtype=np.float64, count=len(readings))
+
+    # Vectorized rules over the whole batch
+    tripped = household_analyzer.trips(power_kw)
+    fault_codes = household_analyzer.classify_voltages(voltage)
+
+    recorded = meters.record_many(meter_ids, tripped.tolist(), voltage.tolist(), [r.power_factor for r in readings])
+
+    results = []
+    to_email = {}  # meter_id -> (email, trip_count) for meters at or past the limit
+    for i, (r, entry) in enumerate(zip(readings, recorded)):
+        if entry is None:
+            tripped[i] = False
+            results.append({"meter_id": r.meter_id, "status": "unknown_meter"})
+            continue
+        consumer_id, trip_count, email = entry
+        code = int(fault_codes[i])
+        results.append({
+            "meter_id": r.meter_id,
+            "status": "recorded",
+            "consumer_id": consumer_id,
+            "trip_count": trip_count,
+            "trip_occurred": bool(tripped[i]),
+            "fault_type": household_analyzer.FAULT_TYPES[code],
+            "fault_message": household_analyzer.FAULT_MESSAGES[code],
+            "email_threshold_reached": trip_count >= household_analyzer.TRIP_LIMIT,
+        })
+        if household_analyzer.should_email(trip_count, email):
+            to_email[r.meter_id] = (email, trip_count)
+
+    for meter_id, (email, trip_count) in to_email.items():
+        background_tasks.add_task(household_analyzer.send_threshold_increase_email,
+                                  consumer_email=email, consumer_name=f"Meter {meter_id}", trip_count=trip_count)
+
+    unknown = sum(1 for entry in recorded if entry is None)
+    return {
+        "received": len(readings),
+        "recorded": len(readings) - unknown,
+        "unknown_meters": unknown,
+        "trips": int(tripped.sum()),
+        "emails_queued": len(to_email),
+        "results": results,
+    }
+
 @app.get("/api/theft/detect")
 def detect_theft(
     power_transmission: float,
     substation_id: str,
     phase: str = "A",
-    user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(database.get_db)
+    user: models.User = Depends(auth.get_current_user)
 ):
     """
     FEATURE 3: Theft Detection on LT Phase
@@ -390,10 +855,8 @@ def detect_theft(
     - phase: Phase letter "A", "B", or "C" (default "A")
     """
     
-    # Get all consumers in this substation
-    consumers = db.query(models.Consumer).filter(
-        models.Consumer.substation_id == substation_id
-    ).all()
+    # Get all consumers in this substation (meter index: includes readings not yet flushed)
+    consumers = meters.substation(substation_id)
     
     if not consumers:
         return {
@@ -0,0 +1,256 @@
+"""
+In-memory meter_id -> consumer state with write-behind persistence.
+
+The index holds trip_count, latest voltage / power factor and email for
+every consumer. It is loaded at startup and filled on demand for meters it
+has not seen (one IN query per batch of misses). Readings update a meter's
+state in O(1) under its shard lock, so concurrent readings for one meter
+never lose an increment. The change also accumulates in pending_trips and
+the row is marked dirty.
+
+A flush thread writes every dirty row each METER_FLUSH_MS with a single
+executemany UPDATE, trip_count = trip_count + :inc. The database is only
+ever moved by deltas, so it stays correct next to other writers. A reading
+can be up to one flush interval (plus retries) away from the database;
+close() flushes on shutdown.
+"""
+import atexit
+import os
+import threading
+import time
+
+from sqlalchemy import bindparam, select, update
+
+import models
+from metrics import LatencyTracker
+
+# --- CONFIG ---
+METER_FLUSH_MS = float(os.getenv("METER_FLUSH_MS", "1000"))
+METER_INDEX_SHARDS = int(os.getenv("METER_INDEX_SHARDS", "16"))
+
+
+class MeterState:
+    """Latest state of one consumer meter."""
+
+    __slots__ = ("consumer_id", "meter_id", "substation_id", "email", "trip_count", "voltage", "power_factor",
+                 "pending_trips", "dirty")
+
+    def __init__(self, consumer_id, meter_id, substation_id, email, trip_count, voltage, power_factor):
+        self.consumer_id = consumer_id
+        self.meter_id = meter_id
+        self.substation_id = substation_id
+        self.email = email
+        self.trip_count = trip_count or 0
+        self.voltage = voltage or 0.0
+        self.power_factor = power_factor or 0.0
+        self.pending_trips = 0  # increments not yet in the database
+        self.dirty = False
+
+
+class _Shard:
+    __slots__ = ("lock", "meters", "dirty")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.meters = {}
+        self.dirty = set()
+
+
+class MeterIndex:
+    def __init__(self, session_factory, flush_ms=METER_FLUSH_MS, shards=METER_INDEX_SHARDS, read_session_factory=None):
+        self.session_factory = session_factory  # flushes
+        self.read_session_factory = read_session_factory or session_factory  # loads and lookups
+        self.flush_interval_s = flush_ms / 1000.0
+        self._shards = [_Shard() for _ in range(max(1, shards))]
+        self._substations = {}  # substation_id -> list of MeterState
+        self._loaded_substations = set()
+        self._index_lock = threading.Lock()  # adding meters
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._worker = None
+
+        self.readings = 0
+        self.lookups = 0  # database round trips for meters not yet indexed
+        self.flushes = 0
+        self.rows_written = 0
+        self.errors = 0
+        self.flush_latency = LatencyTracker()
+
+    def _shard(self, meter_id):
+        return self._shards[hash(meter_id) % len(self._shards)]
+
+    # --- loading ---
+
+    def _add(self, row):
+        """Index one consumer row unless it is already there. Returns its state."""
+        shard = self._shard(row.meter_id)
+        with self._index_lock:
+            state = shard.meters.get(row.meter_id)
+            if state is None:
+                state = MeterState(row.id, row.meter_id, row.substation_id, row.email, row.trip_count, row.voltage,
+                                   row.power_factor)
+                with shard.lock:
+                    shard.meters[row.meter_id] = state
+                self._substations.setdefault(row.substation_id, []).append(state)
+            return state
+
+    def _load(self, *criteria):
+        table = models.Consumer.__table__
+        db = self.read_session_factory()
+        try:
+            rows = db.execute(select(table.c.id, table.c.meter_id, table.c.substation_id, table.c.email,
+                                     table.c.trip_count, table.c.voltage, table.c.power_factor).where(*criteria)).all()
+        finally:
+            db.close()
+        self.lookups += 1
+        return [self._add(row) for row in rows]
+
+    def load(self):
+        """Index every consumer (startup)."""
+        states = self._load()
+        with self._index_lock:
+            self._loaded_substations.update(self._substations)
+        return len(states)
+
+    def register(self, consumer):
+        """A consumer row that was just committed."""
+        return self._add(consumer)
+
+    def _ensure(self, meter_ids):
+        """Pull meters that are not indexed yet from the database, one IN query."""
+        missing = {m for m in meter_ids if m not in self._shard(m).meters}
+        if missing:
+            self._load(models.Consumer.meter_id.in_(missing))
+
+    # --- readings ---
+
+    def record(self, meter_id, tripped, voltage, power_factor):
+        """(consumer_id, trip_count after this reading, email) or None for an unknown meter."""
+        return self.record_many([meter_id], [tripped], [voltage], [power_factor])[0]
+
+    def record_many(self, meter_ids, tripped, voltages, power_factors):
+        """record() for a batch, applied in order; unknown meters come back as None."""
+        self._ensure(meter_ids)
+        results = []
+        for meter_id, trip, voltage, power_factor in zip(meter_ids, tripped, voltages, power_factors):
+            shard = self._shard(meter_id)
+            with shard.lock:
+                state = shard.meters.get(meter_id)
+                if state is None:
+                    results.append(None)
+                    continue
+                if trip:
+                    state.trip_count += 1
+                    state.pending_trips += 1
+                state.voltage = voltage
+                state.power_factor = power_factor
+                if not state.dirty:
+                    state.dirty = True
+                    shard.dirty.add(state)
+                results.append((state.consumer_id, state.trip_count, state.email))
+        self.readings += len(meter_ids)
+        return results
+
+    def substation(self, substation_id):
+        """Every indexed consumer of a substation (loaded from the database on first use)."""
+        if substation_id not in self._loaded_substations:
+            self._load(models.Consumer.substation_id == substation_id)
+            with self._index_lock:
+                self._loaded_substations.add(substation_id)
+        with self._index_lock:
+            return list(self._substations.get(substation_id, ()))
+
+    # --- persistence ---
+
+    def flush(self):
+        """Write every dirty meter with one executemany UPDATE. Returns rows written."""
+        with self._flush_lock:
+            taken, states = [], []
+            for shard in self._shards:
+                with shard.lock:
+                    dirty, shard.dirty = shard.dirty, set()
+                    for state in dirty:
+                        states.append(state)
+                        taken.append({"b_id": state.consumer_id, "inc": state.pending_trips,
+                                      "b_voltage": state.voltage, "b_pf": state.power_factor})
+                        state.pending_trips = 0
+                        state.dirty = False
+            if not taken:
+                return 0
+            started = time.perf_counter()
+            table = models.Consumer.__table__
+            db = self.session_factory()
+            try:
+                db.execute(
+                    update(table).where(table.c.id == bindparam("b_id")).values(
+                        trip_count=table.c.trip_count + bindparam("inc"),
+                        voltage=bindparam("b_voltage"), power_factor=bindparam("b_pf"),
+                    ),
+                    taken,
+                )
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                self.errors += 1
+                print(f"❌ METER FLUSH ERROR ({len(taken)} meters kept for retry): {e}")
+                self._restore(states, taken)
+                return 0
+            finally:
+                db.close()
+            self.flush_latency.observe(time.perf_counter() - started)
+            self.flushes += 1
+            self.rows_written += len(taken)
+            return len(taken)
+
+    def _restore(self, states, taken):
+        """Put increments from a failed flush back so the next one retries them."""
+        for state, row in zip(states, taken):
+            shard = self._shard(state.meter_id)
+            with shard.lock:
+                state.pending_trips += row["inc"]
+                if not state.dirty:
+                    state.dirty = True
+                    shard.dirty.add(state)
+
+    # --- lifecycle ---
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval_s):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"❌ METER INDEX ERROR: {e}")
+
+    def start(self):
+        if self._worker is None:
+            count = self.load()
+            print(f"🏠 METER INDEX: {count} consumers loaded")
+            self._stop.clear()
+            self._worker = threading.Thread(target=self._run, name="meter-writer", daemon=True)
+            self._worker.start()
+            atexit.register(self.close)
+
+    def close(self):
+        """Write everything still dirty."""
+        self._stop.set()
+        worker, self._worker = self._worker, None
+        if worker is not None:
+            worker.join(timeout=10)
+        self.flush()
+
+    def stats(self):
+        meters = dirty = 0
+        for shard in self._shards:
+            with shard.lock:
+                meters += len(shard.meters)
+                dirty += len(shard.dirty)
+        return {
+            "meters": meters,
+            "dirty": dirty,
+            "readings": self.readings,
+            "lookups": self.lookups,
+            "flushes": self.flushes,
+            "rows_written": self.rows_written,
+            "errors": self.errors,
+            "flush_latency": self.flush_latency.stats(),
+        }
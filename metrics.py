@@ -0,0 +1,37 @@
+import threading
+from collections import deque
+
+import numpy as np
+
+
+class LatencyTracker:
+    """Count / mean / max of every observation plus percentiles over the most recent ones."""
+
+    def __init__(self, window=2048):
+        self._recent = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total_s = 0.0
+        self.max_s = 0.0
+
+    def observe(self, seconds):
+        with self._lock:
+            self._recent.append(seconds)
+            self.count += 1
+            self.total_s += seconds
+            if seconds > self.max_s:
+                self.max_s = seconds
+
+    def stats(self):
+        with self._lock:
+            recent = np.asarray(self._recent) * 1000.0
+            count, total_s, max_s = self.count, self.total_s, self.max_s
+        if not count:
+            return {"count": 0}
+        return {
+            "count": count,
+            "mean_ms": total_s / count * 1000.0,
+            "p50_ms": float(np.percentile(recent, 50)),
+            "p99_ms": float(np.percentile(recent, 99)),
+            "max_ms": max_s * 1000.0,
+        }
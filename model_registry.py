@@ -0,0 +1,219 @@
+import glob
+import os
+import queue
+import threading
+import time
+from collections import defaultdict
+
+from compiled_forest import load_model
+
+
+class ModelVersion:
+    """One trained forest from the model/ directory, loaded on first use."""
+
+    __slots__ = ("version", "pkl_path", "forest_path", "use_mmap",
+                 "sklearn_model", "compiled", "load_seconds", "loaded_at")
+
+    def __init__(self, version, pkl_path, forest_path, use_mmap):
+        self.version = version
+        self.pkl_path = pkl_path
+        self.forest_path = forest_path
+        self.use_mmap = use_mmap
+        self.sklearn_model = None
+        self.compiled = None
+        self.load_seconds = 0.0
+        self.loaded_at = None
+
+    @property
+    def key(self):
+        """Identifies the files behind this version (used by inference workers)."""
+        return (self.pkl_path, self.forest_path, self.use_mmap)
+
+    @property
+    def format(self):
+        return "pickle" if self.sklearn_model is not None else "mmap"
+
+    def load(self):
+        started = time.perf_counter()
+        self.sklearn_model, self.compiled = load_model(*self.key)
+        self.load_seconds = time.perf_counter() - started
+        self.loaded_at = time.time()
+        return self
+
+    def describe(self):
+        return {
+            "version": self.version,
+            "path": self.pkl_path,
+            "format": self.format if self.compiled is not None else None,
+            "loaded": self.compiled is not None,
+            "load_ms": self.load_seconds * 1000.0,
+            "classes": [str(c) for c in self.compiled.classes] if self.compiled is not None else None,
+        }
+
+
+class ModelRegistry:
+    """
+    Versioned fault models found in model_dir (<version>.pkl, plus an optional
+    <version>.forest export for mmap loading). The primary version makes trip
+    decisions; an optional shadow version is scored off the trip path.
+    Promotion loads the new version first and then swaps one reference, so
+    in-flight requests finish on whichever version they started with.
+    """
+
+    def __init__(self, model_dir, use_mmap=False):
+        self.model_dir = model_dir
+        self.use_mmap = use_mmap
+        self._versions = {}
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()  # one unpickle at a time
+        self.primary = None
+        self.shadow = None
+
+    def scan(self):
+        """Picks up newly trained .pkl files. Returns the sorted version names."""
+        with self._lock:
+            for pkl_path in glob.glob(os.path.join(self.model_dir, "*.pkl")):
+                version = os.path.splitext(os.path.basename(pkl_path))[0]
+                if version not in self._versions:
+                    forest_path = os.path.splitext(pkl_path)[0] + ".forest"
+                    self._versions[version] = ModelVersion(version, pkl_path, forest_path, self.use_mmap)
+            return sorted(self._versions)
+
+    def get(self, version):
+        if version not in self._versions:
+            self.scan()
+        model_version = self._versions.get(version)
+        if model_version is None:
+            raise KeyError(f"Unknown model version '{version}'")
+        with self._load_lock:
+            if model_version.compiled is None:
+                model_version.load()
+        return model_version
+
+    def promote(self, version):
+        model_version = self.get(version)
+        self.primary = model_version
+        return model_version
+
+    def set_shadow(self, version):
+        self.shadow = self.get(version) if version else None
+        return self.shadow
+
+    def describe(self):
+        self.scan()
+        return {
+            "primary": self.primary.version if self.primary else None,
+            "shadow": self.shadow.version if self.shadow else None,
+            "versions": [self._versions[v].describe() for v in sorted(self._versions)],
+        }
+
+
+class ShadowScorer:
+    """
+    Scores trip-path inputs with the shadow model on a background thread and
+    counts disagreements per primary fault class and per path that produced
+    the primary label (fast_path / cache / model). The queue is bounded; when
+    it is full, samples are dropped (and counted) rather than slowing trips.
+    reset() starts a new generation; samples queued before it are skipped.
+    """
+
+    def __init__(self, registry, predict_fn, max_queue=256):
+        self.registry = registry
+        self.predict_fn = predict_fn  # (ModelVersion, X) -> labels
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._worker = None
+        self._counts = defaultdict(lambda: {"compared": 0, "disagreed": 0, "shadow_labels": defaultdict(int)})
+        self._paths = defaultdict(lambda: {"compared": 0, "disagreed": 0})
+        self.generation = 0  # bumped by reset()
+        self.dropped = 0
+        self.errors = 0
+        self.stale = 0
+
+    def submit(self, input_features, primary_labels, paths=None, generation=None):
+        """
+        Queue rows with their final primary labels; paths says where each label
+        came from. generation is self.generation read before the labels were
+        computed, so labels from a model promoted away since are not counted.
+        """
+        shadow = self.registry.shadow
+        if shadow is None:
+            return
+        generation = self.generation if generation is None else generation
+        if self._worker is None:
+            self._start()
+        try:
+            paths = ["model"] * len(primary_labels) if paths is None else list(paths)
+            self._queue.put_nowait((generation, shadow, input_features, list(primary_labels), paths))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+    def _start(self):
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="ai-shadow", daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            generation, shadow, input_features, primary_labels, paths = self._queue.get()
+            if generation != self.generation:
+                with self._lock:
+                    self.stale += 1
+                continue
+            try:
+                shadow_labels = self.predict_fn(shadow, input_features)
+            except Exception as e:
+                print(f"❌ SHADOW MODEL ERROR ({shadow.version}): {e}")
+                with self._lock:
+                    self.errors += 1
+                continue
+
+            with self._lock:
+                if generation != self.generation:
+                    self.stale += 1  # reset() while the shadow model was scoring
+                    continue
+                for primary_label, shadow_label, path in zip(primary_labels, shadow_labels, paths):
+                    counts = self._counts[primary_label]
+                    by_path = self._paths[path]
+                    counts["compared"] += 1
+                    by_path["compared"] += 1
+                    if shadow_label != primary_label:
+                        counts["disagreed"] += 1
+                        counts["shadow_labels"][shadow_label] += 1
+                        by_path["disagreed"] += 1
+
+    def reset(self):
+        with self._lock:
+            self.generation += 1
+            self._counts.clear()
+            self._paths.clear()
+            self.dropped = 0
+            self.errors = 0
+            self.stale = 0
+
+    def stats(self):
+        with self._lock:
+            per_class = {
+                label: {
+                    "compared": c["compared"],
+                    "disagreed": c["disagreed"],
+                    "disagreement_rate": c["disagreed"] / c["compared"] if c["compared"] else 0.0,
+                    "shadow_labels": dict(c["shadow_labels"]),
+                }
+                for label, c in sorted(self._counts.items())
+            }
+            per_path = {
+                path: {**c, "disagreement_rate": c["disagreed"] / c["compared"] if c["compared"] else 0.0}
+                for path, c in sorted(self._paths.items())
+            }
+            return {
+                "shadow": self.registry.shadow.version if self.registry.shadow else None,
+                "queued": self._queue.qsize(),
+                "dropped": self.dropped,
+                "errors": self.errors,
+                "stale": self.stale,
+                "per_class": per_class,
+                "per_path": per_path,
+            }
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, UniqueConstraint, Index, LargeBinary
 from database import Base
 import datetime
 
@@ -55,3 +55,32 @@ class Consumer(Base):
     trip_count = Column(Integer, default=0)
     
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+
+# --- BINARY TELEMETRY ---
+
+class TelemetryId(Base):
+    """Interned substation / line ids used by binary telemetry frames."""
+    __tablename__ = "telemetry_ids"
+    __table_args__ = (UniqueConstraint("kind", "name"),)
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String)  # "substation" or "line"
+    name = Column(String)
+
+
+class TelemetryRollup(Base):
+    """
+    One closed time bucket of per-line telemetry (see rollups.py).
+    stats holds float64[4, 8]: min, max, sum, sum of squares per feature.
+    """
+    __tablename__ = "telemetry_rollups"
+    __table_args__ = (Index("ix_rollup_line_res_start", "substation_id", "line_id", "resolution", "bucket_start"),)
+
+    id = Column(Integer, primary_key=True)
+    substation_id = Column(String)
+    line_id = Column(String)
+    resolution = Column(Integer)    # bucket width in seconds: 1, 60, 3600
+    bucket_start = Column(Integer)  # epoch seconds
+    count = Column(Integer)
+    stats = Column(LargeBinary)
@@ -0,0 +1,85 @@
+"""
+bcrypt off the request threadpool.
+
+Hashes and verifications run on a small dedicated executor so a burst of
+logins uses at most `workers` cores and never holds the threadpool that
+serves telemetry. At most `max_pending` jobs may be queued or running;
+beyond that callers get HasherBusy straight away instead of piling up.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import LatencyTracker
+
+
+class HasherBusy(RuntimeError):
+    """Admission limit reached; the caller should retry later."""
+
+
+class PasswordHasher:
+    def __init__(self, context, workers=2, max_pending=64):
+        self.context = context
+        self.workers = max(1, int(workers))
+        self.max_pending = max(1, int(max_pending))
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+
+        self.completed = 0
+        self.rejected = 0
+        self.rehashed = 0
+        self.queue_wait = LatencyTracker()
+        self.hash_time = LatencyTracker()
+
+    async def hash(self, password):
+        return await self._submit(self.context.hash, password)
+
+    async def verify_and_update(self, password, hashed):
+        """(matches, new hash or None). A new hash means the stored one uses an outdated cost."""
+        matches, new_hash = await self._submit(self.context.verify_and_update, password, hashed)
+        if new_hash is not None:
+            with self._lock:
+                self.rehashed += 1
+        return matches, new_hash
+
+    async def _submit(self, fn, *args):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise HasherBusy(f"{self._pending} password hashes already pending")
+            self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, self._run, fn, args, time.perf_counter())
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def _run(self, fn, args, submitted):
+        started = time.perf_counter()
+        self.queue_wait.observe(started - submitted)
+        with self._lock:
+            self._running += 1
+        try:
+            return fn(*args)
+        finally:
+            self.hash_time.observe(time.perf_counter() - started)
+            with self._lock:
+                self._running -= 1
+                self.completed += 1
+
+    def stats(self):
+        with self._lock:
+            pending, running = self._pending, self._running
+            counters = {"completed": self.completed, "rejected": self.rejected, "rehashed": self.rehashed}
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "queue_depth": max(0, pending - running),
+            "running": running,
+            **counters,
+            "queue_wait": self.queue_wait.stats(),
+            "hash_time": self.hash_time.stats(),
+        }
@@ -0,0 +1,102 @@
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+class PredictionCache:
+    """
+    LRU + TTL cache of model labels keyed on the quantized feature vector.
+    resolution holds one step per feature column; rows that round to the
+    same grid cell share a key. Rows with any phase current above
+    fault_current_limit are never looked up or stored, and only "Normal"
+    labels are stored, so a TRIP is always decided by the model itself.
+    clear() starts a new generation; labels computed before it are not stored.
+    """
+
+    def __init__(self, resolution, max_size=4096, ttl_s=30.0, fault_current_limit=500.0):
+        self.resolution = np.asarray(resolution, dtype=np.float64)
+        self.max_size = max(1, int(max_size))
+        self.ttl_s = float(ttl_s)
+        self.fault_current_limit = float(fault_current_limit)
+
+        self._entries = OrderedDict()  # key -> (label, expires_at)
+        self._lock = threading.Lock()
+        self.generation = 0  # bumped by clear()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.bypassed = 0
+        self.stale_puts = 0
+
+    def keys(self, input_features):
+        """One bytes key per row, or None for rows that must bypass the cache."""
+        features = np.atleast_2d(input_features)
+        cells = np.round(features / self.resolution).astype(np.int64)
+        bypass = (np.abs(features[:, 5:8]) > self.fault_current_limit).any(axis=1)
+        return [None if skip else row.tobytes() for row, skip in zip(cells, bypass)]
+
+    def get_many(self, keys):
+        """Cached label (or None) for each key."""
+        now = time.monotonic()
+        labels = []
+        with self._lock:
+            for key in keys:
+                if key is None:
+                    self.bypassed += 1
+                    labels.append(None)
+                    continue
+                entry = self._entries.get(key)
+                if entry is None:
+                    self.misses += 1
+                    labels.append(None)
+                elif entry[1] < now:
+                    del self._entries[key]
+                    self.expirations += 1
+                    self.misses += 1
+                    labels.append(None)
+                else:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    labels.append(entry[0])
+        return labels
+
+    def put_many(self, keys, labels, generation=None):
+        """Store labels; skipped if generation (read before predicting) is no longer current."""
+        expires_at = time.monotonic() + self.ttl_s
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                self.stale_puts += 1
+                return
+            for key, label in zip(keys, labels):
+                if key is None or label != "Normal":
+                    continue
+                self._entries[key] = (label, expires_at)
+                self._entries.move_to_end(key)
+                if len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.generation += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_s": self.ttl_s,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "bypassed": self.bypassed,
+                "stale_puts": self.stale_puts,
+            }
@@ -0,0 +1,95 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class PrincipalCache:
+    """
+    LRU + TTL cache of authenticated users keyed on the bearer token, so
+    repeat requests skip the JWT decode and the users SELECT. An entry never
+    outlives its token's exp claim. invalidate(userid) drops every token of
+    that user; a lookup that raced an invalidation is not stored.
+    """
+
+    def __init__(self, max_size=10000, ttl_s=60.0):
+        self.max_size = max(1, int(max_size))
+        self.ttl_s = float(ttl_s)
+
+        self._entries = OrderedDict()  # token -> (user, userid, expires_at)
+        self._tokens = {}  # userid -> set of cached tokens
+        self._generation = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, token):
+        """(user or None, generation to pass back to put)."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                self.misses += 1
+            elif entry[2] < now:
+                self._drop(token)
+                self.expirations += 1
+                self.misses += 1
+            else:
+                self._entries.move_to_end(token)
+                self.hits += 1
+                return entry[0], self._generation
+            return None, self._generation
+
+    def put(self, token, user, token_exp, generation):
+        expires_at = min(time.time() + self.ttl_s, token_exp)
+        with self._lock:
+            if generation != self._generation:
+                return
+            if token in self._entries:
+                self._drop(token)
+            self._entries[token] = (user, user.userid, expires_at)
+            self._tokens.setdefault(user.userid, set()).add(token)
+            if len(self._entries) > self.max_size:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, userid):
+        """Forget every cached principal for userid (id, password or role changed)."""
+        with self._lock:
+            self._generation += 1
+            for token in list(self._tokens.get(userid, ())):
+                self._drop(token)
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._tokens.clear()
+
+    def _drop(self, token):
+        _, userid, _ = self._entries.pop(token)
+        tokens = self._tokens.get(userid)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens[userid]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "users": len(self._tokens),
+                "max_size": self.max_size,
+                "ttl_s": self.ttl_s,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,382 @@
+"""
+Incremental multi-resolution telemetry rollups.
+
+Every line keeps one open bucket per resolution (1 s, 1 min, 1 h) holding
+count / min / max / sum / sum of squares for the eight raw features. A
+sample updates its line's three open buckets in place; when a sample lands
+in a later bucket (or the flush thread sees a bucket has been quiet past
+its end), the old bucket is sealed and queued, and the queue is written to
+telemetry_rollups with one bulk INSERT per flush.
+
+Each sealed bucket is written exactly once, so a 10 Hz line costs about
+1.02 rows/s (1 + 1/60 + 1/3600) instead of 10 raw rows. In memory there are
+at most three open buckets per line plus ROLLUP_MAX_PENDING sealed ones.
+Buckets still open at shutdown are written as partial rows; a bucket can
+therefore appear more than once and `query` merges rows with the same start.
+
+Old rows are pruned per resolution (ROLLUP_RETENTION_1S / _1M / _1H, in
+seconds, 0 = keep forever).
+"""
+import atexit
+import os
+import threading
+import time
+
+import numpy as np
+from sqlalchemy import delete, insert
+
+import models
+from metrics import LatencyTracker
+from telemetry_frame import line_table
+
+# Raw HardwareInput features, in model column order
+FEATURES = ("load_kw", "pf", "voltage_a", "voltage_b", "voltage_c", "current_a", "current_b", "current_c")
+
+RESOLUTIONS = (1, 60, 3600)
+RETENTION_S = {
+    1: float(os.getenv("ROLLUP_RETENTION_1S", str(6 * 3600))),
+    60: float(os.getenv("ROLLUP_RETENTION_1M", str(30 * 86400))),
+    3600: float(os.getenv("ROLLUP_RETENTION_1H", "0")),
+}
+ROLLUP_FLUSH_MS = float(os.getenv("ROLLUP_FLUSH_MS", "1000"))
+ROLLUP_MAX_PENDING = int(os.getenv("ROLLUP_MAX_PENDING", "100000"))
+ROLLUP_MAX_LINES = int(os.getenv("ROLLUP_MAX_LINES", "4096"))
+ROLLUP_PRUNE_EVERY_S = float(os.getenv("ROLLUP_PRUNE_EVERY_S", "300"))
+# Default point budget for one query
+ROLLUP_MAX_POINTS = int(os.getenv("ROLLUP_MAX_POINTS", "500"))
+
+_MIN, _MAX, _SUM, _SUMSQ = range(4)
+
+
+def empty_stats():
+    stats = np.zeros((4, len(FEATURES)), dtype=np.float64)
+    stats[_MIN] = np.inf
+    stats[_MAX] = -np.inf
+    return stats
+
+
+def merge_stats(stats, other):
+    """Fold `other` into `stats` in place."""
+    np.minimum(stats[_MIN], other[_MIN], out=stats[_MIN])
+    np.maximum(stats[_MAX], other[_MAX], out=stats[_MAX])
+    stats[_SUM] += other[_SUM]
+    stats[_SUMSQ] += other[_SUMSQ]
+
+
+def rows_stats(rows):
+    """Stats of an N x 8 block of samples."""
+    stats = np.empty((4, rows.shape[1]), dtype=np.float64)
+    stats[_MIN] = rows.min(axis=0)
+    stats[_MAX] = rows.max(axis=0)
+    stats[_SUM] = rows.sum(axis=0)
+    stats[_SUMSQ] = np.einsum("ij,ij->j", rows, rows)
+    return stats
+
+
+class RollupStore:
+    def __init__(self, session_factory, flush_interval_ms=ROLLUP_FLUSH_MS, max_pending=ROLLUP_MAX_PENDING,
+                 max_lines=ROLLUP_MAX_LINES, retention_s=None, read_session_factory=None):
+        self.session_factory = session_factory
+        # Dashboard queries stay off the writer connection (database.ReadSessionLocal)
+        self.read_session_factory = read_session_factory or session_factory
+        self.flush_interval_s = flush_interval_ms / 1000.0
+        self.max_pending = max_pending
+        self.max_lines = max_lines
+        self.retention_s = dict(RETENTION_S if retention_s is None else retention_s)
+
+        # Open buckets as arrays indexed [resolution level, line slot]
+        self._slots = {}  # (substation_id, line_id) -> slot
+        self._keys = []
+        self._starts = np.zeros((len(RESOLUTIONS), 0), dtype=np.int64)
+        self._counts = np.zeros((len(RESOLUTIONS), 0), dtype=np.int64)
+        self._stats = np.zeros((len(RESOLUTIONS), 0, 4, len(FEATURES)), dtype=np.float64)
+
+        self._pending = []  # sealed rows waiting for the next flush
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._worker = None
+        self._last_prune = 0.0
+
+        self.samples = 0
+        self.rows_written = 0
+        self.bytes_written = 0
+        self.dropped_rows = 0
+        self.dropped_lines = 0
+        self.flushes = 0
+        self.errors = 0
+        self.flush_latency = LatencyTracker()
+
+    # --- maintenance (ingest side) ---
+
+    def _slot(self, key):
+        slot = self._slots.get(key)
+        if slot is not None:
+            return slot
+        if len(self._keys) >= self.max_lines:
+            self.dropped_lines += 1
+            return -1
+        slot = self._slots[key] = len(self._keys)
+        self._keys.append(key)
+        if slot >= self._counts.shape[1]:
+            grow = max(64, self._counts.shape[1])
+            self._starts = np.concatenate((self._starts, np.zeros((len(RESOLUTIONS), grow), dtype=np.int64)), axis=1)
+            self._counts = np.concatenate((self._counts, np.zeros((len(RESOLUTIONS), grow), dtype=np.int64)), axis=1)
+            self._stats = np.concatenate(
+                (self._stats, np.zeros((len(RESOLUTIONS), grow, 4, len(FEATURES)), dtype=np.float64)), axis=1)
+        return slot
+
+    def _seal(self, key, resolution, start, count, stats):
+        if len(self._pending) >= self.max_pending:
+            self.dropped_rows += 1
+            return
+        self._pending.append({
+            "substation_id": key[0], "line_id": key[1],
+            "resolution": resolution, "bucket_start": int(start),
+            "count": int(count), "stats": stats.tobytes(),
+        })
+
+    def _seal_slots(self, level, slots):
+        resolution = RESOLUTIONS[level]
+        for slot in slots.tolist():
+            self._seal(self._keys[slot], resolution, self._starts[level, slot],
+                       self._counts[level, slot], self._stats[level, slot])
+        self._counts[level, slots] = 0
+
+    def add(self, records, raw, received_at=None):
+        """Fold one ingest batch (records + their N x 8 raw matrix) into the open buckets."""
+        if not len(records):
+            return
+        received_at = time.time() if received_at is None else received_at
+        raw = np.asarray(raw, dtype=np.float64)
+
+        with self._lock:
+            self.samples += len(records)
+            lines, line_index = line_table(records)
+            slots = np.array([self._slot(key) for key in lines], dtype=np.int64)[line_index]
+            if (slots < 0).any():
+                keep = slots >= 0
+                slots, raw = slots[keep], raw[keep]
+            if not len(slots):
+                return
+            touched = np.unique(slots)
+            one_per_line = len(touched) == len(slots)
+            squares = raw * raw
+
+            for level, resolution in enumerate(RESOLUTIONS):
+                start = int(received_at // resolution) * resolution
+                starts, counts, stats = self._starts[level], self._counts[level], self._stats[level]
+                open_ = counts[touched] > 0
+
+                # The batch moved past these buckets: seal them
+                stale = touched[open_ & (starts[touched] < start)]
+                if len(stale):
+                    self._seal_slots(level, stale)
+                # Late batch for buckets already sealed: write it as its own partial row
+                ahead = touched[(counts[touched] > 0) & (starts[touched] > start)]
+                if len(ahead):
+                    for slot in ahead.tolist():
+                        rows = slots == slot
+                        self._seal(self._keys[slot], resolution, start, rows.sum(),
+                                   rows_stats(raw[rows]))
+                    fresh_mask = ~np.isin(slots, ahead)
+                else:
+                    fresh_mask = None
+
+                reset = touched[counts[touched] == 0]
+                starts[reset] = start
+                stats[reset] = empty_stats()
+
+                s, r, sq = (slots, raw, squares) if fresh_mask is None else (slots[fresh_mask], raw[fresh_mask], squares[fresh_mask])
+                if one_per_line:
+                    # One sample per line (the usual case): plain fancy indexing
+                    counts[s] += 1
+                    block = stats[s]
+                    np.minimum(block[:, _MIN], r, out=block[:, _MIN])
+                    np.maximum(block[:, _MAX], r, out=block[:, _MAX])
+                    block[:, _SUM] += r
+                    block[:, _SUMSQ] += sq
+                    stats[s] = block
+                else:
+                    np.add.at(counts, s, 1)
+                    np.minimum.at(stats[:, _MIN], s, r)
+                    np.maximum.at(stats[:, _MAX], s, r)
+                    np.add.at(stats[:, _SUM], s, r)
+                    np.add.at(stats[:, _SUMSQ], s, sq)
+
+    def seal_idle(self, now=None, seal_all=False):
+        """Seal open buckets whose time span has passed (lines that stopped reporting)."""
+        now = time.time() if now is None else now
+        with self._lock:
+            lines = len(self._keys)
+            for level, resolution in enumerate(RESOLUTIONS):
+                counts = self._counts[level, :lines]
+                due = counts > 0
+                if not seal_all:
+                    due &= self._starts[level, :lines] + resolution <= now
+                slots = np.flatnonzero(due)
+                if len(slots):
+                    self._seal_slots(level, slots)
+
+    # --- persistence ---
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, []
+            if not pending:
+                return 0
+            started = time.perf_counter()
+            db = self.session_factory()
+            try:
+                db.execute(insert(models.TelemetryRollup), pending)
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                self.errors += 1
+                print(f"❌ ROLLUP FLUSH ERROR ({len(pending)} rows kept for retry): {e}")
+                with self._lock:
+                    self._pending[:0] = pending[:max(0, self.max_pending - len(self._pending))]
+                return 0
+            finally:
+                db.close()
+            self.flush_latency.observe(time.perf_counter() - started)
+            self.flushes += 1
+            self.rows_written += len(pending)
+            self.bytes_written += sum(len(row["stats"]) + 48 for row in pending)  # + ids, ints
+            return len(pending)
+
+    def prune(self, now=None):
+        now = time.time() if now is None else now
+        db = self.session_factory()
+        try:
+            for resolution, keep_s in self.retention_s.items():
+                if keep_s > 0:
+                    db.execute(delete(models.TelemetryRollup).where(
+                        models.TelemetryRollup.resolution == resolution,
+                        models.TelemetryRollup.bucket_start < now - keep_s,
+                    ))
+            db.commit()
+        finally:
+            db.close()
+        self._last_prune = time.monotonic()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval_s):
+            try:
+                self.seal_idle()
+                self.flush()
+                if time.monotonic() - self._last_prune >= ROLLUP_PRUNE_EVERY_S:
+                    self.prune()
+            except Exception as e:
+                print(f"❌ ROLLUP MAINTENANCE ERROR: {e}")
+
+    def start(self):
+        if self._worker is None:
+            self._stop.clear()
+            self._worker = threading.Thread(target=self._run, name="rollup-writer", daemon=True)
+            self._worker.start()
+            atexit.register(self.close)
+
+    def close(self):
+        """Seal everything still open (partial buckets) and write it."""
+        self._stop.set()
+        worker, self._worker = self._worker, None
+        if worker is not None:
+            worker.join(timeout=10)
+        self.seal_idle(seal_all=True)
+        self.flush()
+
+    # --- queries ---
+
+    def pick_resolution(self, start, end, max_points, now=None):
+        """Finest resolution that fits max_points and whose retention still covers `start`."""
+        now = time.time() if now is None else now
+        for resolution in RESOLUTIONS:
+            keep_s = self.retention_s.get(resolution, 0)
+            if (end - start) / resolution <= max_points and (keep_s <= 0 or start >= now - keep_s):
+                return resolution
+        return RESOLUTIONS[-1]
+
+    def query(self, substation_id, line_id, start, end, max_points=ROLLUP_MAX_POINTS, resolution=None):
+        """
+        Bucketed series for [start, end) (epoch seconds), columnar:
+        {"resolution", "t", "count", "<feature>": {"min", "max", "mean", "rms"}}.
+        Includes buckets not flushed yet, so the newest point is always current.
+        """
+        resolution = resolution or self.pick_resolution(start, end, max_points)
+        first = int(start // resolution) * resolution
+        key = (substation_id, line_id)
+
+        db = self.read_session_factory()
+        try:
+            rows = db.query(
+                models.TelemetryRollup.bucket_start, models.TelemetryRollup.count, models.TelemetryRollup.stats,
+            ).filter(
+                models.TelemetryRollup.substation_id == substation_id,
+                models.TelemetryRollup.line_id == line_id,
+                models.TelemetryRollup.resolution == resolution,
+                models.TelemetryRollup.bucket_start >= first,
+                models.TelemetryRollup.bucket_start < end,
+            ).all()
+        finally:
+            db.close()
+
+        buckets = {}
+
+        def fold(bucket_start, count, stats):
+            if bucket_start in buckets:
+                buckets[bucket_start][0] += count
+                merge_stats(buckets[bucket_start][1], stats)
+            else:
+                buckets[bucket_start] = [count, stats.copy()]
+
+        for bucket_start, count, blob in rows:
+            fold(bucket_start, count, np.frombuffer(blob, dtype=np.float64).reshape(4, len(FEATURES)))
+
+        level = RESOLUTIONS.index(resolution)
+        with self._lock:
+            unflushed = [(r["bucket_start"], r["count"], np.frombuffer(r["stats"], dtype=np.float64).reshape(4, -1))
+                         for r in self._pending
+                         if (r["substation_id"], r["line_id"], r["resolution"]) == (substation_id, line_id, resolution)]
+            slot = self._slots.get(key)
+            if slot is not None and self._counts[level, slot]:
+                unflushed.append((int(self._starts[level, slot]), int(self._counts[level, slot]),
+                                  self._stats[level, slot].copy()))
+        for bucket_start, count, stats in unflushed:
+            if first <= bucket_start < end:
+                fold(bucket_start, count, stats)
+
+        starts = sorted(buckets)
+        counts = np.array([buckets[t][0] for t in starts], dtype=np.float64)
+        stats = np.array([buckets[t][1] for t in starts]).reshape(len(starts), 4, len(FEATURES))
+        result = {"resolution": resolution, "t": starts, "count": counts.astype(int).tolist()}
+        for i, name in enumerate(FEATURES):
+            result[name] = {
+                "min": stats[:, _MIN, i].tolist(),
+                "max": stats[:, _MAX, i].tolist(),
+                "mean": (stats[:, _SUM, i] / counts).tolist() if len(starts) else [],
+                "rms": np.sqrt(stats[:, _SUMSQ, i] / counts).tolist() if len(starts) else [],
+            }
+        return result
+
+    def stats(self):
+        with self._lock:
+            lines = len(self._keys)
+            pending = len(self._pending)
+            open_bytes = self._starts.nbytes + self._counts.nbytes + self._stats.nbytes
+        return {
+            "lines": lines,
+            "open_buckets_bytes": open_bytes,
+            "pending_rows": pending,
+            "samples": self.samples,
+            "rows_written": self.rows_written,
+            "rows_per_sample": self.rows_written / self.samples if self.samples else 0.0,
+            "bytes_written": self.bytes_written,
+            "dropped_rows": self.dropped_rows,
+            "dropped_lines": self.dropped_lines,
+            "flushes": self.flushes,
+            "errors": self.errors,
+            "flush_latency": self.flush_latency.stats(),
+            "retention_s": {f"{r}s": keep for r, keep in self.retention_s.items()},
+        }
@@ -53,6 +53,11 @@ class HardwareInput(BaseModel):
     current_b: float
     current_c: float
 
+# Binary telemetry: interned ids for a substation / line pair
+class TelemetryIdRequest(BaseModel):
+    substation_id: str
+    line_id: str
+
 # Manual input from dashboard - Phase A values only
 class ManualGridInput(BaseModel):
     voltage_a: float        # Phase A Voltage (will be applied to all phases)
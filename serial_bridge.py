@@ -2,15 +2,21 @@ import serial
 import time
 import threading
 import requests
+import device_auth
 
 # --- CONFIGURATION ---
 # ⚠️ CHECK YOUR DEVICE MANAGER!
 SERIAL_PORT = "COM5"   
 BAUD_RATE = 115200     
 API_URL = "http://127.0.0.1:8000/hardware/data"
+COMMANDS_URL = "http://127.0.0.1:8000/hardware/commands"
+LONG_POLL_S = 25
+# HMAC-signs every request when BRIDGE_DEVICE_ID / BRIDGE_DEVICE_KEY are set (see device_auth.py)
+signer = device_auth.signer_from_env("BRIDGE")
 
 ser = None
 is_running = False
+command_lines = set()  # (substation_id, line_id) with a command listener running
 
 def init_serial():
     global ser
@@ -37,6 +43,36 @@ def send_command(cmd):
     else:
         print(f"⚠️ Cannot send '{cmd}' - Arduino Disconnected")
 
+def ack_command(command_id, substation_id, line_id):
+    try:
+        requests.post(f"{COMMANDS_URL}/{command_id}/ack",
+                      params={"substation_id": substation_id, "line_id": line_id}, auth=signer, timeout=2)
+    except Exception as e:
+        print(f"⚠️ Ack failed for command {command_id}: {e}")
+
+def command_loop(substation_id, line_id):
+    """Holds the line's command long-poll open so TRIP/RESET arrive without waiting for a heartbeat."""
+    url = f"{COMMANDS_URL}/{substation_id}/{line_id}"
+    while True:
+        try:
+            resp = requests.get(url, params={"timeout": LONG_POLL_S}, auth=signer, timeout=LONG_POLL_S + 5)
+            if resp.status_code != 200:
+                time.sleep(1)
+                continue
+            for cmd in resp.json().get("commands", []):
+                if cmd["command"] in ["TRIP", "RESET"]:
+                    print(f"⚡ BACKEND ORDER: {cmd['command']}")
+                    send_command(cmd["command"])
+                    ack_command(cmd["command_id"], substation_id, line_id)
+        except Exception:
+            time.sleep(1)
+
+def watch_commands(substation_id, line_id):
+    key = (substation_id, line_id)
+    if key not in command_lines:
+        command_lines.add(key)
+        threading.Thread(target=command_loop, args=key, daemon=True).start()
+
 def read_loop():
     global ser
     print("🚀 SERIAL BRIDGE STARTED. Listening...")
@@ -70,11 +106,12 @@ def read_loop():
                             "voltage": float(parts[2]),
                             "current": float(parts[3])
                         }
+                        watch_commands(payload["substation_id"], payload["line_id"])
                         
                         # 3. Send to Backend
                         try:
                             # print(f"Sending: {payload['current']}A") # Debug print
-                            resp = requests.post(API_URL, json=payload, timeout=1)
+                            resp = requests.post(API_URL, json=payload, auth=signer, timeout=1)
                             
                             if resp.status_code == 200:
                                 data = resp.json()
@@ -84,6 +121,8 @@ def read_loop():
                                 if server_cmd in ["TRIP", "RESET"]:
                                     print(f"⚡ BACKEND ORDER: {server_cmd}")
                                     send_command(server_cmd)
+                                    if data.get("command_id"):
+                                        ack_command(data["command_id"], payload["substation_id"], payload["line_id"])
                             else:
                                 print(f"⚠️ API Error {resp.status_code}")
                                 
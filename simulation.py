@@ -1,62 +1,102 @@
+import os
 import threading
 import time
 import random
 import requests
 import numpy as np
+import telemetry_frame
+import device_auth
 
 # API Endpoint
 API_URL = "http://127.0.0.1:8000/hardware/data"
+COMMANDS_URL = "http://127.0.0.1:8000/hardware/commands"
+FRAMES_URL = "http://127.0.0.1:8000/hardware/data/frames"
+IDS_URL = "http://127.0.0.1:8000/hardware/ids"
+# "json" -> /hardware/data, "frames" -> binary /hardware/data/frames
+TRANSPORT = os.getenv("SIM_TRANSPORT", "json")
+# HMAC-signs every request when SIM_DEVICE_ID / SIM_DEVICE_KEY are set (see device_auth.py)
+signer = device_auth.signer_from_env("SIM")
 NOMINAL_V = 230.0
 
 def calculate_expected_current(load_kw, pf, voltage):
     if pf <= 0.1 or voltage <= 1: return 0.0
     return (load_kw * 1000) / (3 * voltage * pf)
 
+# Scenarios in fixed sequence
+SCENARIOS = ["NORMAL", "SLG", "NORMAL", "LL", "NORMAL", "LLG", "NORMAL", "LLL", "OPEN", "HIGH_Z"]
+
+def generate_sample(scenario, rng=random):
+    """Builds one /hardware/data payload for the given scenario."""
+    # --- 1. GENERATE PHYSICS DATA ---
+    load_kw = rng.uniform(10, 30)
+    pf = rng.uniform(0.85, 0.99)
+    i_exp = calculate_expected_current(load_kw, pf, NOMINAL_V)
+    
+    # Healthy Baselines
+    Va, Vb, Vc = [rng.normalvariate(NOMINAL_V, 2) for _ in range(3)]
+    Ia, Ib, Ic = [rng.normalvariate(i_exp, 0.5) for _ in range(3)]
+
+    # Inject Faults
+    if scenario == "SLG": # Single Line Ground
+        Va = rng.uniform(195, 205)
+        Ia = rng.uniform(18000, 19000) 
+    elif scenario == "LL": # Line Line
+        Va = rng.uniform(150, 180)
+        Vb = rng.uniform(150, 180)
+        Ia = rng.uniform(10000, 15000)
+        Ib = rng.uniform(10000, 15000)
+    elif scenario == "LLG": # Double Line Ground
+        Va = rng.uniform(130, 140)
+        Vb = rng.uniform(130, 140)
+        Ia = rng.uniform(9800, 11000)
+        Ib = rng.uniform(9800, 11000)
+    elif scenario == "LLL": # 3-Phase Short
+        Va, Vb, Vc = [rng.uniform(20, 100) for _ in range(3)]
+        Ia, Ib, Ic = [rng.uniform(10000, 18000) for _ in range(3)]
+    elif scenario == "OPEN": # Open Conductor
+        Ia = 0.05
+    elif scenario == "HIGH_Z": # High Impedance
+        Ia = rng.uniform(8, 10)
+        Va = rng.uniform(150, 200)
+
+    return {
+        "substation_id": "SUB-SIM-01",
+        "line_id": "FEEDER-05",
+        "load_kw": float(load_kw),
+        "pf": float(pf),
+        "voltage_a": float(Va), "voltage_b": float(Vb), "voltage_c": float(Vc),
+        "current_a": float(Ia), "current_b": float(Ib), "current_c": float(Ic)
+    }
+
+frame_ids = {}
+
+def send_frame(payload):
+    """Posts one binary frame, interning the ids on first use. The response is a one-command list."""
+    if ("line", payload["line_id"]) not in frame_ids:
+        ids = requests.post(IDS_URL, json={"substation_id": payload["substation_id"], "line_id": payload["line_id"]}, auth=signer, timeout=2).json()
+        frame_ids[("substation", payload["substation_id"])] = ids["substation"]
+        frame_ids[("line", payload["line_id"])] = ids["line"]
+    resp = requests.post(FRAMES_URL, data=telemetry_frame.encode([payload], frame_ids),
+                         headers={"Content-Type": "application/octet-stream"}, auth=signer, timeout=2)
+    return resp
+
 def run_simulation():
-    print("🚀 PHYSICS SIMULATION STARTED (Full Visibility Mode)...")
+    print(f"🚀 PHYSICS SIMULATION STARTED (Full Visibility Mode, {TRANSPORT} transport)...")
     time.sleep(2)
 
-# Scenarios in fixed sequence
-    scenarios = ["NORMAL", "SLG", "NORMAL", "LL", "NORMAL", "LLG", "NORMAL", "LLL", "OPEN", "HIGH_Z"]
     index = 0
 
     while True:
         try:
         # Follow the sequence in order
-            scenario = scenarios[index]
-            index = (index + 1) % len(scenarios)
-            
-            # --- 1. GENERATE PHYSICS DATA ---
-            load_kw = random.uniform(10, 30)
-            pf = random.uniform(0.85, 0.99)
-            i_exp = calculate_expected_current(load_kw, pf, NOMINAL_V)
+            scenario = SCENARIOS[index]
+            index = (index + 1) % len(SCENARIOS)
             
-            # Healthy Baselines
-            Va, Vb, Vc = [random.normalvariate(NOMINAL_V, 2) for _ in range(3)]
-            Ia, Ib, Ic = [random.normalvariate(i_exp, 0.5) for _ in range(3)]
-
-            # Inject Faults
-            if scenario == "SLG": # Single Line Ground
-                Va = random.uniform(195, 205)
-                Ia = random.uniform(18000, 19000) 
-            elif scenario == "LL": # Line Line
-                Va = random.uniform(150, 180)
-                Vb = random.uniform(150, 180)
-                Ia = random.uniform(10000, 15000)
-                Ib = random.uniform(10000, 15000)
-            elif scenario == "LLG": # Double Line Ground
-                Va = random.uniform(130, 140)
-                Vb = random.uniform(130, 140)
-                Ia = random.uniform(9800, 11000)
-                Ib = random.uniform(9800, 11000)
-            elif scenario == "LLL": # 3-Phase Short
-                Va, Vb, Vc = [random.uniform(20, 100) for _ in range(3)]
-                Ia, Ib, Ic = [random.uniform(10000, 18000) for _ in range(3)]
-            elif scenario == "OPEN": # Open Conductor
-                Ia = 0.05
-            elif scenario == "HIGH_Z": # High Impedance
-                Ia = random.uniform(8, 10)
-                Va = random.uniform(150, 200)
+            # float32 values, exactly what a binary frame carries: same decisions on either transport
+            payload = telemetry_frame.to_float32(generate_sample(scenario))
+            load_kw, pf = payload["load_kw"], payload["pf"]
+            Va, Vb, Vc = payload["voltage_a"], payload["voltage_b"], payload["voltage_c"]
+            Ia, Ib, Ic = payload["current_a"], payload["current_b"], payload["current_c"]
 
             # --- 2. PRINT INPUTS (What we are sending) ---
             print("\n" + "="*60)
@@ -70,20 +110,16 @@ def run_simulation():
             print("-" * 60)
 
             # --- 3. SEND PAYLOAD ---
-            payload = {
-                "substation_id": "SUB-SIM-01",
-                "line_id": "FEEDER-05",
-                "load_kw": float(load_kw),
-                "pf": float(pf),
-                "voltage_a": float(Va), "voltage_b": float(Vb), "voltage_c": float(Vc),
-                "current_a": float(Ia), "current_b": float(Ib), "current_c": float(Ic)
-            }
-
-            resp = requests.post(API_URL, json=payload, timeout=2)
+            if TRANSPORT == "frames":
+                resp = send_frame(payload)
+            else:
+                resp = requests.post(API_URL, json=payload, auth=signer, timeout=2)
             
             # --- 4. PRINT AI RESPONSE (What the Brain decided) ---
             if resp.status_code == 200:
                 data = resp.json()
+                if TRANSPORT == "frames":
+                    data = data[0]
                 cmd = data.get("command")
                 reason = data.get("reason", "Unknown")
                 
@@ -93,6 +129,11 @@ def run_simulation():
                 print(f"🧠 AI DIAGNOSIS: {reason}")
                 print(f"{status_color} SERVER ACTION: {cmd}")
                 print("="*60)
+
+                # Manual commands must be acknowledged or they are delivered again
+                if data.get("command_id"):
+                    requests.post(f"{COMMANDS_URL}/{data['command_id']}/ack",
+                                  params={"substation_id": payload["substation_id"], "line_id": payload["line_id"]}, auth=signer, timeout=2)
             else:
                 print(f"⚠️ Server Error {resp.status_code}")
 
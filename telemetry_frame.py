@@ -0,0 +1,198 @@
+"""
+Fixed-layout binary telemetry frames for /hardware/data/frames.
+
+One frame = one HardwareInput reading, 36 bytes little-endian:
+
+    uint16 substation id, uint16 line id,
+    float32 load_kw, pf, voltage_a, voltage_b, voltage_c, current_a, current_b, current_c
+
+Ids are interned once per name via POST /hardware/ids and stored in the
+telemetry_ids table, so they survive restarts and are shared by all
+workers. A request body is any number of frames back to back.
+"""
+import os
+import threading
+import time
+
+import numpy as np
+from sqlalchemy.exc import IntegrityError
+
+import models
+
+FEATURES = ("load_kw", "pf", "voltage_a", "voltage_b", "voltage_c", "current_a", "current_b", "current_c")
+
+FRAME_DTYPE = np.dtype([("substation", "<u2"), ("line", "<u2")] + [(name, "<f4") for name in FEATURES])
+FRAME_SIZE = FRAME_DTYPE.itemsize
+MAX_ID = np.iinfo(np.uint16).max
+# Unknown ids reload the id table at most this often; in between they are rejected straight away
+TELEMETRY_ID_RELOAD_S = float(os.getenv("TELEMETRY_ID_RELOAD_S", "1"))
+
+
+class FrameError(ValueError):
+    pass
+
+
+class FrameRecord:
+    """Decoded frame with the attributes the ingest path reads from HardwareInput."""
+
+    __slots__ = ("substation_id", "line_id") + FEATURES
+
+    def __init__(self, substation_id, line_id, values):
+        self.substation_id = substation_id
+        self.line_id = line_id
+        (self.load_kw, self.pf, self.voltage_a, self.voltage_b, self.voltage_c,
+         self.current_a, self.current_b, self.current_c) = values
+
+
+class FrameBatch:
+    """
+    Decoded frames, columnar: `raw` is the N x 8 feature matrix, `lines` the
+    distinct (substation_id, line_id) pairs and `line_index` maps each row to
+    one of them. Iterating builds FrameRecords, so only the steps that need
+    one object per reading (command dispatch) pay for them.
+    """
+
+    __slots__ = ("raw", "lines", "line_index")
+
+    def __init__(self, raw, lines, line_index):
+        self.raw = raw
+        self.lines = lines
+        self.line_index = line_index
+
+    def __len__(self):
+        return self.raw.shape[0]
+
+    def __iter__(self):
+        lines = self.lines
+        for i, values in zip(self.line_index.tolist(), self.raw.tolist()):
+            substation_id, line_id = lines[i]
+            yield FrameRecord(substation_id, line_id, values)
+
+
+def line_table(records):
+    """
+    (distinct (substation_id, line_id) pairs, per-row index into them) for a
+    FrameBatch (free) or a list of HardwareInput-like records.
+    """
+    if isinstance(records, FrameBatch):
+        return records.lines, records.line_index
+    index = {}
+    rows = [index.setdefault((r.substation_id, r.line_id), len(index)) for r in records]
+    return list(index), np.array(rows, dtype=np.intp)
+
+
+def line_groups(records):
+    """Yields ((substation_id, line_id), row indices) once per distinct line."""
+    lines, line_index = line_table(records)
+    if len(lines) == 1:
+        yield lines[0], np.arange(len(line_index))
+        return
+    order = np.argsort(line_index, kind="stable")
+    bounds = np.searchsorted(line_index[order], np.arange(len(lines) + 1))
+    for i, key in enumerate(lines):
+        yield key, order[bounds[i]:bounds[i + 1]]
+
+
+class IdRegistry:
+    """name <-> uint16 id for substations and lines, backed by the telemetry_ids table."""
+
+    def __init__(self, session_factory, read_session_factory=None, reload_interval_s=TELEMETRY_ID_RELOAD_S):
+        self.session_factory = session_factory  # interning new names
+        self.read_session_factory = read_session_factory or session_factory
+        self.reload_interval_s = reload_interval_s
+        self._ids = {}  # (kind, name) -> id
+        self._names = {}  # id -> name
+        self._lock = threading.Lock()
+        self._last_load = -float("inf")
+        self.reloads = 0
+        self.rejected = 0
+
+    def _load(self):
+        with self._lock:
+            self._last_load = time.monotonic()
+            self.reloads += 1
+        db = self.read_session_factory()
+        try:
+            rows = db.query(models.TelemetryId).all()
+        finally:
+            db.close()
+        with self._lock:
+            for row in rows:
+                self._ids[(row.kind, row.name)] = row.id
+                self._names[row.id] = row.name
+
+    def intern(self, kind, name):
+        key = (kind, name)
+        if key in self._ids:
+            return self._ids[key]
+        db = self.session_factory()
+        try:
+            db.add(models.TelemetryId(kind=kind, name=name))
+            db.commit()
+        except IntegrityError:
+            db.rollback()  # another worker interned it first
+        finally:
+            db.close()
+        self._load()
+        if self._ids[key] > MAX_ID:
+            raise FrameError(f"Telemetry id space exhausted ({MAX_ID} names)")
+        return self._ids[key]
+
+    def _reload_due(self):
+        with self._lock:
+            return time.monotonic() - self._last_load >= self.reload_interval_s
+
+    def names(self, ids):
+        """
+        Names for an array of ids. Ids interned by another worker are picked up
+        by a reload, at most once per reload_interval_s, so a stream of bad ids
+        cannot turn into a stream of table scans.
+        """
+        unique = np.unique(ids).tolist()
+        if any(i not in self._names for i in unique) and self._reload_due():
+            self._load()
+        missing = [i for i in unique if i not in self._names]
+        if missing:
+            with self._lock:
+                self.rejected += 1
+            raise FrameError(f"Unknown telemetry ids {missing}; register them via /hardware/ids")
+        lookup = self._names
+        return [lookup[i] for i in ids.tolist()]
+
+    def stats(self):
+        return {"names": len(self._names), "reloads": self.reloads, "rejected": self.rejected}
+
+
+def decode(body, registry):
+    """
+    Bytes -> FrameBatch. Ids are resolved once per distinct (substation,
+    line) pair, so nothing here loops over frames in Python.
+    """
+    if not body or len(body) % FRAME_SIZE:
+        raise FrameError(f"Body must be a non-empty multiple of {FRAME_SIZE} bytes")
+    frames = np.frombuffer(body, dtype=FRAME_DTYPE)
+    raw = np.empty((len(frames), len(FEATURES)), dtype=np.float64)
+    for column, name in enumerate(FEATURES):
+        raw[:, column] = frames[name]
+    pairs = (frames["substation"].astype(np.uint32) << 16) | frames["line"]
+    unique, line_index = np.unique(pairs, return_inverse=True)
+    substations = registry.names((unique >> 16).astype(np.uint16))
+    lines = registry.names((unique & 0xFFFF).astype(np.uint16))
+    return FrameBatch(raw, list(zip(substations, lines)), line_index.reshape(-1))
+
+
+def encode(payloads, ids):
+    """
+    Client side: list of /hardware/data payload dicts -> frame bytes.
+    `ids` maps ("substation" | "line", name) to the interned id.
+    """
+    frames = np.empty(len(payloads), dtype=FRAME_DTYPE)
+    for i, p in enumerate(payloads):
+        frames[i] = (ids[("substation", p["substation_id"])], ids[("line", p["line_id"])],
+                     *(p[name] for name in FEATURES))
+    return frames.tobytes()
+
+
+def to_float32(payload):
+    """Payload with measurements rounded to float32, i.e. exactly what a frame carries."""
+    return dict(payload, **{name: float(np.float32(payload[name])) for name in FEATURES})
@@ -0,0 +1,162 @@
+import os
+import threading
+import time
+
+import numpy as np
+
+from telemetry_frame import line_groups
+
+# --- CONFIG ---
+HISTORY_SECONDS = float(os.getenv("HISTORY_SECONDS", "600"))
+# Expected per-line reporting rate; sizes the buffers (capacity = seconds * rate).
+# Feeders report at 1 Hz; a faster line keeps proportionally less than HISTORY_SECONDS
+HISTORY_SAMPLE_RATE_HZ = float(os.getenv("HISTORY_SAMPLE_RATE_HZ", "1"))
+HISTORY_MAX_LINES = int(os.getenv("HISTORY_MAX_LINES", "1024"))
+
+# Raw HardwareInput features, in model column order
+FEATURES = ("load_kw", "pf", "voltage_a", "voltage_b", "voltage_c", "current_a", "current_b", "current_c")
+
+
+class LineHistory:
+    """Fixed-size circular buffer of raw samples for one line."""
+
+    __slots__ = ("values", "timestamps", "head", "count", "lock")
+
+    def __init__(self, capacity):
+        self.values = np.zeros((capacity, len(FEATURES)), dtype=np.float32)
+        self.timestamps = np.zeros(capacity, dtype=np.float64)
+        self.head = 0  # next slot to write
+        self.count = 0
+        self.lock = threading.Lock()
+
+    @property
+    def capacity(self):
+        return self.timestamps.shape[0]
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes + self.timestamps.nbytes
+
+    def append(self, rows, timestamps):
+        """rows: N x 8, timestamps: N epoch seconds. Oldest samples are overwritten."""
+        n = rows.shape[0]
+        capacity = self.capacity
+        if n > capacity:
+            rows, timestamps, n = rows[-capacity:], timestamps[-capacity:], capacity
+        with self.lock:
+            if self.count:
+                # Keep timestamps sorted for searchsorted even if writers race
+                timestamps = np.maximum(timestamps, self.timestamps[self.head - 1])
+            first = min(n, capacity - self.head)
+            self.values[self.head:self.head + first] = rows[:first]
+            self.timestamps[self.head:self.head + first] = timestamps[:first]
+            if first < n:
+                self.values[:n - first] = rows[first:]
+                self.timestamps[:n - first] = timestamps[first:]
+            self.head = (self.head + n) % capacity
+            self.count = min(self.count + n, capacity)
+
+    def since(self, cutoff):
+        """Copy of (values, timestamps) newer than `cutoff`, oldest first."""
+        with self.lock:
+            if self.count < self.capacity:
+                order = slice(0, self.count)
+                values, timestamps = self.values[order], self.timestamps[order]
+            else:
+                # Full buffer: unroll so rows are in arrival order
+                values = np.concatenate((self.values[self.head:], self.values[:self.head]))
+                timestamps = np.concatenate((self.timestamps[self.head:], self.timestamps[:self.head]))
+            start = np.searchsorted(timestamps, cutoff, side="right")
+            return values[start:].copy(), timestamps[start:].copy()
+
+
+def window_stats(values, timestamps):
+    """min / max / mean / RMS per feature over one window."""
+    if not len(timestamps):
+        return {"samples": 0}
+    data = values.astype(np.float64)
+    mins, maxs = data.min(axis=0), data.max(axis=0)
+    means = data.mean(axis=0)
+    rms = np.sqrt(np.mean(data * data, axis=0))
+    return {
+        "samples": int(len(timestamps)),
+        "from": float(timestamps[0]),
+        "to": float(timestamps[-1]),
+        "features": {
+            name: {"min": float(mins[i]), "max": float(maxs[i]), "mean": float(means[i]), "rms": float(rms[i])}
+            for i, name in enumerate(FEATURES)
+        },
+    }
+
+
+class TelemetryHistory:
+    """
+    Recent raw telemetry for every line, in preallocated ring buffers.
+
+    Each line gets HISTORY_SECONDS * HISTORY_SAMPLE_RATE_HZ slots on first
+    sight, so memory per line is fixed and the total is bounded by
+    HISTORY_MAX_LINES (new lines beyond that are not tracked).
+    """
+
+    def __init__(self, seconds=HISTORY_SECONDS, sample_rate_hz=HISTORY_SAMPLE_RATE_HZ, max_lines=HISTORY_MAX_LINES):
+        self.capacity = max(1, int(seconds * sample_rate_hz))
+        self.max_lines = max_lines
+        self._lines = {}
+        self._lock = threading.Lock()
+        self.dropped_lines = 0
+
+    def _line(self, key):
+        history = self._lines.get(key)
+        if history is None:
+            with self._lock:
+                history = self._lines.get(key)
+                if history is None:
+                    if len(self._lines) >= self.max_lines:
+                        self.dropped_lines += 1
+                        return None
+                    history = self._lines[key] = LineHistory(self.capacity)
+        return history
+
+    def record(self, records, received_at=None, raw=None):
+        """
+        Append a list of HardwareInput objects or a FrameBatch (grouped per line, one buffer write each).
+        `raw` is their N x 8 feature matrix when the caller already has it.
+        """
+        if not records:
+            return
+        received_at = time.time() if received_at is None else received_at
+        if raw is None:
+            raw = np.array([[getattr(r, name) for name in FEATURES] for r in records], dtype=np.float32)
+        for key, rows in line_groups(records):
+            history = self._line(key)
+            if history is None:
+                continue
+            history.append(raw[rows], np.full(len(rows), received_at))
+
+    def windows(self, substation_id, line_id, lookbacks_s, now=None):
+        """Aggregates over each lookback window (seconds back from now). None for an unknown line."""
+        history = self._lines.get((substation_id, line_id))
+        if history is None:
+            return None
+        now = time.time() if now is None else now
+        values, timestamps = history.since(now - max(lookbacks_s))
+        result = {}
+        for lookback in lookbacks_s:
+            start = np.searchsorted(timestamps, now - lookback, side="right")
+            result[f"{lookback:g}s"] = window_stats(values[start:], timestamps[start:])
+        return result
+
+    def stats(self):
+        with self._lock:
+            lines = list(self._lines.items())
+        return {
+            "lines": len(lines),
+            "capacity_per_line": self.capacity,
+            "bytes_per_line": self.capacity * (len(FEATURES) * 4 + 8),
+            "total_bytes": sum(history.nbytes for _, history in lines),
+            "dropped_lines": self.dropped_lines,
+            "per_line": [
+                {"substation_id": key[0], "line_id": key[1], "samples": history.count, "bytes": history.nbytes}
+                for key, history in lines
+            ],
+        }
@@ -0,0 +1,15 @@
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+import database
+import models
+
+
+@pytest.fixture
+def sessions(tmp_path):
+    """(writer, reader) session factories on a fresh SQLite file with every table created."""
+    writer, reader = database.create_engines(f"sqlite:///{tmp_path / 'grid.db'}", "default")
+    models.Base.metadata.create_all(bind=writer)
+    yield sessionmaker(bind=writer), sessionmaker(bind=reader)
+    writer.dispose()
+    reader.dispose()
@@ -0,0 +1,97 @@
+import random
+
+import numpy as np
+import pytest
+
+import ai_engine
+import schemas
+import simulation
+
+SCENARIOS = ("NORMAL", "SLG", "LL", "LLG", "LLL", "OPEN", "HIGH_Z")
+
+
+@pytest.fixture(scope="module")
+def records():
+    rng = random.Random(0)
+    return [
+        schemas.HardwareInput(**dict(simulation.generate_sample(scenario, rng), line_id=f"LINE-{i:03d}"))
+        for i, scenario in enumerate(SCENARIOS * 20)
+    ]
+
+
+@pytest.fixture
+def no_cache(monkeypatch):
+    monkeypatch.setattr(ai_engine, "CACHE_ENABLED", False)
+
+
+def test_feature_matrix_matches_scalar_physics(records):
+    features = ai_engine.build_feature_matrix(records)
+    assert features.shape == (len(records), 14)
+    np.testing.assert_array_equal(ai_engine.build_feature_matrix(None, ai_engine.raw_feature_matrix(records)), features)
+    for r, row in zip(records, features):
+        i_expected = ai_engine.calculate_expected_current(r.load_kw, r.pf, ai_engine.NOMINAL_V_PHASE)
+        np.testing.assert_allclose(row[8:11], np.array([r.voltage_a, r.voltage_b, r.voltage_c]) - 230.0)
+        np.testing.assert_allclose(row[11:14], np.array([r.current_a, r.current_b, r.current_c]) - i_expected)
+
+
+def test_batch_matches_one_model_call_per_record(records, no_cache):
+    results = ai_engine.analyze_batch(records)
+    labels = ai_engine.predict_labels(ai_engine.build_feature_matrix(records))
+    assert [label for _, label, _ in results] == labels
+    assert [is_fault for is_fault, _, _ in results] == [label != "Normal" for label in labels]
+    assert [v for _, _, v in results] == [r.voltage_a for r in records]
+    assert results[:len(SCENARIOS)] == [ai_engine.analyze_data(r) for r in records[:len(SCENARIOS)]]
+
+
+def test_empty_batch():
+    assert ai_engine.analyze_batch([]) == []
+
+
+def features_for(load_kw, pf, v=230.0, i_offset=0.0):
+    i_expected = ai_engine.calculate_expected_current(load_kw, pf, ai_engine.NOMINAL_V_PHASE)
+    record = schemas.HardwareInput(substation_id="SUB-01", line_id="LINE-001", load_kw=load_kw, pf=pf,
+                                   voltage_a=v, voltage_b=v, voltage_c=v, current_a=i_expected + i_offset,
+                                   current_b=i_expected, current_c=i_expected)
+    return ai_engine.build_feature_matrix([record])
+
+
+def test_fast_path_answers_only_healthy_samples_in_the_envelope():
+    assert ai_engine.fast_path_mask(features_for(20.0, 0.9))[0]
+    assert not ai_engine.fast_path_mask(features_for(20.0, 0.9, v=215.0))[0]  # voltage out of band
+    assert not ai_engine.fast_path_mask(features_for(20.0, 0.9, i_offset=5.0))[0]  # current out of band
+    assert not ai_engine.fast_path_mask(features_for(1.0, 0.9))[0]  # light load: outside the training data
+    assert not ai_engine.fast_path_mask(features_for(20.0, 0.3))[0]  # pf outside the training data
+    assert ai_engine.fast_path_mask(features_for(20.0, 0.9, v=215.0), v_band=20.0)[0]
+
+
+def test_fast_path_never_masks_a_model_fault(records):
+    features = ai_engine.build_feature_matrix(records)
+    fast = ai_engine.fast_path_mask(features)
+    labels = np.asarray(ai_engine.predict_labels(features))
+    assert fast.any()
+    assert (labels[fast] == "Normal").all()
+    injected = np.arange(len(records)) % len(SCENARIOS) != 0  # every scenario but NORMAL
+    assert not fast[injected].any()
+
+
+def test_fast_path_does_not_change_labels(records, no_cache, monkeypatch):
+    with_fast_path = ai_engine.analyze_batch(records)
+    monkeypatch.setattr(ai_engine, "FAST_PATH_ENABLED", False)
+    assert ai_engine.analyze_batch(records) == with_fast_path
+
+
+def test_cache_reuses_normal_labels_only(records, monkeypatch):
+    cache = ai_engine.PredictionCache(ai_engine.prediction_cache.resolution)
+    monkeypatch.setattr(ai_engine, "prediction_cache", cache)
+    monkeypatch.setattr(ai_engine, "FAST_PATH_ENABLED", False)
+    monkeypatch.setattr(ai_engine, "CACHE_ENABLED", True)
+
+    first = ai_engine.analyze_batch(records)
+    assert cache.stats()["hits"] == 0
+    assert ai_engine.analyze_batch(records) == first
+    normal = sum(1 for is_fault, _, _ in first if not is_fault)
+    faults_under_limit = sum(1 for (is_fault, _, _), r in zip(first, records)
+                             if is_fault and max(r.current_a, r.current_b, r.current_c) <= 500)
+    stats = cache.stats()
+    assert stats["hits"] == normal
+    assert stats["misses"] == normal + 2 * faults_under_limit
@@ -0,0 +1,100 @@
+import datetime
+import os
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from archive import FEATURES, ArchiveReader, ArchiveWriter
+
+T0 = 1_700_000_000.0
+
+
+def batch(lines, t, rng):
+    records = [SimpleNamespace(substation_id="SUB-01", line_id=line) for line in lines]
+    return records, rng.normal(230, 5, size=(len(lines), len(FEATURES))), t
+
+
+@pytest.fixture
+def written(tmp_path):
+    """Five minutes of 1 Hz telemetry for three lines, in 60 s segments."""
+    rng = np.random.default_rng(0)
+    writer = ArchiveWriter(str(tmp_path), segment_seconds=60, retention_s=0, max_bytes=0)
+    batches = [batch(["LINE-001", "LINE-002", "LINE-003"], T0 + i, rng) for i in range(300)]
+    for records, raw, t in batches:
+        writer.append_telemetry(records, raw, received_at=t)
+    writer.close()
+    return writer, ArchiveReader(str(tmp_path)), batches
+
+
+def test_segments_hold_exactly_what_was_appended(written):
+    writer, reader, batches = written
+    assert writer.stats()["rows_written"] == 900
+    assert len(reader.segments("telemetry")) == 5
+    data = reader.scan("telemetry", T0, T0 + 300, FEATURES)
+    expected = np.concatenate([raw for _, raw, _ in batches]).astype(np.float32)
+    for i, name in enumerate(FEATURES):
+        np.testing.assert_array_equal(data[name], expected[:, i])
+
+
+def test_time_range_and_line_filter(written):
+    _, reader, batches = written
+    data = reader.scan("telemetry", T0 + 100, T0 + 110, ["load_kw"], line_id="LINE-002")
+    expected = np.float32([raw[1, 0] for _, raw, t in batches if T0 + 100 <= t < T0 + 110])
+    np.testing.assert_array_equal(data["load_kw"], expected)
+    assert reader.scan("telemetry", T0, T0 + 300, ["load_kw"], line_id="LINE-999")["load_kw"].size == 0
+
+
+def test_aggregate_matches_numpy(written):
+    _, reader, batches = written
+    result = {r["line_id"]: r for r in reader.aggregate(T0, T0 + 300)}
+    values = np.array([raw[2, 3] for _, raw, _ in batches], dtype=np.float32).astype(np.float64)
+    stats = result["LINE-003"]["features"]["voltage_b"]
+    assert result["LINE-003"]["samples"] == 300
+    assert stats["min"] == values.min() and stats["max"] == values.max()
+    assert stats["mean"] == pytest.approx(values.mean()) and stats["rms"] == pytest.approx(np.sqrt(np.mean(values ** 2)))
+
+
+def test_rescore(written):
+    _, reader, _ = written
+    result = reader.rescore(T0, T0 + 300, lambda X: np.where(X[:, 0] > 235, "SLG", "Normal"), lambda raw: raw,
+                            chunk_rows=50)
+    assert result["rows"] == 900
+    assert sum(result["labels"].values()) == 900
+    assert sum(result["faults_by_line"].values()) == result["labels"]["SLG"]
+
+
+def test_fault_events_round_trip(tmp_path):
+    writer = ArchiveWriter(str(tmp_path), retention_s=0, max_bytes=0)
+    events = [{"substation_id": "SUB-01", "line_id": f"LINE-00{i % 2}", "voltage": 100.0 + i, "current": 9000.0,
+               "fault_type": ("SLG", "LLG")[i % 2],
+               "timestamp": datetime.datetime.fromtimestamp(T0 + i, datetime.timezone.utc).replace(tzinfo=None)}
+              for i in range(4)]
+    writer.append_faults(events)
+    writer.close()
+    segment, = ArchiveReader(str(tmp_path)).segments("faults")
+    data = ArchiveReader(str(tmp_path)).scan("faults", T0, T0 + 10, ["voltage", "fault_type"])
+    assert [segment.header["fault_types"][code] for code in data["fault_type"]] == ["SLG", "LLG", "SLG", "LLG"]
+    assert data["voltage"].tolist() == [100.0, 101.0, 102.0, 103.0]
+
+
+def test_prune_by_age_and_size(written):
+    writer, reader, _ = written
+    assert len(reader.segments("telemetry")) == 5
+    writer.retention_s = 120
+    assert writer.prune(now=T0 + 300) == 2  # segments ending before T0 + 180
+    assert len(reader.segments("telemetry")) == 3  # the reader forgets deleted segments
+
+    writer.retention_s = 0
+    segment_bytes = sum(e.stat().st_size for e in os.scandir(reader.segments("telemetry")[0].path))
+    writer.max_bytes = segment_bytes * 1.5
+    assert writer.prune() == 2
+    newest, = reader.segments("telemetry")
+    assert newest.t_max == T0 + 299
+    assert writer.stats()["segments_pruned"] == 4
+
+
+def test_reader_cache_is_bounded(written, tmp_path):
+    reader = ArchiveReader(str(tmp_path), cache_size=2)
+    assert len(reader.segments("telemetry")) == 5
+    assert len(reader._segments) == 2
@@ -0,0 +1,37 @@
+import json
+import os
+import subprocess
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_script(name, *args, env=None):
+    return subprocess.run([sys.executable, os.path.join("benchmarks", name), *args], cwd=REPO_DIR,
+                          env=dict(os.environ, **(env or {})), capture_output=True, text=True, timeout=300)
+
+
+def test_bench_inference_report_and_compare(tmp_path):
+    report_path = str(tmp_path / "report.json")
+    args = ("--samples", "20", "--batch-sizes", "8,32", "--threads", "2")
+    first = run_script("bench_inference.py", *args, "--json", report_path)
+    assert first.returncode == 0, first.stderr
+    with open(report_path) as f:
+        report = json.load(f)
+    names = [r["name"] for r in report["results"]]
+    assert "batch/8" in names and "threads/2" in names and any(n.startswith("single/") for n in names)
+    assert report["samples_per_scenario"] == 20 and report["config"]["backend"]
+    assert all(r["p50_ms"] <= r["p99_ms"] for r in report["results"])
+
+    second = run_script("bench_inference.py", *args, "--compare", report_path)
+    assert second.returncode == 0, second.stderr
+    assert f"vs {report_path}" in second.stdout
+
+
+def test_agreement_scripts_pass():
+    forest = run_script("compiled_forest_agreement.py", "--samples", "2000", env={"AI_MODEL_FORMAT": "pickle"})
+    assert forest.returncode == 0, forest.stdout + forest.stderr
+    assert "Mismatches:  0 (compiled), 0 (early exit)" in forest.stdout
+
+    fast_path = run_script("fast_path_agreement.py", "--samples", "2000", "--per-scenario", "200", "--sweep", "20000")
+    assert fast_path.returncode == 0, fast_path.stdout + fast_path.stderr
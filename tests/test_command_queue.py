@@ -0,0 +1,86 @@
+import asyncio
+import threading
+import time
+
+from command_queue import CommandRouter
+
+
+def test_reset_supersedes_unacked_trip():
+    router = CommandRouter(ack_timeout_s=0.05, ttl_s=60)
+    trip = router.issue("SUB-01", "LINE-001", "TRIP")
+    assert router.take("SUB-01", "LINE-001", limit=1) == [trip]
+
+    # The device never acks the TRIP; the operator resets the line
+    reset = router.issue("SUB-01", "LINE-001", "RESET")
+    assert trip.status == "superseded"
+    assert router.take("SUB-01", "LINE-001", limit=1) == [reset]
+
+    # Past the ack timeout only the RESET is redelivered, never the old TRIP
+    for _ in range(3):
+        time.sleep(0.06)
+        assert router.take("SUB-01", "LINE-001") == [reset]
+    assert trip.attempts == 1
+    assert router.stats()["superseded"] == 1
+
+    router.ack(reset.id, "SUB-01", "LINE-001")
+    time.sleep(0.06)
+    assert router.take("SUB-01", "LINE-001") == []
+
+
+def test_issue_only_supersedes_its_own_line():
+    router = CommandRouter(ack_timeout_s=0.05, ttl_s=60)
+    other = router.issue("SUB-01", "LINE-002", "TRIP")
+    router.issue("SUB-01", "LINE-001", "TRIP")
+    router.issue("SUB-01", "LINE-001", "RESET")
+    assert other.status == "pending"
+    assert router.take("SUB-01", "LINE-002") == [other]
+
+
+def test_stale_acks_are_rejected():
+    router = CommandRouter(ack_timeout_s=0.05, ttl_s=0.1)
+    trip = router.issue("SUB-01", "LINE-001", "TRIP")
+    router.take("SUB-01", "LINE-001")
+    reset = router.issue("SUB-01", "LINE-001", "RESET")
+
+    # A late ack for the superseded TRIP leaves it superseded
+    assert router.ack(trip.id, "SUB-01", "LINE-001").status == "superseded"
+    assert trip.acked is None
+
+    # Past the TTL the RESET can no longer be acked either
+    time.sleep(0.15)
+    assert router.ack(reset.id, "SUB-01", "LINE-001").status == "expired"
+    assert reset.acked is None
+
+    stats = router.stats()
+    assert stats["acked"] == 0
+    assert stats["stale_acks"] == 2
+    assert stats["outstanding"] == 0
+
+
+def test_ack_is_idempotent_and_line_checked():
+    router = CommandRouter(ack_timeout_s=0.05, ttl_s=60)
+    command = router.issue("SUB-01", "LINE-001", "TRIP")
+    assert router.ack(command.id, "SUB-01", "LINE-002") is None
+    assert router.ack(command.id, "SUB-01", "LINE-001").status == "acked"
+    assert router.ack(command.id, "SUB-01", "LINE-001").status == "acked"
+    assert router.stats()["acked"] == 1
+
+
+def test_long_poll_wakes_on_issue_from_another_thread():
+    router = CommandRouter(ack_timeout_s=5, ttl_s=60)
+
+    async def main():
+        router.start()
+        other_line = asyncio.ensure_future(router.poll("SUB-01", "LINE-002", 0.3))
+        waiting = asyncio.ensure_future(router.poll("SUB-01", "LINE-001", 10))
+        await asyncio.sleep(0.05)
+        started = time.monotonic()
+        # Operators issue commands from the threadpool, not the event loop
+        threading.Thread(target=router.issue, args=("SUB-01", "LINE-001", "TRIP")).start()
+        delivered = await asyncio.wait_for(waiting, 2)
+        return delivered, time.monotonic() - started, await other_line
+
+    delivered, waited, other = asyncio.run(main())
+    assert [c.action for c in delivered] == ["TRIP"]
+    assert waited < 1
+    assert other == []
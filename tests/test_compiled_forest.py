@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from compiled_forest import CompiledForest, load_model, predict_class_indices
+
+
+@pytest.fixture(scope="module")
+def forest():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(2000, 14))
+    y = np.select([X[:, 0] > 1.0, X[:, 5] < -1.0, X[:, 2] + X[:, 8] > 1.5], ["SLG", "Open", "LL"], "Normal")
+    return RandomForestClassifier(n_estimators=25, max_depth=8, random_state=0).fit(X, y)
+
+
+@pytest.fixture(scope="module")
+def samples():
+    return np.random.default_rng(1).normal(size=(3000, 14))
+
+
+def test_compiled_forest_matches_sklearn(forest, samples):
+    compiled = CompiledForest.from_sklearn(forest)
+    assert compiled.n_trees == 25
+    np.testing.assert_array_equal(compiled.predict(samples), forest.predict(samples))
+    np.testing.assert_allclose(compiled.predict_proba(samples), forest.predict_proba(samples), atol=1e-12)
+
+
+def test_single_row_matches_sklearn(forest, samples):
+    compiled = CompiledForest.from_sklearn(forest)
+    for row in samples[:50]:
+        assert compiled.predict(row[None, :])[0] == forest.predict(row[None, :])[0]
+
+
+def test_predict_class_indices_backends_agree(forest, samples):
+    compiled = CompiledForest.from_sklearn(forest)
+    expected = np.searchsorted(forest.classes_, forest.predict(samples))
+    for backend, max_rows in (("compiled", 10**6), ("compiled", 16), ("sklearn", 256)):
+        indices, trees = predict_class_indices(samples, compiled, forest, backend, max_rows)
+        np.testing.assert_array_equal(indices, expected)
+        assert trees == len(samples) * compiled.n_trees
+
+
+def test_saved_forest_maps_back_read_only(forest, samples, tmp_path):
+    compiled = CompiledForest.from_sklearn(forest)
+    compiled.save(str(tmp_path / "model.forest"))
+    mapped = CompiledForest.load(str(tmp_path / "model.forest"), mmap=True)
+    assert isinstance(mapped.value, np.memmap) and not mapped.value.flags.writeable
+    assert mapped.max_depth == compiled.max_depth
+    np.testing.assert_array_equal(mapped.classes, compiled.classes)
+    np.testing.assert_array_equal(mapped.predict(samples), forest.predict(samples))
+
+
+def test_load_model_prefers_the_mapped_forest(forest, tmp_path):
+    import joblib
+
+    pkl = str(tmp_path / "model.pkl")
+    joblib.dump(forest, pkl)
+    forest_dir = str(tmp_path / "model.forest")
+    CompiledForest.from_sklearn(forest).save(forest_dir)
+
+    sklearn_model, compiled = load_model(pkl, forest_dir, use_mmap=True)
+    assert sklearn_model is None and isinstance(compiled.threshold, np.memmap)
+
+    # Without the exported directory (or without mmap) the pickle is loaded and compiled
+    sklearn_model, compiled = load_model(pkl, str(tmp_path / "missing"), use_mmap=True)
+    assert sklearn_model is not None and not isinstance(compiled.threshold, np.memmap)
+
+
+def test_early_exit_matches_full_vote(forest, samples):
+    compiled = CompiledForest.from_sklearn(forest)
+    indices, margins, trees_evaluated = compiled.predict_early_exit(samples)
+    np.testing.assert_array_equal(compiled.classes[indices], forest.predict(samples))
+    assert trees_evaluated.max() <= compiled.n_trees
+    assert trees_evaluated.mean() < compiled.n_trees  # clear-cut rows stop early
+    # A row that stopped early had a lead no remaining tree could overturn
+    stopped = trees_evaluated < compiled.n_trees
+    assert (margins[stopped] > compiled.n_trees - trees_evaluated[stopped]).all()
+
+
+def test_early_exit_single_rows_and_backend(forest, samples):
+    compiled = CompiledForest.from_sklearn(forest)
+    for row in samples[:50]:
+        index, _, _ = compiled.predict_early_exit(row)
+        assert compiled.classes[index[0]] == forest.predict(row[None, :])[0]
+    indices, trees = predict_class_indices(samples, compiled, forest, "early_exit")
+    np.testing.assert_array_equal(compiled.classes[indices], forest.predict(samples))
+    assert trees < len(samples) * compiled.n_trees
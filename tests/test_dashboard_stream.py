@@ -0,0 +1,85 @@
+import asyncio
+import json
+
+from dashboard_stream import DashboardBroadcaster
+
+
+def parse(message):
+    event, data = message.strip().split("\n")
+    return event[len("event: "):], json.loads(data[len("data: "):])
+
+
+def line(line_id, voltage, substation_id="SUB-01"):
+    return {"substation_id": substation_id, "line_id": line_id, "voltage": voltage}
+
+
+def fault(line_id, substation_id="SUB-01"):
+    return {"substation_id": substation_id, "line_id": line_id, "fault_type": "SLG"}
+
+
+def test_snapshot_then_faults_for_the_watched_substation_only():
+    async def main():
+        broadcaster = DashboardBroadcaster(max_hz=0)
+        broadcaster.start()
+        stream = broadcaster.stream("SUB-01", snapshot=[line("LINE-001", 230.0)])
+        event, data = parse(await anext(stream))
+        assert (event, data["lines"]) == ("snapshot", [line("LINE-001", 230.0)])
+        broadcaster.publish_fault(fault("LINE-009", substation_id="SUB-02"))
+        broadcaster.publish_fault(fault("LINE-001"))
+        event, data = parse(await asyncio.wait_for(anext(stream), 1))
+        await stream.aclose()
+        return event, data, broadcaster.stats()
+
+    event, data, stats = asyncio.run(main())
+    assert event == "fault" and data["line_id"] == "LINE-001"
+    assert stats["clients"] == 0
+
+
+def test_line_updates_are_coalesced_to_the_latest_value():
+    async def main():
+        broadcaster = DashboardBroadcaster(max_hz=0)
+        broadcaster.start()
+        stream = broadcaster.stream()
+        await anext(stream)  # snapshot
+        for voltage in (1.0, 2.0, 3.0):
+            broadcaster.publish_line(line("LINE-001", voltage))
+        broadcaster.publish_line(line("LINE-002", 9.0))
+        message = await asyncio.wait_for(anext(stream), 1)
+        await stream.aclose()
+        return parse(message), broadcaster.stats()
+
+    (event, data), stats = asyncio.run(main())
+    assert event == "lines"
+    assert sorted((l["line_id"], l["voltage"]) for l in data["lines"]) == [("LINE-001", 3.0), ("LINE-002", 9.0)]
+    assert stats["coalesced_updates"] == 2
+
+
+def test_slow_client_is_dropped_on_fault_backlog():
+    async def main():
+        broadcaster = DashboardBroadcaster(max_hz=0, fault_queue=2)
+        broadcaster.start()
+        stream = broadcaster.stream()
+        await anext(stream)
+        for i in range(3):
+            broadcaster.publish_fault(fault(f"LINE-{i:03d}"))
+        messages = [parse(m)[0] async for m in stream]
+        return messages, broadcaster.stats()
+
+    messages, stats = asyncio.run(main())
+    assert messages == ["overflow"]
+    assert (stats["dropped_clients"], stats["clients"]) == (1, 0)
+
+
+def test_client_limit():
+    async def main():
+        broadcaster = DashboardBroadcaster(max_clients=1)
+        broadcaster.start()
+        first = broadcaster.stream()
+        await anext(first)
+        rejected = [parse(m)[0] async for m in broadcaster.stream()]
+        await first.aclose()
+        return rejected, broadcaster.stats()
+
+    rejected, stats = asyncio.run(main())
+    assert rejected == ["overflow"]
+    assert stats["rejected_clients"] == 1
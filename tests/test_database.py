@@ -0,0 +1,31 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+import database
+
+
+def test_default_profile_is_one_engine(tmp_path):
+    writer, reader = database.create_engines(f"sqlite:///{tmp_path / 'grid.db'}", "default")
+    assert writer is reader
+    with writer.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "delete"
+
+
+def test_tuned_profile_wal_single_writer_and_read_only_readers(tmp_path):
+    writer, reader = database.create_engines(f"sqlite:///{tmp_path / 'grid.db'}", "tuned", readers=2)
+    assert writer.pool.size() == 1 and reader.pool.size() == 2
+    with writer.begin() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        conn.execute(text("CREATE TABLE t (x INTEGER)"))
+        conn.execute(text("INSERT INTO t VALUES (1)"))
+    with reader.connect() as conn:
+        assert conn.execute(text("SELECT x FROM t")).scalar() == 1
+        with pytest.raises(OperationalError):
+            conn.execute(text("INSERT INTO t VALUES (2)"))
+
+
+def test_unknown_profile(tmp_path):
+    with pytest.raises(ValueError):
+        database.create_engines(f"sqlite:///{tmp_path / 'grid.db'}", "fast")
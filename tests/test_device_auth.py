@@ -0,0 +1,95 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from device_auth import DeviceVerifier, _ReplayWindow, signature
+
+
+def make_verifier(tmp_path, table, mode="enforce", window=8):
+    keys = tmp_path / "keys.json"
+    keys.write_text(json.dumps(table))
+    return DeviceVerifier(str(keys), mode=mode, window=window, reload_s=3600)
+
+
+def signed(verifier, device_id, key, counter, body=b"{}", path="/hardware/data"):
+    sig = signature(key, device_id, counter, "POST", path, body)
+    return verifier.verify(device_id, str(counter), sig, "POST", path, body)
+
+
+def as_request(device_id):
+    return SimpleNamespace(state=SimpleNamespace(device_id=device_id))
+
+
+def test_replay_window_accepts_out_of_order_once():
+    window = _ReplayWindow()
+    assert window.accept(10, 8) is None
+    assert window.accept(8, 8) is None  # late but inside the window
+    assert window.accept(8, 8) == "replayed"
+    assert window.accept(10, 8) == "replayed"
+    assert window.accept(3, 8) is None  # offset 7: last slot of the window
+    assert window.accept(2, 8) == "too_old"  # offset 8: just past it
+
+
+def test_replay_window_big_jump_forgets_old_counters():
+    window = _ReplayWindow()
+    for counter in (1, 2, 3):
+        assert window.accept(counter, 8) is None
+    assert window.accept(100, 8) is None
+    assert window.seen == 1
+    assert window.accept(99, 8) is None
+    assert window.accept(3, 8) == "too_old"
+
+
+def test_verify_rejects_bad_signature_and_unknown_device(tmp_path):
+    verifier = make_verifier(tmp_path, {"dev-1": "secret"})
+    assert signed(verifier, "dev-1", b"secret", 1) is None
+    assert signed(verifier, "dev-1", b"wrong", 2) == "bad_signature"
+    assert signed(verifier, "dev-2", b"secret", 1) == "unknown_device"
+    assert verifier.verify("dev-1", None, "sig", "POST", "/hardware/data", b"") == "missing_headers"
+    # A forged request must not move the window: counter 2 is still fresh
+    assert signed(verifier, "dev-1", b"secret", 2) is None
+    assert signed(verifier, "dev-1", b"secret", 2) == "replayed"
+    stats = verifier.stats()
+    assert stats["accepted"] == 2
+    assert stats["rejected"]["bad_signature"] == 1
+
+
+def test_signature_covers_body_and_path(tmp_path):
+    verifier = make_verifier(tmp_path, {"dev-1": "secret"})
+    sig = signature(b"secret", "dev-1", 1, "POST", "/hardware/data", b'{"load_kw": 1}')
+    assert verifier.verify("dev-1", "1", sig, "POST", "/hardware/data", b'{"load_kw": 2}') == "bad_signature"
+    assert verifier.verify("dev-1", "1", sig, "POST", "/hardware/data/batch", b'{"load_kw": 1}') == "bad_signature"
+
+
+def test_line_bound_keys(tmp_path):
+    verifier = make_verifier(tmp_path, {
+        "free": "s0",
+        "one-line": {"secret": "s1", "lines": ["SUB-01/LINE-001"]},
+        "substation": {"secret": "s2", "lines": ["SUB-02/*"]},
+    })
+    assert signed(verifier, "one-line", b"s1", 1) is None  # dict entries still carry the secret
+    assert verifier.allows("free", "SUB-09", "LINE-999")
+    assert verifier.allows("one-line", "SUB-01", "LINE-001")
+    assert not verifier.allows("one-line", "SUB-01", "LINE-002")
+    assert verifier.allows("substation", "SUB-02", "LINE-777")
+    assert not verifier.allows("substation", "SUB-01", "LINE-001")
+    assert verifier.stats()["line_bound_keys"] == 2
+
+
+def test_check_line_enforce_and_monitor(tmp_path):
+    table = {"one-line": {"secret": "s1", "lines": ["SUB-01/LINE-001"]}}
+    enforcing = make_verifier(tmp_path, table)
+    enforcing.check_line(as_request("one-line"), "SUB-01", "LINE-001")
+    with pytest.raises(HTTPException) as exc:
+        enforcing.check_line(as_request("one-line"), "SUB-01", "LINE-002")
+    assert exc.value.status_code == 403
+    assert enforcing.stats()["rejected"]["wrong_line"] == 1
+
+    monitoring = make_verifier(tmp_path, table, mode="monitor")
+    monitoring.check_line(as_request("one-line"), "SUB-01", "LINE-002")
+    assert monitoring.stats()["rejected"]["wrong_line"] == 1
+    # Unauthenticated requests carry no device id and are not double counted
+    monitoring.check_line(as_request(None), "SUB-01", "LINE-002")
+    assert monitoring.stats()["rejected"]["wrong_line"] == 1
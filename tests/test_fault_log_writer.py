@@ -0,0 +1,67 @@
+import time
+
+import pytest
+
+import models
+from fault_log_writer import FaultLogWriter
+
+
+def rows(n, start=0):
+    return [{"substation_id": "SUB-01", "line_id": f"LINE-{i:03d}", "voltage": 0.0, "current": 0.0,
+             "fault_type": "SLG", "status": "Active"} for i in range(start, start + n)]
+
+
+def count(session_factory):
+    db = session_factory()
+    try:
+        return db.query(models.FaultLog).count()
+    finally:
+        db.close()
+
+
+def test_strict_mode_commits_inside_add(sessions):
+    writer = FaultLogWriter(sessions[0], durability="strict")
+    writer.add(rows(3))
+    assert count(sessions[0]) == 3
+    assert writer.stats()["buffered_rows_at_risk"] == 0
+
+
+def test_rows_are_group_committed(sessions):
+    writer = FaultLogWriter(sessions[0], flush_interval_ms=50, max_rows=1000)
+    for i in range(10):
+        writer.add(rows(5, start=i * 5))
+    writer.close()
+    stats = writer.stats()
+    assert count(sessions[0]) == 50
+    assert stats["rows_written"] == 50
+    assert stats["flushes"] < 10
+
+
+def test_failed_flush_keeps_rows_and_caps_the_buffer():
+    class BrokenSession:
+        def execute(self, *args):
+            raise RuntimeError("database is locked")
+
+        def rollback(self):
+            pass
+
+        def close(self):
+            pass
+
+    writer = FaultLogWriter(BrokenSession, flush_interval_ms=10, max_rows=10, max_buffered=25, max_backoff_s=0.05)
+    writer.add(rows(20))
+    writer.add(rows(20, start=20))
+    time.sleep(0.2)
+    stats = writer.stats()
+    assert stats["buffered_rows_at_risk"] == 25
+    assert stats["dropped_rows"] == 15
+    assert stats["errors"] >= 1 and stats["consecutive_failures"] >= 1
+
+    started = time.monotonic()
+    writer.close()  # no retry loop on shutdown
+    assert time.monotonic() - started < 1
+
+
+def test_unknown_durability_mode():
+    with pytest.raises(ValueError):
+        FaultLogWriter(None, durability="fast")
@@ -0,0 +1,22 @@
+import household_analyzer as ha
+
+
+def test_voltage_bands_at_the_boundaries():
+    voltages = [0.0, 129.9, 130.0, 180.0, 180.1, 230.0]
+    assert ha.classify_voltages(voltages).tolist() == [1, 1, 2, 2, 0, 0]
+    assert [ha.classify_voltage(v)[0] for v in voltages] == [
+        "VOLTAGE_LOW", "VOLTAGE_LOW", "PHASE_CHANGE", "PHASE_CHANGE", None, None]
+    assert ha.classify_voltage(230.0)[1] == "Normal operation"
+
+
+def test_trips_above_threshold_only():
+    assert ha.trips([4.9, 5.0, 5.1]).tolist() == [False, False, True]
+    assert bool(ha.trips(6.0))
+
+
+def test_email_rule_is_the_same_for_single_and_batch():
+    assert not ha.should_email(ha.TRIP_LIMIT - 1, "a@example.com")
+    assert ha.should_email(ha.TRIP_LIMIT, "a@example.com")
+    assert ha.should_email(ha.TRIP_LIMIT + 3, "a@example.com")  # keeps reminding while past the limit
+    assert not ha.should_email(ha.TRIP_LIMIT + 3, None)
+    assert not ha.should_email(ha.TRIP_LIMIT + 3, "")
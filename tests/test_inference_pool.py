@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+import compiled_forest
+from ai_engine import FOREST_PATH, MODEL_PATH
+from inference_pool import ProcessInferencePool
+
+
+@pytest.fixture(scope="module")
+def pool():
+    pool = ProcessInferencePool(MODEL_PATH, FOREST_PATH, use_mmap=False, workers=1)
+    yield pool
+    pool.shutdown()
+
+
+@pytest.mark.filterwarnings("ignore:X does not have valid feature names")
+def test_worker_process_matches_in_process_scoring(pool):
+    sklearn_model, compiled = compiled_forest.load_model(MODEL_PATH)
+    X = np.random.default_rng(0).normal([20, 0.9, 230, 230, 230, 40, 40, 40, 0, 0, 0, 0, 0, 0],
+                                        [10, 0.05, 60, 60, 60, 5000, 5000, 20, 60, 60, 60, 5000, 5000, 20],
+                                        size=(500, 14))
+    for backend in ("compiled", "early_exit"):
+        expected, expected_trees = compiled_forest.predict_class_indices(X, compiled, sklearn_model, backend)
+        indices, trees = pool.predict_indices(X, backend)
+        assert indices.dtype == np.int8
+        np.testing.assert_array_equal(indices, expected)
+        assert trees == expected_trees
+    assert pool.stats()["calls"] == 2 and pool.stats()["in_flight"] == 0
+
+
+def test_shutdown_and_restart(pool):
+    pool.shutdown()
+    assert not pool.stats()["running"]
+    indices, _ = pool.predict_indices(np.zeros((1, 14)))  # the next call starts a fresh pool
+    assert len(indices) == 1 and pool.stats()["running"]
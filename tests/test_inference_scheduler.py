@@ -0,0 +1,50 @@
+import threading
+
+import numpy as np
+import pytest
+
+from inference_scheduler import MicroBatchScheduler
+
+
+def test_rows_come_back_to_their_callers():
+    scheduler = MicroBatchScheduler(lambda X: X[:, 0].astype(int), max_batch_size=8, max_wait_ms=20)
+    try:
+        futures = [scheduler.submit(np.full((n, 14), n)) for n in (1, 3, 2)]
+        assert [f.result(timeout=5) for f in futures] == [[1], [3, 3, 3], [2, 2]]
+        assert scheduler.stats()["rows"] == 6
+    finally:
+        scheduler.stop()
+
+
+def test_predict_errors_reach_every_caller():
+    def broken(X):
+        raise ValueError("model missing")
+
+    scheduler = MicroBatchScheduler(broken, max_wait_ms=20)
+    try:
+        futures = [scheduler.submit(np.zeros((1, 14))) for _ in range(3)]
+        for f in futures:
+            with pytest.raises(ValueError):
+                f.result(timeout=5)
+    finally:
+        scheduler.stop()
+
+
+def test_stop_resolves_queued_futures():
+    release = threading.Event()
+
+    def slow(X):
+        release.wait(10)
+        return np.zeros(len(X), dtype=int)
+
+    scheduler = MicroBatchScheduler(slow, max_batch_size=1, max_wait_ms=0)
+    running = scheduler.submit(np.zeros((1, 14)))
+    queued = [scheduler.submit(np.zeros((1, 14))) for _ in range(3)]
+    stopper = threading.Thread(target=scheduler.stop)
+    stopper.start()
+    release.set()
+    stopper.join(10)
+    assert running.result(timeout=5) == [0]
+    for f in queued:
+        assert f.done()
+    assert not scheduler.stats()["running"]
@@ -0,0 +1,74 @@
+import asyncio
+import threading
+
+from ingest_pipeline import IngestPipeline
+
+
+def test_infer_runs_off_the_event_loop():
+    threads = []
+
+    def infer(records, scale):
+        threads.append(threading.get_ident())
+        return [r * scale for r in records]
+
+    async def main():
+        pipeline = IngestPipeline(infer, lambda events: None, lambda event: None)
+        assert await pipeline.infer([1, 2], 10) == [10, 20]
+        return pipeline
+
+    pipeline = asyncio.run(main())
+    assert threads and threads[0] != threading.get_ident()
+    assert pipeline.stats()["latency"]["infer"]["count"] == 1
+
+
+def test_stop_drains_persist_and_notify():
+    persisted, notified = [], []
+
+    async def main():
+        pipeline = IngestPipeline(None, persisted.extend, notified.append)
+        pipeline.start()
+        for batch in range(5):
+            await pipeline.enqueue([f"fault-{batch}-{i}" for i in range(3)])
+        await pipeline.stop()
+        return pipeline
+
+    pipeline = asyncio.run(main())
+    assert sorted(persisted) == sorted(f"fault-{b}-{i}" for b in range(5) for i in range(3))
+    assert sorted(notified) == sorted(persisted)
+    assert not pipeline.running
+
+
+def test_full_notify_queue_drops_alerts_but_never_fault_rows():
+    persisted, notified = [], []
+    release = threading.Event()
+
+    def slow_notify(event):
+        release.wait(5)
+        notified.append(event)
+
+    async def main():
+        pipeline = IngestPipeline(None, persisted.extend, slow_notify, persist_queue_size=2, notify_queue_size=2)
+        pipeline.start()
+        await pipeline.enqueue([f"fault-{i}" for i in range(10)])
+        release.set()
+        await pipeline.stop()
+        return pipeline
+
+    pipeline = asyncio.run(main())
+    assert len(persisted) == 10
+    assert pipeline.notify_dropped == 10 - len(notified)
+    assert pipeline.notify_dropped > 0
+
+
+def test_persist_errors_are_counted_and_the_queue_still_drains():
+    def broken(events):
+        raise RuntimeError("database locked")
+
+    async def main():
+        pipeline = IngestPipeline(None, broken, lambda event: None)
+        pipeline.start()
+        await pipeline.enqueue(["fault"])
+        await asyncio.wait_for(pipeline.stop(), 5)
+        return pipeline
+
+    assert asyncio.run(main()).stats()["persist_errors"] == 1
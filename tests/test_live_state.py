@@ -0,0 +1,44 @@
+import threading
+import time
+
+from live_state import LiveStateStore
+
+
+def test_status_transitions():
+    store = LiveStateStore(shards=4)
+    assert store.get("SUB-01", "LINE-001") is None
+    assert store.update("SUB-01", "LINE-001", 230.0, 40.0) == "STABLE"
+    assert store.update("SUB-01", "LINE-001", 120.0, 9000.0, "fault") == "CRITICAL"
+    assert store.update("SUB-01", "LINE-001", 230.0, 40.0) == "STABLE"  # normal reading clears a fault
+    assert store.update("SUB-01", "LINE-001", 230.0, 40.0, "TRIP") == "MANUAL_TRIP"
+    assert store.update("SUB-01", "LINE-001", 230.0, 40.0) == "MANUAL_TRIP"  # but not a manual trip
+    assert store.update("SUB-01", "LINE-001", 230.0, 40.0, "RESET") == "STABLE"
+    line = store.get("SUB-01", "LINE-001")
+    assert (line["voltage"], line["current"], line["status"]) == (230.0, 40.0, "STABLE")
+
+
+def test_snapshot_filters_and_orders_by_last_update():
+    store = LiveStateStore(shards=4)
+    for sub, line in (("SUB-01", "LINE-001"), ("SUB-02", "LINE-001"), ("SUB-01", "LINE-002")):
+        store.update(sub, line, 230.0, 40.0)
+        time.sleep(0.001)  # distinct timestamps
+    assert [(l["substation_id"], l["line_id"]) for l in store.snapshot()] == [
+        ("SUB-01", "LINE-002"), ("SUB-02", "LINE-001"), ("SUB-01", "LINE-001")]
+    assert {l["line_id"] for l in store.snapshot(substation_id="SUB-01")} == {"LINE-001", "LINE-002"}
+    assert [l["substation_id"] for l in store.snapshot(line_id="LINE-001")] == ["SUB-02", "SUB-01"]
+
+
+def test_concurrent_updates_keep_every_line():
+    store = LiveStateStore(shards=8)
+
+    def writer(n):
+        for i in range(200):
+            store.update(f"SUB-{n:02d}", f"LINE-{i % 50:03d}", float(i), float(n))
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert store.stats()["lines"] == 8 * 50
+    assert all(line["voltage"] >= 150 for line in store.snapshot())  # the last of the 200 updates won
@@ -0,0 +1,92 @@
+import threading
+
+import pytest
+from sqlalchemy import update
+
+import models
+from meter_index import MeterIndex
+
+
+@pytest.fixture
+def consumers(sessions):
+    db = sessions[0]()
+    db.add_all([models.Consumer(meter_id=f"M-{i}", substation_id=f"SUB-0{i % 2}", email=f"m{i}@example.com",
+                                trip_count=0, voltage=0.0, power_factor=0.0) for i in range(4)])
+    db.commit()
+    db.close()
+    return sessions
+
+
+def stored(sessions, meter_id):
+    db = sessions[1]()
+    try:
+        return db.query(models.Consumer).filter(models.Consumer.meter_id == meter_id).one()
+    finally:
+        db.close()
+
+
+def test_readings_are_applied_in_order_and_flushed_as_deltas(consumers):
+    meters = MeterIndex(consumers[0], read_session_factory=consumers[1])
+    results = meters.record_many(["M-0", "M-0", "X-9", "M-1"], [True, True, True, False],
+                                 [230.0, 120.0, 230.0, 231.0], [0.9, 0.8, 0.9, 0.95])
+    assert [r and r[1] for r in results] == [1, 2, None, 0]
+    assert results[0][2] == "m0@example.com"
+    assert meters.stats()["lookups"] == 1  # one IN query for the unseen meters
+
+    # Another writer moves the row meanwhile; the flush only adds its own increments
+    db = consumers[0]()
+    db.execute(update(models.Consumer).where(models.Consumer.meter_id == "M-0").values(trip_count=10))
+    db.commit()
+    db.close()
+
+    assert meters.flush() == 2
+    row = stored(consumers, "M-0")
+    assert (row.trip_count, row.voltage, row.power_factor) == (12, 120.0, 0.8)
+    assert meters.flush() == 0
+
+
+def test_failed_flush_restores_increments(consumers):
+    meters = MeterIndex(consumers[0], read_session_factory=consumers[1])
+    meters.record("M-2", True, 230.0, 0.9)
+
+    class BrokenSession:
+        def execute(self, *args):
+            raise RuntimeError("database is locked")
+
+        def rollback(self):
+            pass
+
+        def close(self):
+            pass
+
+    healthy, meters.session_factory = meters.session_factory, BrokenSession
+    assert meters.flush() == 0
+    assert meters.stats()["errors"] == 1 and meters.stats()["dirty"] == 1
+    meters.record("M-2", True, 231.0, 0.9)  # more trips while the database is down
+
+    meters.session_factory = healthy
+    assert meters.flush() == 1
+    assert stored(consumers, "M-2").trip_count == 2
+
+
+def test_concurrent_readings_lose_no_increments(consumers):
+    meters = MeterIndex(consumers[0], read_session_factory=consumers[1], shards=2)
+    meters.load()
+
+    def reader():
+        for _ in range(250):
+            meters.record("M-3", True, 230.0, 0.9)
+
+    threads = [threading.Thread(target=reader) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    meters.close()
+    assert stored(consumers, "M-3").trip_count == 1000
+
+
+def test_substation_lookup(consumers):
+    meters = MeterIndex(consumers[0], read_session_factory=consumers[1])
+    assert sorted(m.meter_id for m in meters.substation("SUB-01")) == ["M-1", "M-3"]
+    assert meters.substation("SUB-09") == []
@@ -0,0 +1,54 @@
+import joblib
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from compiled_forest import CompiledForest
+from model_registry import ModelRegistry
+
+
+def train(seed):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(300, 14))
+    return RandomForestClassifier(n_estimators=5, max_depth=4, random_state=seed).fit(X, np.where(X[:, 0] > 0, "SLG", "Normal"))
+
+
+@pytest.fixture
+def model_dir(tmp_path):
+    for version, seed in (("v1", 0), ("v2", 1)):
+        joblib.dump(train(seed), tmp_path / f"{version}.pkl")
+    return tmp_path
+
+
+def test_versions_load_on_first_use(model_dir):
+    registry = ModelRegistry(str(model_dir))
+    assert registry.scan() == ["v1", "v2"]
+    assert [v["loaded"] for v in registry.describe()["versions"]] == [False, False]
+
+    registry.promote("v1")
+    registry.set_shadow("v2")
+    described = registry.describe()
+    assert (described["primary"], described["shadow"]) == ("v1", "v2")
+    assert all(v["loaded"] and v["format"] == "pickle" for v in described["versions"])
+
+    registry.set_shadow(None)
+    assert registry.shadow is None
+
+
+def test_promote_swaps_primary_and_picks_up_new_files(model_dir):
+    registry = ModelRegistry(str(model_dir))
+    first = registry.promote("v1")
+    joblib.dump(train(2), model_dir / "v3.pkl")  # trained after startup
+    second = registry.promote("v3")
+    assert registry.primary is second and second is not first
+    assert first.compiled is not None  # in-flight requests can finish on the old version
+    with pytest.raises(KeyError):
+        registry.promote("missing")
+    assert registry.primary is second
+
+
+def test_mmap_registry_uses_the_exported_forest(model_dir):
+    CompiledForest.from_sklearn(joblib.load(model_dir / "v1.pkl")).save(str(model_dir / "v1.forest"))
+    registry = ModelRegistry(str(model_dir), use_mmap=True)
+    assert registry.promote("v1").format == "mmap"
+    assert registry.promote("v2").format == "pickle"  # no export: falls back to the pickle
@@ -0,0 +1,47 @@
+import asyncio
+import threading
+
+import pytest
+from passlib.context import CryptContext
+
+from password_hasher import HasherBusy, PasswordHasher
+
+
+def test_hash_and_verify_with_rehash_of_old_cost():
+    old = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4)
+    current = CryptContext(schemes=["bcrypt"], bcrypt__rounds=5)
+    hasher = PasswordHasher(current, workers=1)
+
+    async def main():
+        fresh = await hasher.hash("secret")
+        assert await hasher.verify_and_update("secret", fresh) == (True, None)
+        assert (await hasher.verify_and_update("wrong", fresh))[0] is False
+        matches, new_hash = await hasher.verify_and_update("secret", old.hash("secret"))
+        assert matches and current.identify(new_hash) == "bcrypt" and "$05$" in new_hash
+
+    asyncio.run(main())
+    assert hasher.stats()["rehashed"] == 1
+    assert hasher.stats()["completed"] == 4
+
+
+def test_admission_limit_rejects_instead_of_queueing():
+    release = threading.Event()
+
+    class SlowContext:
+        def hash(self, password):
+            release.wait(5)
+            return password
+
+    hasher = PasswordHasher(SlowContext(), workers=1, max_pending=2)
+
+    async def main():
+        running = [asyncio.ensure_future(hasher.hash(str(i))) for i in range(2)]
+        await asyncio.sleep(0.05)
+        with pytest.raises(HasherBusy):
+            await hasher.hash("one too many")
+        release.set()
+        return await asyncio.gather(*running)
+
+    assert asyncio.run(main()) == ["0", "1"]
+    stats = hasher.stats()
+    assert (stats["rejected"], stats["completed"], stats["queue_depth"]) == (1, 2, 0)
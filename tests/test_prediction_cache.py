@@ -0,0 +1,57 @@
+import time
+
+import numpy as np
+
+from prediction_cache import PredictionCache
+
+
+def rows(*values):
+    return np.array([[v] * 14 for v in values], dtype=np.float64)
+
+
+def test_rows_in_the_same_cell_share_a_key():
+    cache = PredictionCache(resolution=[1.0] * 14)
+    keys = cache.keys(rows(10.0, 10.2, 10.8))
+    assert keys[0] == keys[1] != keys[2]
+
+
+def test_only_normal_labels_are_stored():
+    cache = PredictionCache(resolution=[1.0] * 14)
+    keys = cache.keys(rows(1.0, 2.0))
+    cache.put_many(keys, ["Normal", "SLG"])
+    assert cache.get_many(keys) == ["Normal", None]
+
+
+def test_fault_currents_bypass_the_cache():
+    cache = PredictionCache(resolution=[1.0] * 14, fault_current_limit=500.0)
+    keys = cache.keys(rows(1.0, 900.0))
+    assert keys[1] is None
+    cache.put_many(keys, ["Normal", "Normal"])
+    assert cache.get_many(keys) == ["Normal", None]
+    assert cache.stats()["bypassed"] == 1
+
+
+def test_lru_eviction_and_ttl():
+    cache = PredictionCache(resolution=[1.0] * 14, max_size=2, ttl_s=0.05)
+    keys = cache.keys(rows(1.0, 2.0, 3.0))
+    cache.put_many(keys[:2], ["Normal"] * 2)
+    cache.get_many(keys[:1])  # touch the first so the second is evicted
+    cache.put_many(keys[2:], ["Normal"])
+    assert cache.get_many(keys) == ["Normal", None, "Normal"]
+    assert cache.stats()["evictions"] == 1
+    time.sleep(0.06)
+    assert cache.get_many(keys[:1]) == [None]
+    assert cache.stats()["expirations"] == 1
+
+
+def test_put_after_clear_is_dropped():
+    cache = PredictionCache(resolution=[1.0] * 14)
+    keys = cache.keys(rows(1.0))
+    generation = cache.generation  # read before predicting with the old model
+    cache.clear()  # promote
+    cache.put_many(keys, ["Normal"], generation)
+    assert cache.get_many(keys) == [None]
+    assert cache.stats()["stale_puts"] == 1
+
+    cache.put_many(keys, ["Normal"], cache.generation)
+    assert cache.get_many(keys) == ["Normal"]
@@ -0,0 +1,64 @@
+import time
+from types import SimpleNamespace
+
+from principal_cache import PrincipalCache
+
+FAR = time.time() + 3600
+
+
+def user(userid):
+    return SimpleNamespace(userid=userid)
+
+
+def cached(cache, token):
+    return cache.get(token)[0]
+
+
+def test_hit_after_put():
+    cache = PrincipalCache()
+    alice = user("alice")
+    assert cached(cache, "t1") is None
+    cache.put("t1", alice, FAR, cache.get("t1")[1])
+    assert cached(cache, "t1") is alice
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (1, 2)
+
+
+def test_entry_never_outlives_ttl_or_token_exp():
+    cache = PrincipalCache(ttl_s=0.05)
+    cache.put("short-ttl", user("a"), FAR, 0)
+    cache.put("expiring-token", user("b"), time.time() + 0.01, 0)
+    time.sleep(0.02)
+    assert cached(cache, "expiring-token") is None
+    assert cached(cache, "short-ttl") is not None
+    time.sleep(0.05)
+    assert cached(cache, "short-ttl") is None
+    assert cache.stats()["expirations"] == 2
+
+
+def test_invalidate_drops_every_token_of_the_user():
+    cache = PrincipalCache()
+    for token, userid in (("a1", "alice"), ("a2", "alice"), ("b1", "bob")):
+        cache.put(token, user(userid), FAR, 0)
+    cache.invalidate("alice")
+    assert cached(cache, "a1") is None and cached(cache, "a2") is None
+    assert cached(cache, "b1") is not None
+    assert cache.stats()["users"] == 1
+
+
+def test_lookup_racing_an_invalidation_is_not_stored():
+    cache = PrincipalCache()
+    _, generation = cache.get("t1")  # request starts: JWT decode + SELECT
+    cache.invalidate("alice")  # password changed meanwhile
+    cache.put("t1", user("alice"), FAR, generation)
+    assert cached(cache, "t1") is None
+
+
+def test_lru_eviction():
+    cache = PrincipalCache(max_size=2)
+    cache.put("t1", user("a"), FAR, 0)
+    cache.put("t2", user("b"), FAR, 0)
+    cached(cache, "t1")
+    cache.put("t3", user("c"), FAR, 0)
+    assert cached(cache, "t2") is None
+    assert cached(cache, "t1") is not None and cached(cache, "t3") is not None
+    assert cache.stats()["evictions"] == 1
@@ -0,0 +1,76 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from rollups import FEATURES, RollupStore
+
+NOW = 1_699_999_200.0  # on an hour boundary
+KEEP = {1: 6 * 3600, 60: 30 * 86400, 3600: 0}
+
+
+def feed(store, seconds, lines=("LINE-001",), start=NOW - 3600):
+    """One sample per line per second; load_kw counts up from 0."""
+    for i in range(seconds):
+        records = [SimpleNamespace(substation_id="SUB-01", line_id=line) for line in lines]
+        raw = np.tile(np.arange(len(FEATURES), dtype=np.float64), (len(lines), 1))
+        raw[:, 0] = i
+        store.add(records, raw, received_at=start + i)
+
+
+def test_pick_resolution():
+    store = RollupStore(None, retention_s=KEEP)
+    assert store.pick_resolution(NOW - 300, NOW, 500, now=NOW) == 1
+    assert store.pick_resolution(NOW - 7200, NOW, 500, now=NOW) == 60  # 7200 points at 1 s is too many
+    assert store.pick_resolution(NOW - 300, NOW, 500, now=NOW + 7 * 3600) == 60  # 1 s rows already pruned
+    assert store.pick_resolution(NOW - 300, NOW, 500, now=NOW + 31 * 86400) == 3600
+    assert store.pick_resolution(NOW - 365 * 86400, NOW, 500, now=NOW) == 3600
+
+
+def test_query_matches_raw_samples_before_and_after_flush(sessions):
+    store = RollupStore(sessions[0], retention_s=KEEP, read_session_factory=sessions[1])
+    start = NOW - 3600  # on a 1 h bucket boundary
+    feed(store, 150, start=start)
+
+    def series():
+        minutes = store.query("SUB-01", "LINE-001", start, start + 180, resolution=60)
+        seconds = store.query("SUB-01", "LINE-001", start, start + 180, resolution=1)
+        return minutes, seconds
+
+    before = series()
+    store.close()  # seals the open partial buckets and writes everything
+    assert store.stats()["pending_rows"] == 0
+    after = series()
+    assert before == after
+
+    minutes, seconds = after
+    assert minutes["count"] == [60, 60, 30]
+    assert minutes["load_kw"]["mean"] == [29.5, 89.5, 134.5]
+    assert minutes["load_kw"]["max"] == [59.0, 119.0, 149.0]
+    assert seconds["count"] == [1] * 150 and seconds["load_kw"]["min"] == list(map(float, range(150)))
+    assert minutes["pf"]["rms"] == [1.0, 1.0, 1.0]
+
+
+def test_lines_are_kept_apart_and_capped(sessions):
+    store = RollupStore(sessions[0], retention_s=KEEP, max_lines=2)
+    feed(store, 10, lines=("LINE-001", "LINE-002", "LINE-003"))
+    assert store.stats()["dropped_lines"] > 0
+    assert store.query("SUB-01", "LINE-002", NOW - 3600, NOW, resolution=60)["count"] == [10]
+    assert store.query("SUB-01", "LINE-003", NOW - 3600, NOW, resolution=60)["count"] == []
+
+
+def test_late_batch_is_not_lost(sessions):
+    store = RollupStore(sessions[0], retention_s=KEEP)
+    feed(store, 5, start=NOW - 3600 + 120)
+    feed(store, 1, start=NOW - 3600 + 30)  # arrives after a later bucket opened
+    store.close()
+    assert store.query("SUB-01", "LINE-001", NOW - 3600, NOW, resolution=60)["count"] == [1, 5]
+    assert store.query("SUB-01", "LINE-001", NOW - 3600, NOW, resolution=3600)["count"] == [6]
+
+
+def test_prune_drops_rows_past_retention(sessions):
+    store = RollupStore(sessions[0], retention_s={1: 60, 60: 0, 3600: 0})
+    feed(store, 120)
+    store.close()
+    store.prune(now=NOW - 3600 + 120)
+    assert len(store.query("SUB-01", "LINE-001", NOW - 3600, NOW, resolution=1)["t"]) == 60
+    assert store.query("SUB-01", "LINE-001", NOW - 3600, NOW, resolution=60)["count"] == [60, 60]
@@ -0,0 +1,52 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+from model_registry import ShadowScorer
+
+
+def wait_until(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert predicate()
+
+
+def test_disagreements_are_counted_per_class_and_path():
+    registry = SimpleNamespace(shadow=SimpleNamespace(version="v2"))
+    scorer = ShadowScorer(registry, lambda shadow, X: ["Normal", "SLG", "Normal"])
+    scorer.submit(np.zeros((3, 14)), ["Normal", "Normal", "Open"], ["fast_path", "model", "model"])
+    wait_until(lambda: scorer.stats()["per_path"].get("model", {}).get("compared") == 2)
+    stats = scorer.stats()
+    assert stats["per_class"]["Normal"]["disagreed"] == 1
+    assert stats["per_class"]["Normal"]["shadow_labels"] == {"SLG": 1}
+    assert stats["per_class"]["Open"]["disagreed"] == 1
+    assert stats["per_path"]["fast_path"] == {"compared": 1, "disagreed": 0, "disagreement_rate": 0.0}
+
+
+def test_samples_from_before_a_reset_are_not_counted():
+    release = threading.Event()
+
+    def slow_shadow(shadow, X):
+        release.wait(5)
+        return ["SLG"] * len(X)
+
+    registry = SimpleNamespace(shadow=SimpleNamespace(version="v2"))
+    scorer = ShadowScorer(registry, slow_shadow)
+    old_generation = scorer.generation
+    scorer.submit(np.zeros((1, 14)), ["Normal"])  # being scored when the promote lands
+    scorer.submit(np.zeros((1, 14)), ["Normal"])  # still queued
+    wait_until(lambda: scorer.stats()["queued"] == 1)
+
+    scorer.reset()  # promote
+    scorer.submit(np.zeros((1, 14)), ["Normal"], generation=old_generation)  # labelled by the old primary
+    scorer.submit(np.zeros((1, 14)), ["SLG"])
+    release.set()
+
+    wait_until(lambda: scorer.stats()["stale"] == 3)
+    wait_until(lambda: scorer.stats()["per_class"].get("SLG", {}).get("compared") == 1)
+    stats = scorer.stats()
+    assert "Normal" not in stats["per_class"]
+    assert stats["per_class"]["SLG"]["disagreed"] == 0
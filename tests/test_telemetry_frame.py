@@ -0,0 +1,76 @@
+import random
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import simulation
+import telemetry_frame
+from telemetry_frame import FEATURES, FRAME_SIZE, FrameError, IdRegistry, decode, encode, line_groups, line_table
+
+
+@pytest.fixture
+def registry(sessions):
+    return IdRegistry(*sessions, reload_interval_s=3600)
+
+
+def payloads(n, lines=3):
+    rng = random.Random(0)
+    return [dict(simulation.generate_sample("NORMAL", rng), substation_id=f"SUB-{i % 2:02d}",
+                 line_id=f"LINE-{i % lines:03d}") for i in range(n)]
+
+
+def interned(registry, items):
+    return {(kind, p[f"{kind}_id"]): registry.intern(kind, p[f"{kind}_id"])
+            for p in items for kind in ("substation", "line")}
+
+
+def test_round_trip(registry):
+    items = payloads(50)
+    body = encode(items, interned(registry, items))
+    assert len(body) == 50 * FRAME_SIZE == 50 * 36
+
+    batch = decode(body, registry)
+    assert len(batch) == 50
+    for record, payload in zip(batch, map(telemetry_frame.to_float32, items)):
+        assert (record.substation_id, record.line_id) == (payload["substation_id"], payload["line_id"])
+        assert [getattr(record, name) for name in FEATURES] == [payload[name] for name in FEATURES]
+    np.testing.assert_array_equal(batch.raw[:, 0], np.float32([p["load_kw"] for p in items]))
+
+
+def test_ids_survive_a_restart(sessions, registry):
+    items = payloads(4)
+    body = encode(items, interned(registry, items))
+    fresh = IdRegistry(*sessions)  # another worker, or after a restart
+    assert [(r.substation_id, r.line_id) for r in decode(body, fresh)] == \
+        [(p["substation_id"], p["line_id"]) for p in items]
+
+
+def test_bad_bodies_and_unknown_ids(registry):
+    items = payloads(2)
+    body = encode(items, interned(registry, items))
+    for bad in (b"", body[:-1]):
+        with pytest.raises(FrameError):
+            decode(bad, registry)
+
+    unknown = encode(items[:1], {("substation", "SUB-00"): 999, ("line", "LINE-000"): 998})
+    reloads = registry.stats()["reloads"]
+    for _ in range(5):
+        with pytest.raises(FrameError):
+            decode(unknown, registry)
+    # Within reload_interval_s unknown ids are rejected without rescanning the table
+    assert registry.stats()["reloads"] == reloads
+    assert registry.stats()["rejected"] == 5
+
+
+def test_line_table_and_groups_agree_for_records_and_batches(registry):
+    items = payloads(12, lines=4)
+    records = [SimpleNamespace(**p) for p in items]
+    batch = decode(encode(items, interned(registry, items)), registry)
+    for source in (records, batch):
+        lines, line_index = line_table(source)
+        assert [lines[i] for i in line_index] == [(p["substation_id"], p["line_id"]) for p in items]
+        groups = dict(line_groups(source))
+        assert sorted(np.concatenate(list(groups.values())).tolist()) == list(range(12))
+        for key, rows in groups.items():
+            assert all((items[i]["substation_id"], items[i]["line_id"]) == key for i in rows)
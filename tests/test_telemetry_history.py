@@ -0,0 +1,52 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from telemetry_history import FEATURES, LineHistory, TelemetryHistory
+
+
+def reading(line_id, value, substation_id="SUB-01"):
+    return SimpleNamespace(substation_id=substation_id, line_id=line_id, **dict.fromkeys(FEATURES, value))
+
+
+def test_ring_buffer_wraps_in_arrival_order():
+    history = LineHistory(capacity=4)
+    for t in range(6):
+        history.append(np.full((1, 8), t, dtype=np.float32), np.array([float(t)]))
+    values, timestamps = history.since(-1)
+    assert timestamps.tolist() == [2.0, 3.0, 4.0, 5.0]
+    assert values[:, 0].tolist() == [2.0, 3.0, 4.0, 5.0]
+    assert history.since(3.0)[1].tolist() == [4.0, 5.0]
+
+
+def test_oversized_append_keeps_the_newest_rows():
+    history = LineHistory(capacity=3)
+    history.append(np.arange(5 * 8, dtype=np.float32).reshape(5, 8), np.arange(5.0))
+    assert history.since(-1)[1].tolist() == [2.0, 3.0, 4.0]
+
+
+def test_timestamps_never_go_backwards():
+    history = LineHistory(capacity=4)
+    history.append(np.zeros((1, 8), dtype=np.float32), np.array([10.0]))
+    history.append(np.zeros((1, 8), dtype=np.float32), np.array([9.0]))  # racing writer
+    assert history.since(-1)[1].tolist() == [10.0, 10.0]
+
+
+def test_windows_per_line():
+    telemetry = TelemetryHistory(seconds=100, sample_rate_hz=1)
+    for t, value in ((10.0, 1.0), (50.0, 3.0), (90.0, 5.0)):
+        telemetry.record([reading("LINE-001", value), reading("LINE-002", value * 10)], received_at=t)
+    windows = telemetry.windows("SUB-01", "LINE-001", [15, 60], now=100.0)
+    assert windows["15s"]["samples"] == 1
+    load = windows["60s"]["features"]["load_kw"]
+    assert (windows["60s"]["samples"], load["min"], load["max"], load["mean"]) == (2, 3.0, 5.0, 4.0)
+    assert load["rms"] == np.sqrt((9 + 25) / 2)
+    assert telemetry.windows("SUB-01", "LINE-002", [60], now=100.0)["60s"]["features"]["load_kw"]["max"] == 50.0
+    assert telemetry.windows("SUB-01", "LINE-999", [60]) is None
+
+
+def test_line_limit_and_capacity():
+    telemetry = TelemetryHistory(seconds=600, sample_rate_hz=1, max_lines=2)
+    telemetry.record([reading(f"LINE-{i:03d}", 1.0) for i in range(3)])
+    stats = telemetry.stats()
+    assert (stats["lines"], stats["dropped_lines"], stats["capacity_per_line"]) == (2, 1, 600)